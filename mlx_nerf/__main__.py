@@ -16,4 +16,5 @@ if __name__ == "__main__":
         # entrypoints.viser_record3d
         entrypoints.viser_image_learning
         # entrypoints.test_nerf
+        # entrypoints.render_only
     )
\ No newline at end of file
@@ -21,9 +21,22 @@ def config_parser():
     ## NOTE: training options - batch size
     parser.add_argument("--chunk", type=int, default=1024*32, help="number of rays processed in parallel, decrease it if running out of memory")
     parser.add_argument("--netchunk", type=int, default=1024*64, help="number of points sent through network in parallel, decrease it if running out of memory")
+    parser.add_argument("--memory_budget", type=float, default=0., help="memory budget in GB to auto-tune chunk & netchunk within, set 0. to use given chunk & netchunk")
+    parser.add_argument("--chunk_cache", type=str, default=None, help="path to cache auto-tuned chunk sizes, defaults to ~/.cache/mlx_nerf/autochunk.json")
+    parser.add_argument("--precision", type=str, default="fp32", choices=["fp32", "bf16", "fp16"], help="precision of the MLPs; compositing always runs in fp32")
+    parser.add_argument("--loss_scale", type=float, default=2.**15, help="initial dynamic loss scale for bf16/fp16 training")
+    parser.add_argument("--checkpoint_mlp", action="store_true", help="recompute MLP activations in backward per block split at skip connections, to fit larger N_rand")
     parser.add_argument("--no_batching", action="store_true", help="only take random rays from 1 image at a time")
+    parser.add_argument("--n_prefetch", type=int, default=4, help="number of training batches prepared ahead on a background thread")
+    parser.add_argument("--pixel_sampler", type=str, default="uniform", choices=["uniform", "error_map"], help="draw training rays uniformly, or proportionally to a per-image error map")
+    parser.add_argument("--visual_hull", action="store_true", help="carve a visual hull from training alpha masks for per-ray near/far, skipping background-only rays")
+    parser.add_argument("--visual_hull_resolution", type=int, default=128, help="voxels per axis of visual hull")
+    parser.add_argument("--scene_bbox", type=float, nargs="+", default=None, help="scene bounding box as half extent, or as min_x min_y min_z max_x max_y max_z; per-ray near/far are clipped to it and rays missing it skip the MLP")
+    parser.add_argument("--log_psnr_wallclock", action="store_true", help="every i_print, render fixed held-out val rays on the background evaluator and log PSNR against training wallclock, to compare pixel samplers")
+    parser.add_argument("--error_map_resolution", type=int, default=64, help="cells per axis of per-image error maps for pixel_sampler=error_map")
+    parser.add_argument("--dist_backend", type=str, default="ring", help="mx.distributed backend for data-parallel training, launched with mlx.launch; a single process trains alone")
     parser.add_argument("--no_reload", action="store_true", help="do not reload weights from saved checkpoint")
-    parser.add_argument("--ft_path", type=str, default=None, help="specific weights npy file to reload for coarse network")
+    parser.add_argument("--ft_path", type=str, default=None, help="specific checkpoint to resume from, or weights file to reload for coarse network (safetensors/npz)")
 
     ## NOTE: training options - precrop?
     parser.add_argument("--precrop_iters", type=int, default=0, help="number of steps to train on central crops")
@@ -45,7 +58,11 @@ def config_parser():
     ## NOTE: rendering options - visualization related?
     parser.add_argument("--render_only", action="store_true", help="do not optimize, reload weights and render out render_poses path")
     parser.add_argument("--render_test", action="store_true", help="render the test set instead of render_poses path")
-    parser.add_argument("--render_factor", type=int, default=0, help="downsampling factor to speed up rendering, set 4 or 8 for fast preview")
+    parser.add_argument("--quantize_bits", type=int, default=0, help="bit-width of quantized MLP linears for rendering render_poses (e.g., 4 or 8), set 0 for full precision")
+    parser.add_argument("--quantize_bits_per_layer", type=str, default=None, help="per-layer bit-width overriding quantize_bits, e.g., alpha_linear=8,rgb_linear=8; 0 keeps a layer in full precision")
+    parser.add_argument("--n_render_workers", type=int, default=0, help="opt-in worker processes rendering the render_poses video from the final checkpoint, set 0 to render in-process (default); more than 1 only pays off on CPU workers with spare cores")
+    parser.add_argument("--render_workers_device", type=str, default="default", choices=["default", "cpu"], help="device of render worker processes; default is MLX's default device (GPU on Apple silicon)")
+    parser.add_argument("--render_factor", type=int, default=0, help="progressive rendering from 1/render_factor resolution to full, set 4 or 8 for fast preview; 0 to render at full resolution only")
     # ------------------------------------------
 
     # NOTE: dataset options
@@ -75,6 +92,8 @@ def config_parser():
     parser.add_argument("--i_weights", type=int, default=10000, help="frequency of weight checkpoint saving")
     parser.add_argument("--i_testset", type=int, default=50000, help="frequency of testset saving")
     parser.add_argument("--i_video", type=int, default=50000, help="frequency of render_poses video saving")
+    parser.add_argument("--eval_downscale", type=int, default=4, help="downscale factor of the i_img view rendered by the background evaluator; 1 for full resolution")
+    parser.add_argument("--eval_pause", type=float, default=0.0, help="seconds the background evaluator sleeps between frames, to yield the device to training")
     # ------------------------------------------
 
     return parser
@@ -117,6 +136,7 @@ def update_NeRF_args(args: argparse.Namespace, configs: dict):
     args.precrop_iters = int(configs['precrop_iters'])
     args.precrop_frac = float(configs['precrop_frac'])
     args.half_res = configs['half_res']
-    args.no_reload = True
+    args.no_reload = configs.get("no_reload", "False") == "True"
+    args.render_only = args.render_only or configs.get("render_only", "False") == "True"
 
     return args
\ No newline at end of file
@@ -91,6 +91,48 @@ def load_blender_data(basedir, half_res: bool=False, testskip=1):
 
     return imgs, poses, render_poses, [H, W, focal_length], i_split
 
+def load_blender_meta(basedir, half_res: bool=False, testskip=1):
+    """
+    Same as `load_blender_data(...)`, but without reading images, e.g., for render-only processes
+
+    NOTE: `H`, `W` are read from the header of the first image only
+    """
+
+    splits = ["train", "val", "test"]
+    all_poses = []
+    counts = [0]
+    for s in splits:
+        with open(os.path.join(basedir, f"transforms_{s}.json"), "r") as fp:
+            meta = json.load(fp)
+
+        skip = 1 if s == "train" or testskip == 0 else testskip
+        frames = meta["frames"][::skip]
+        all_poses.append(np.array([frame["transform_matrix"] for frame in frames]).astype(np.float32))
+        counts.append(counts[-1] + len(frames))
+
+    i_split = [np.arange(counts[i], counts[i+1]) for i in range(len(splits))]
+    poses = np.concatenate(all_poses, 0)
+
+    with Image.open(os.path.join(basedir, frames[0]["file_path"] + ".png")) as image:
+        W, H = image.size
+    camera_angle_x = float(meta["camera_angle_x"])
+    focal_length = 0.5*W / np.tan(0.5*camera_angle_x)
+
+    render_poses = mx.stack(
+        [
+            pose.pose_spherical(theta=angle, phi=-30.0, radius=4.0) 
+            for angle
+            in np.linspace(-180, 180, 160+1)[:-1]
+        ], axis=0
+    )
+
+    if True is half_res:
+        H = H//2
+        W = W//2
+        focal_length = focal_length/2.
+
+    return poses, render_poses, [H, W, focal_length], i_split
+
 
 def post_load_blender_data(i_split, images, is_white_bkgd):
     """
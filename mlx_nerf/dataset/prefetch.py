@@ -0,0 +1,101 @@
+"""### prefetch.py
+###### in `mlx_nerf/dataset`
+
+Background prefetching of training batches.
+
+Host-side work of an iteration (image selection, `ray.get_rays(...)`, pixel sampling, gathers) runs on a worker thread,
+filling a bounded queue of the next `n_prefetch` batches while the compiled step runs on the device.
+Batches are evaluated by the worker on its own MLX stream, hence the training loop only waits when the queue runs dry.
+
+NOTE: MLX streams are thread-local; the worker creates its stream in its own thread
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict
+
+import mlx.core as mx
+
+
+class BatchPrefetcher:
+    def __init__(
+        self, 
+        make_batch: Callable[[], Dict], # NOTE: returns a `dict` of `mx.array`s and host objects
+        n_prefetch: int = 4, 
+    ) -> None:
+
+        self.make_batch = make_batch
+        self.queue = queue.Queue(maxsize=n_prefetch)
+        self.is_stopped = threading.Event()
+
+        # NOTE: for overlap statistics
+        self.time_busy = 0.0 # NOTE: worker time spent preparing batches
+        self.time_wait = 0.0 # NOTE: training loop time spent waiting for batches
+        self.n_batches = 0
+
+        self.thread = threading.Thread(target=self.worker, daemon=True)
+        self.thread.start()
+
+        return
+
+    def worker(self):
+        stream = mx.new_stream(mx.default_device())
+        with mx.stream(stream):
+            while not self.is_stopped.is_set():
+                try:
+                    tic = time.perf_counter()
+                    batch = self.make_batch()
+                    mx.eval([v for v in batch.values() if isinstance(v, mx.array)])
+                    self.time_busy += time.perf_counter() - tic
+                except Exception as e:
+                    batch = e # NOTE: re-raised in the training loop
+
+                # NOTE: time out periodically to notice `close()`
+                while not self.is_stopped.is_set():
+                    try:
+                        self.queue.put(batch, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+
+                if isinstance(batch, Exception):
+                    return
+
+        return
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Dict:
+
+        tic = time.perf_counter()
+        batch = self.queue.get()
+        self.time_wait += time.perf_counter() - tic
+        self.n_batches += 1
+
+        if isinstance(batch, Exception):
+            raise batch
+
+        return batch
+
+    def report(self):
+        """
+        Prints & returns the fraction of host-side batch preparation hidden behind device steps
+        """
+
+        overlap = 1.0 - self.time_wait / max(self.time_busy, 1e-10)
+        overlap = min(max(overlap, 0.0), 1.0)
+        print(
+            f"[INFO] prefetch: {self.n_batches} batches, "
+            f"worker busy {self.time_busy:.2f}s, loop waited {self.time_wait:.2f}s, "
+            f"{overlap*100:.1f}% overlapped"
+        )
+
+        return overlap
+
+    def close(self):
+        self.is_stopped.set()
+        self.thread.join()
+
+        return
@@ -0,0 +1,158 @@
+"""### visual_hull.py
+###### in `mlx_nerf/dataset`
+
+Visual hull of the object, carved from alpha masks of training views, for tight per-ray bounds.
+
+A voxel is kept if it projects onto the (dilated) foreground of every training view it is visible in.
+Rays are then marched through the voxel grid within `[near, far]` clipped to the grid's box;
+the first & last occupied samples give per-ray bounds, and rays hitting no voxel are background-only.
+
+Execution flow:
+    1. VisualHull.carve(...)         (once, from training alphas & poses)
+    2. VisualHull.ray_bounds(...)    (per batch of rays; see `render.apply_ray_bounds(...)`)
+"""
+
+import itertools
+from typing import Tuple
+
+import numpy as onp
+import mlx.core as mx
+
+from mlx_nerf.rendering.render import intersect_aabb
+
+
+def dilate(x: onp.ndarray, radius: int, axes: Tuple[int, ...]) -> onp.ndarray:
+    """
+    Binary dilation of `x` with a box of `2*radius + 1` along `axes`
+    """
+
+    if radius <= 0:
+        return x
+
+    pad_width = [(radius, radius) if axis in axes else (0, 0) for axis in range(x.ndim)]
+    padded = onp.pad(x, pad_width)
+    out = onp.zeros_like(x)
+    for offsets in itertools.product(range(2*radius + 1), repeat=len(axes)):
+        slices = [slice(None)] * x.ndim
+        for axis, offset in zip(axes, offsets):
+            slices[axis] = slice(offset, offset + x.shape[axis])
+        out |= padded[tuple(slices)]
+
+    return out
+
+class VisualHull:
+    def __init__(
+        self, 
+        occupancy: onp.ndarray, # NOTE: [R, R, R] bool, indexed by (x, y, z)
+        bbox_min: onp.ndarray, # NOTE: [3]
+        bbox_max: onp.ndarray, # NOTE: [3]
+        n_steps: int = 0, # NOTE: samples per ray for marching; 0 for `2*R`
+    ) -> None:
+
+        self.resolution = occupancy.shape[0]
+        self.bbox_min = onp.asarray(bbox_min, dtype=onp.float32)
+        self.bbox_max = onp.asarray(bbox_max, dtype=onp.float32)
+        self.voxel_size = (self.bbox_max - self.bbox_min) / self.resolution
+        self.n_steps = n_steps if n_steps > 0 else 2 * self.resolution
+        self.occupancy = mx.array(occupancy.reshape(-1))
+
+        return
+
+    @classmethod
+    def carve(
+        cls, 
+        alphas, # NOTE: [N, H, W], alpha channel of training images
+        poses, # NOTE: [N, 4, 4], c2w
+        K, 
+        bbox_min=(-1.5, -1.5, -1.5), 
+        bbox_max=(1.5, 1.5, 1.5), 
+        resolution: int = 128, 
+        threshold: float = 0.05, # NOTE: alpha above which a pixel is foreground
+        dilation_pixels: int = 2, # NOTE: dilation of masks, against voxel centers missing thin structures
+        dilation_voxels: int = 1, # NOTE: dilation of carved grid, to keep the hull conservative
+    ):
+
+        H, W = alphas.shape[1:3]
+        fx, fy, cx, cy = K[0][0], K[1][1], K[0][2], K[1][2]
+        masks = dilate(onp.asarray(alphas) > threshold, dilation_pixels, axes=(1, 2))
+
+        bbox_min = onp.asarray(bbox_min, dtype=onp.float32)
+        bbox_max = onp.asarray(bbox_max, dtype=onp.float32)
+        voxel_size = (bbox_max - bbox_min) / resolution
+        grid = onp.stack(
+            onp.meshgrid(*[onp.arange(resolution)] * 3, indexing="ij"), 
+            axis=-1
+        ).reshape(-1, 3)
+        centers = bbox_min + (grid + 0.5) * voxel_size # NOTE: [R^3, 3]
+
+        occupancy = onp.ones(len(centers), dtype=bool)
+        for mask, c2w in zip(masks, onp.asarray(poses)):
+            # NOTE: world to camera; inverse of `ray.get_rays(...)`, looking at -z with y up
+            points_cam = (centers - c2w[:3, 3]) @ c2w[:3, :3]
+            depth = -points_cam[:, 2]
+            depth_safe = onp.where(depth > 0, depth, 1.0)
+            cols = onp.round(cx + fx * points_cam[:, 0] / depth_safe).astype(onp.int64)
+            rows = onp.round(cy - fy * points_cam[:, 1] / depth_safe).astype(onp.int64)
+
+            # NOTE: voxels out of a view's frustum are not carved by it
+            is_visible = (depth > 0) & (cols >= 0) & (cols < W) & (rows >= 0) & (rows < H)
+            is_foreground = mask[onp.clip(rows, 0, H-1), onp.clip(cols, 0, W-1)]
+            occupancy &= ~is_visible | is_foreground
+
+        occupancy = dilate(occupancy.reshape([resolution] * 3), dilation_voxels, axes=(0, 1, 2))
+        print(f"[INFO] visual hull: {occupancy.mean()*100:.2f}% of {resolution}^3 voxels occupied")
+
+        return cls(occupancy, bbox_min, bbox_max)
+
+    def ray_bounds(
+        self, 
+        rays_o, # NOTE: [B, 3]
+        rays_d, # NOTE: [B, 3]
+        near, # NOTE: [B] or scalar
+        far, # NOTE: [B] or scalar
+        chunk: int = 1024*8, 
+    ):
+        """
+        Returns per-ray near [B], far [B], and whether rays hit the hull [B]
+
+        NOTE: bounds are padded by one marching step, and missed rays keep `near == far`
+        """
+
+        n_rays = rays_o.shape[0]
+
+        # NOTE: march only within the grid's box; rays missing the box miss the hull
+        near, far, is_hit_bbox = intersect_aabb(rays_o, rays_d, near, far, self.bbox_min, self.bbox_max)
+        bbox_min = mx.array(self.bbox_min)
+        voxel_size = mx.array(self.voxel_size)
+        R = self.resolution
+        t_vals = mx.linspace(0.0, 1.0, num=self.n_steps)
+
+        list_near, list_far, list_hit = [], [], []
+        for i in range(0, n_rays, chunk):
+            _near, _far = near[i:i+chunk, None], far[i:i+chunk, None]
+            z_vals = _near + (_far - _near) * t_vals # NOTE: [b, n_steps]
+            pts = rays_o[i:i+chunk, None, :] + z_vals[..., None] * rays_d[i:i+chunk, None, :]
+
+            idx = mx.floor((pts - bbox_min) / voxel_size).astype(mx.int32) # NOTE: [b, n_steps, 3]
+            is_inside = mx.all((idx >= 0) & (idx < R), axis=-1)
+            idx = mx.clip(idx, 0, R-1)
+            is_occupied = is_inside & self.occupancy[(idx[..., 0] * R + idx[..., 1]) * R + idx[..., 2]]
+
+            # NOTE: first & last occupied samples
+            is_hit = mx.any(is_occupied, axis=-1) & is_hit_bbox[i:i+chunk]
+            idx_first = mx.argmax(is_occupied, axis=-1)
+            idx_last = self.n_steps - 1 - mx.argmax(is_occupied[:, ::-1], axis=-1)
+
+            step = (_far - _near)[:, 0] / (self.n_steps - 1)
+            z_first = mx.take_along_axis(z_vals, idx_first[:, None], axis=-1)[:, 0] - step
+            z_last = mx.take_along_axis(z_vals, idx_last[:, None], axis=-1)[:, 0] + step
+
+            list_near.append(mx.where(is_hit, mx.maximum(z_first, _near[:, 0]), _near[:, 0]))
+            list_far.append(mx.where(is_hit, mx.minimum(z_last, _far[:, 0]), _near[:, 0]))
+            list_hit.append(is_hit)
+
+        return (
+            mx.concatenate(list_near, axis=0), 
+            mx.concatenate(list_far, axis=0), 
+            mx.concatenate(list_hit, axis=0)
+        )
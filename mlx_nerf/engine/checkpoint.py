@@ -0,0 +1,241 @@
+"""### checkpoint.py
+###### in `mlx_nerf/engine`
+
+Checkpoints of coarse/fine weights, optimizer state, iteration and RNG states, as safetensors.
+
+`AsyncCheckpointer.save(...)` snapshots state by reference (updates replace arrays rather than mutating them)
+and writes it on a background thread, to a temporary file renamed on completion, hence the training step never waits on disk
+and a crash mid-write never leaves a truncated checkpoint.
+
+Layout of `{basedir}/{expname}/{idx_iter:06d}.safetensors`:
+    - "network_coarse.*", "network_fine.*":  weights
+    - "optimizer.*":                         optimizer state, incl. step & learning rate
+    - "rng.*":                               numpy & torch RNG states, and MLX key
+    - metadata:                              iteration, numpy RNG scalars
+
+`load_render_weights(...)` is the render-only counterpart: `mx.load(...)` of safetensors is lazy, hence only the network tensors are read
+(at startup, when `create_NeRF(...)` evaluates them), and the optimizer state & RNG states in the file are never read.
+
+NOTE: batches are drawn ahead of training (`BatchPrefetcher`), hence the global numpy RNG is past untrained batches;
+the trainer passes the numpy state recorded with the batch of the checkpointed iteration instead, so a resumed run draws the batches the original would have
+
+NOTE: MLX's global RNG key cannot be set, hence it is re-seeded from the saved key on resume; `perturb` noise continues deterministically but not bit-identically
+"""
+
+import os
+import queue
+import threading
+from glob import glob
+from typing import Dict, Optional, Tuple
+
+import numpy as onp
+import mlx.core as mx
+import mlx.nn as nn
+import mlx.optimizers as optim
+import torch
+from mlx.utils import tree_flatten, tree_unflatten
+
+
+def get_rng_state(
+    state_numpy: Optional[tuple] = None, # NOTE: from `onp.random.get_state()`, e.g., as of the last trained batch; None for the current one
+) -> Tuple[Dict[str, mx.array], Dict[str, str]]:
+    """
+    Returns RNG states as arrays & metadata
+    """
+
+    _, keys, pos, has_gauss, cached_gaussian = state_numpy if state_numpy is not None else onp.random.get_state()
+    arrays = {
+        "rng.mlx": mx.array(mx.random.state[0]), 
+        "rng.numpy": mx.array(keys), 
+        "rng.torch": mx.array(torch.get_rng_state().numpy()), 
+    }
+    metadata = {
+        "rng.numpy.pos": str(pos), 
+        "rng.numpy.has_gauss": str(has_gauss), 
+        "rng.numpy.cached_gaussian": repr(cached_gaussian), 
+    }
+
+    return arrays, metadata
+
+def set_rng_state(arrays: Dict[str, mx.array], metadata: Dict[str, str]) -> None:
+
+    onp.random.set_state((
+        "MT19937", 
+        onp.array(arrays["rng.numpy"], dtype=onp.uint32), 
+        int(metadata["rng.numpy.pos"]), 
+        int(metadata["rng.numpy.has_gauss"]), 
+        float(metadata["rng.numpy.cached_gaussian"]), 
+    ))
+    torch.set_rng_state(torch.from_numpy(onp.array(arrays["rng.torch"], dtype=onp.uint8)))
+    mx.random.seed(int(onp.array(arrays["rng.mlx"]).astype(onp.uint64).sum()))
+
+    return
+
+def get_state_dict(
+    model_coarse: nn.Module, 
+    model_fine: Optional[nn.Module], 
+    optimizer: optim.Optimizer, 
+) -> Dict[str, mx.array]:
+
+    state_dict = {f"network_coarse.{k}": v for k, v in tree_flatten(model_coarse.parameters())}
+    if model_fine:
+        state_dict.update({f"network_fine.{k}": v for k, v in tree_flatten(model_fine.parameters())})
+    state_dict.update({f"optimizer.{k}": v for k, v in tree_flatten(optimizer.state)})
+
+    return state_dict
+
+def find_checkpoint(dir_ckpt: str, ft_path: Optional[str] = None, no_reload: bool = False) -> Optional[str]:
+    """
+    Returns `ft_path` if given, otherwise the latest checkpoint in `dir_ckpt` unless `no_reload`
+    """
+
+    if ft_path:
+        return ft_path
+    if no_reload:
+        return None
+
+    list_paths = sorted(glob(os.path.join(dir_ckpt, "[0-9]" * 6 + ".safetensors")))
+
+    return list_paths[-1] if list_paths else None
+
+def load_checkpoint(
+    path: str, 
+    model_coarse: nn.Module, 
+    model_fine: Optional[nn.Module], 
+    optimizer: optim.Optimizer, 
+) -> int:
+    """
+    Restores weights, optimizer & RNG states in-place, and returns the iteration to resume from
+
+    NOTE: a plain weights file (without "network_coarse." keys), e.g., from `nn.Module.save_weights`, is loaded into the coarse network only
+    """
+
+    arrays, metadata = mx.load(path, return_metadata=True)
+
+    if not any(k.startswith("network_coarse.") for k in arrays):
+        model_coarse.load_weights(arrays)
+        print(f"[INFO] loaded coarse weights from {path}")
+        return 0
+
+    def __strip(prefix):
+        return {k[len(prefix):]: v for k, v in arrays.items() if k.startswith(prefix)}
+
+    model_coarse.load_weights(__strip("network_coarse."))
+    if model_fine:
+        model_fine.load_weights(__strip("network_fine."))
+
+    # NOTE: same tree & dtypes as a running optimizer, hence compiled steps trace once as usual
+    optimizer.state = tree_unflatten(list(__strip("optimizer.").items()))
+    optimizer.init(model_coarse.trainable_parameters())
+
+    set_rng_state(arrays, metadata)
+    idx_iter = int(metadata["idx_iter"])
+    print(f"[INFO] resumed from {path} at iter={idx_iter}")
+
+    return idx_iter
+
+def load_render_weights(
+    path: str, 
+    model_coarse: nn.Module, 
+    model_fine: Optional[nn.Module], 
+) -> int:
+    """
+    Loads network weights only, for rendering, and returns the iteration of the checkpoint
+
+    NOTE: loaded arrays are lazy; the caller evaluates them (e.g., `create_NeRF(...)`, before any compiled renderer traces them),
+    which reads network tensors only; optimizer & RNG tensors are never read
+    """
+
+    arrays, metadata = mx.load(path, return_metadata=True)
+
+    if not any(k.startswith("network_coarse.") for k in arrays):
+        model_coarse.load_weights(arrays)
+        print(f"[INFO] loaded coarse weights from {path}")
+        return 0
+
+    def __strip(prefix):
+        return {k[len(prefix):]: v for k, v in arrays.items() if k.startswith(prefix)}
+
+    model_coarse.load_weights(__strip("network_coarse."))
+    if model_fine:
+        model_fine.load_weights(__strip("network_fine."))
+
+    idx_iter = int(metadata.get("idx_iter", 0))
+    print(f"[INFO] loaded weights for rendering from {path} at iter={idx_iter}")
+
+    return idx_iter
+
+class AsyncCheckpointer:
+    def __init__(
+        self, 
+        dir_ckpt: str, 
+        n_keep: int = 0, # NOTE: number of latest checkpoints kept, 0 for all
+    ) -> None:
+
+        self.dir_ckpt = dir_ckpt
+        self.n_keep = n_keep
+        os.makedirs(dir_ckpt, exist_ok=True)
+
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.worker, daemon=True)
+        self.thread.start()
+
+        return
+
+    def save(
+        self, 
+        idx_iter: int, 
+        model_coarse: nn.Module, 
+        model_fine: Optional[nn.Module], 
+        optimizer: optim.Optimizer, 
+        state_numpy: Optional[tuple] = None, # NOTE: numpy RNG state as of the batch of `idx_iter`, see `get_rng_state(...)`
+    ) -> None:
+        """
+        Snapshots & queues a checkpoint; returns without waiting on disk
+
+        NOTE: evaluates the snapshot, i.e., waits for the in-flight training step only
+        """
+
+        state_dict = get_state_dict(model_coarse, model_fine, optimizer)
+        arrays_rng, metadata = get_rng_state(state_numpy)
+        state_dict.update(arrays_rng)
+        metadata["idx_iter"] = str(idx_iter)
+        mx.eval(state_dict)
+
+        self.queue.put((idx_iter, state_dict, metadata))
+
+        return
+
+    def worker(self):
+
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+
+            idx_iter, state_dict, metadata = job
+            path = os.path.join(self.dir_ckpt, f"{idx_iter:06d}.safetensors")
+            path_tmp = os.path.join(self.dir_ckpt, f"{idx_iter:06d}.tmp.safetensors")
+            try:
+                mx.save_safetensors(path_tmp, state_dict, metadata=metadata)
+                os.replace(path_tmp, path)
+            except Exception as e: # NOTE: a failed save must not stop training
+                print(f"[WARNING] checkpoint of iter={idx_iter} failed, {e!r}")
+                continue
+
+            if self.n_keep > 0:
+                list_paths = sorted(glob(os.path.join(self.dir_ckpt, "[0-9]" * 6 + ".safetensors")))
+                for path_old in list_paths[:-self.n_keep]:
+                    os.remove(path_old)
+
+        return
+
+    def close(self):
+        """
+        Waits for queued checkpoints to be written
+        """
+
+        self.queue.put(None)
+        self.thread.join()
+
+        return
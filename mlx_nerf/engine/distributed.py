@@ -0,0 +1,211 @@
+"""### distributed.py
+###### in `mlx_nerf/engine`
+
+Data-parallel training over `mx.distributed`, e.g., N local CPU processes with the ring backend.
+
+Each rank samples its own batch of `N_rand` rays, gradients are averaged across ranks inside the compiled step,
+hence all ranks apply identical updates to identical replicas; rank 0 alone checkpoints, evaluates and logs.
+
+Launch:
+    mlx.launch --backend ring -n 4 -- python -m mlx_nerf ...
+
+Scaling benchmark (rays/sec against process count, on synthetic rays):
+    python -m mlx_nerf.engine.distributed --list_n_procs 1 2 4 --N_rand 1024
+
+NOTE: a single process (e.g., launched without `mlx.launch`) gets no group, and every helper here is a no-op
+"""
+
+import re
+import subprocess
+import sys
+import time
+from functools import partial
+from typing import List, Optional
+
+import numpy as onp
+import mlx.core as mx
+import mlx.nn as nn
+import torch
+from mlx.utils import tree_map
+
+
+def init(backend: str = "ring") -> Optional[mx.distributed.Group]:
+    """
+    Returns the group of all processes, or `None` if running alone
+    """
+
+    group = mx.distributed.init(backend=backend)
+    if group.size() == 1:
+        return None
+
+    print(f"[INFO] distributed: rank {group.rank()} of {group.size()} ({backend})")
+
+    return group
+
+def is_main(group: Optional[mx.distributed.Group]) -> bool:
+    return group is None or group.rank() == 0
+
+def get_size(group: Optional[mx.distributed.Group]) -> int:
+    return 1 if group is None else group.size()
+
+def broadcast_parameters(model: nn.Module, group: Optional[mx.distributed.Group]) -> None:
+    """
+    Overwrites parameters of every rank with those of rank 0, e.g., after random init
+    """
+
+    if group is None:
+        return
+
+    is_root = group.rank() == 0
+    model.update(tree_map(
+        lambda p: mx.distributed.all_sum(p if is_root else mx.zeros_like(p), group=group), 
+        model.parameters()
+    ))
+    mx.eval(model.parameters())
+
+    return
+
+def seed_rank(group: Optional[mx.distributed.Group]) -> None:
+    """
+    Decorrelates host RNGs across ranks, e.g., after all ranks restored the same checkpoint, so that each samples its own rays
+    """
+
+    if group is None:
+        return
+
+    seed = (onp.random.randint(2**31) + 7919 * group.rank()) % 2**31
+    onp.random.seed(seed)
+    torch.manual_seed(seed)
+    mx.random.seed(seed)
+
+    return
+
+def average_gradients(grads, group: Optional[mx.distributed.Group]):
+    """
+    Averages gradients across ranks, with one all-reduce per 32MB of gradients; safe inside `mx.compile`
+    """
+
+    if group is None:
+        return grads
+
+    return nn.average_gradients(grads, group=group)
+
+def all_finite(is_finite: mx.array, group: Optional[mx.distributed.Group]) -> mx.array:
+    """
+    Whether gradients of all ranks are finite, so that loss scalers of all ranks skip the same steps
+    """
+
+    if group is None:
+        return is_finite
+
+    return mx.distributed.all_sum(is_finite.astype(mx.int32), group=group) == group.size()
+
+def benchmark(args) -> float:
+    """
+    Returns rays/sec of data-parallel coarse training steps over all ranks, on synthetic rays
+
+    NOTE: rays are aimed from a sphere of radius 4 at the origin, as blender scenes
+    """
+
+    from mlx_nerf.models.NeRF import create_NeRF
+    from mlx_nerf.rendering.render import render_rays
+
+    group = init(args.dist_backend)
+    args.no_reload = True
+    args.N_importance = 0
+    args.use_viewdirs = True
+    render_kwargs_train, _, _, optimizer = create_NeRF(args)
+    render_kwargs_train.update({
+        "near": 2.0, 
+        "far": 6.0, 
+    })
+    model = render_kwargs_train["network_coarse"]
+    broadcast_parameters(model, group)
+    seed_rank(group)
+
+    def mse(model, rays_linear, y):
+        return mx.mean((render_rays(rays_linear, **render_kwargs_train)["rgb_coarse"] - y) ** 2)
+
+    state = [model.state, optimizer.state]
+    @partial(mx.compile, inputs=state, outputs=state)
+    def step(rays_linear, y):
+        loss, grads = nn.value_and_grad(model, mse)(model, rays_linear, y)
+        optimizer.update(model, average_gradients(grads, group))
+        return loss
+
+    def make_batch():
+        rays_o = onp.random.randn(args.N_rand, 3)
+        rays_o = 4.0 * rays_o / onp.linalg.norm(rays_o, axis=-1, keepdims=True)
+        rays_d = -rays_o / 4.0 + 0.1 * onp.random.randn(args.N_rand, 3)
+        viewdirs = rays_d / onp.linalg.norm(rays_d, axis=-1, keepdims=True)
+        rays_linear = onp.concatenate([
+            rays_o, rays_d, 
+            onp.full([args.N_rand, 1], 2.0), onp.full([args.N_rand, 1], 6.0), 
+            viewdirs
+        ], axis=-1)
+        return mx.array(rays_linear.astype(onp.float32)), mx.array(onp.random.rand(args.N_rand, 3).astype(onp.float32))
+
+    list_batches = [make_batch() for _ in range(args.n_steps + 2)]
+    for idx, batch in enumerate(list_batches):
+        if 2 == idx: # NOTE: warm-up steps incl. tracing are not timed
+            mx.eval(state)
+            tic = time.perf_counter()
+        step(*batch)
+        mx.eval(state)
+    elapsed = time.perf_counter() - tic
+
+    rays_per_sec = get_size(group) * args.N_rand * args.n_steps / elapsed
+    if is_main(group):
+        print(f"[INFO] benchmark: {get_size(group)} processes, {rays_per_sec:.1f} rays/s")
+
+    return rays_per_sec
+
+def benchmark_scaling(list_n_procs: List[int], argv: List[str]) -> dict:
+    """
+    Launches `benchmark(...)` with each number of local processes, and prints rays/sec, speedup & efficiency
+    """
+
+    results = {}
+    for n_procs in list_n_procs:
+        command = [sys.executable, "-m", "mlx_nerf.engine.distributed", *argv]
+        if n_procs > 1: # NOTE: `mlx.launch` of a single ring node fails
+            command = ["mlx.launch", "--backend", "ring", "-n", str(n_procs), "--"] + command
+        proc = subprocess.run(
+            command, 
+            capture_output=True, 
+            text=True, 
+        )
+        match = re.search(r"benchmark: \d+ processes, ([\d.]+) rays/s", proc.stdout)
+        if not match:
+            print(f"[WARNING] benchmark with {n_procs} processes failed:\n{proc.stdout}{proc.stderr}")
+            continue
+        results[n_procs] = float(match.group(1))
+
+    base = results.get(min(results), 0.0) if results else 0.0
+    print(f"[INFO] {'processes':>10} {'rays/s':>12} {'speedup':>8} {'efficiency':>10}")
+    for n_procs, rays_per_sec in results.items():
+        speedup = rays_per_sec / base if base > 0.0 else 0.0
+        print(f"[INFO] {n_procs:>10} {rays_per_sec:>12.1f} {speedup:>7.2f}x {speedup/n_procs*min(results)*100:>9.1f}%")
+
+    return results
+
+if __name__ == "__main__":
+    from mlx_nerf import config_parser
+
+    parser = config_parser.config_parser()
+    parser.add_argument("--n_steps", type=int, default=20, help="timed training steps per benchmark")
+    parser.add_argument("--list_n_procs", type=int, nargs="+", default=None, help="numbers of local processes to benchmark; launches them with `mlx.launch`")
+    args, _ = parser.parse_known_args()
+
+    if args.list_n_procs:
+        # NOTE: forward all other arguments to the launched processes
+        argv, is_skipped = [], False
+        for arg in sys.argv[1:]:
+            if arg.startswith("--"):
+                is_skipped = arg == "--list_n_procs"
+            if not is_skipped:
+                argv.append(arg)
+        benchmark_scaling(args.list_n_procs, argv)
+    else:
+        mx.set_default_device(mx.cpu) # NOTE: local processes would contend for a single GPU
+        benchmark(args)
@@ -0,0 +1,183 @@
+"""### evaluator.py
+###### in `mlx_nerf/engine`
+
+Periodic evaluation off the critical path of training.
+
+`Evaluator.submit(...)` snapshots network weights and queues a job; a worker thread renders it on its own MLX stream,
+computes PSNR/SSIM against ground truth, and writes images, metrics and videos, while training continues.
+
+Weights are snapshotted by reference: optimizer updates replace parameter arrays rather than mutating them,
+hence holding the parameter trees of submission time is enough, and the worker loads them into its own copies of the networks.
+
+Jobs:
+    - "img":        a single view, e.g., every `i_img`, at 1/`downscale` resolution
+    - "testset":    test views with PSNR/SSIM, e.g., every `i_testset`
+    - "video":      `render_poses` as mp4, e.g., every `i_video`
+    - "rays":       PSNR of given rays [2, N, 3] (instead of poses) against target colors [N, 3], appended to `path_log` with training `wallclock`
+"""
+
+import os
+import queue
+import threading
+import time
+from copy import deepcopy
+
+import imageio.v2
+import numpy as onp
+import mlx.core as mx
+
+from mlx_nerf.ops.metric import PSNR, SSIM
+from mlx_nerf.rendering.compiled import CompiledRenderer
+
+
+class Evaluator:
+    def __init__(
+        self, 
+        render_kwargs, # NOTE: e.g., `render_kwargs_test`
+        H, 
+        W, 
+        K, 
+        dir_output, 
+        chunk: int = 1024*32, 
+        downscale: int = 1, # NOTE: of "img" jobs; rendering cost drops by `downscale`², as it runs on the training device
+        pause: float = 0.0, # NOTE: sleep between frames, to yield the device to training
+    ) -> None:
+
+        self.H = H
+        self.W = W
+        self.K = K
+        self.dir_output = dir_output
+        self.chunk = chunk
+        self.downscale = downscale
+        self.pause = pause
+
+        # NOTE: networks of the trainer, and worker's own copies that snapshots are loaded into
+        self.networks = {
+            k: render_kwargs[k] for k in ["network_coarse", "network_fine"]
+            if render_kwargs.get(k)
+        }
+        self.render_kwargs = dict(render_kwargs)
+        self.render_kwargs.update({k: deepcopy(v) for k, v in self.networks.items()})
+
+        # NOTE: MLX streams are thread-local; arrays still lazy on this thread's stream cannot be evaluated by the worker
+        mx.eval([self.render_kwargs[k].state for k in self.networks])
+
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.worker, daemon=True)
+        self.thread.start()
+
+        return
+
+    def submit(
+        self, 
+        kind: str, # NOTE: "img", "testset" or "video"
+        idx_iter: int, 
+        poses, # NOTE: [N, 4, 4]
+        images=None, # NOTE: [N, H, W, 3]
+        **meta, # NOTE: per kind, e.g., `wallclock` & `path_log` of "rays"
+    ) -> None:
+        """
+        Snapshots weights and queues a job; returns without waiting for rendering
+
+        NOTE: evaluates parameters, i.e., waits for the in-flight training step only
+        """
+
+        params = {k: v.parameters() for k, v in self.networks.items()}
+        mx.eval(params)
+        if self.queue.qsize() > 1:
+            print(f"[WARNING] evaluator is {self.queue.qsize()} jobs behind")
+        self.queue.put((kind, idx_iter, onp.asarray(poses), None if images is None else onp.asarray(images), params, meta))
+
+        return
+
+    def worker(self):
+        stream = mx.new_stream(mx.default_device())
+        with mx.stream(stream):
+            renderer = CompiledRenderer(chunk=self.chunk, **self.render_kwargs)
+            # NOTE: chunk of the downscaled view at most; padding it to `chunk` would render mostly padding
+            renderer_img = CompiledRenderer(
+                chunk=min(self.chunk, (self.H // self.downscale) * (self.W // self.downscale)), 
+                **self.render_kwargs
+            )
+            while True:
+                job = self.queue.get()
+                if job is None:
+                    break
+
+                kind, idx_iter, poses, images, params, meta = job
+                for k, v in params.items():
+                    self.render_kwargs[k].update(v)
+
+                tic = time.perf_counter()
+                try:
+                    self.run(renderer_img if kind == "img" else renderer, kind, idx_iter, poses, images, **meta)
+                    print(f"[INFO] evaluator: {kind} of iter={idx_iter} done in {time.perf_counter()-tic:.1f}s")
+                except Exception as e: # NOTE: a failed evaluation must not stop training
+                    print(f"[WARNING] evaluator: {kind} of iter={idx_iter} failed, {e!r}")
+
+        return
+
+    def run(self, renderer, kind, idx_iter, poses, images, **meta):
+
+        to8b = lambda x: (onp.clip(onp.array(x), 0.0, 1.0) * 255.0).astype(onp.uint8)
+
+        if kind == "rays":
+            rgb, _, _, _ = renderer(self.H, self.W, self.K, rays=mx.array(poses, dtype=mx.float32))
+            psnr = PSNR()(rgb, mx.array(images)).item()
+            with open(meta["path_log"], "a") as file:
+                file.write(f"{idx_iter},{meta['wallclock']:.3f},{psnr:.4f}\n")
+            return
+
+        H, W, K = self.H, self.W, self.K
+        if kind == "img" and self.downscale > 1:
+            f = self.downscale
+            H, W = self.H // f, self.W // f
+            K = onp.array(self.K, dtype=onp.float32) / f
+            K[2, 2] = 1.0
+            if images is not None: # NOTE: area average
+                images = images[:, :H*f, :W*f].reshape(-1, H, f, W, f, images.shape[-1]).mean(axis=(2, 4))
+
+        if kind == "video":
+            path_video = os.path.join(self.dir_output, f"video_{idx_iter:06d}.mp4")
+            writer = imageio.v2.get_writer(path_video, fps=30)
+        else:
+            dir_images = os.path.join(self.dir_output, f"{kind}_{idx_iter:06d}")
+            os.makedirs(dir_images, exist_ok=True)
+
+        # NOTE: rays of all views packed into full chunks
+        list_psnrs, list_ssims = [], []
+        for idx, (rgb, _, _, _) in enumerate(renderer.render_batch(H, W, K, poses)):
+
+            if kind == "video":
+                writer.append_data(to8b(rgb))
+            else:
+                imageio.v2.imwrite(os.path.join(dir_images, f"{idx:03d}.png"), to8b(rgb))
+
+            if images is not None:
+                gt = mx.array(images[idx])
+                list_psnrs.append(PSNR()(rgb, gt).item())
+                list_ssims.append(SSIM()(rgb, gt).item())
+
+            if self.pause > 0.0:
+                time.sleep(self.pause)
+
+        if kind == "video":
+            writer.close()
+
+        if list_psnrs:
+            psnr, ssim = onp.mean(list_psnrs), onp.mean(list_ssims)
+            print(f"[INFO] evaluator: {kind} of iter={idx_iter}, PSNR={psnr:.2f}, SSIM={ssim:.4f}")
+            with open(os.path.join(self.dir_output, "metrics_eval.csv"), "a") as file:
+                file.write(f"{idx_iter},{kind},{psnr:.4f},{ssim:.4f}\n")
+
+        return
+
+    def close(self):
+        """
+        Waits for queued jobs, then stops the worker
+        """
+
+        self.queue.put(None)
+        self.thread.join()
+
+        return
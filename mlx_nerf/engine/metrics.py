@@ -0,0 +1,66 @@
+"""### metrics.py
+###### in `mlx_nerf/engine`
+
+Ring buffer of per-step training metrics kept as device arrays.
+
+`loss.item()` on every step forces a host sync and serializes MLX's lazy evaluation.
+Here, scalars are recorded as `mx.array`s and only reduced at logging boundaries, with a single `mx.eval(...)`.
+"""
+
+from typing import Dict, List
+
+import numpy as onp
+import mlx.core as mx
+
+
+class MetricsRing:
+    def __init__(
+        self, 
+        capacity: int, # NOTE: e.g., `i_print`; the oldest steps are overwritten beyond it
+    ) -> None:
+
+        self.capacity = capacity
+        self.steps: List[int] = []
+        self.buffers: Dict[str, List[mx.array]] = {}
+        self.idx = 0 # NOTE: next slot to write, once full
+
+        return
+
+    def record(self, step: int, **metrics: mx.array) -> None:
+        """
+        Records scalar `mx.array`s of a step without evaluating them
+        """
+
+        if len(self.steps) < self.capacity:
+            self.steps.append(step)
+            for key, val in metrics.items():
+                self.buffers.setdefault(key, []).append(val)
+            return
+
+        self.steps[self.idx] = step
+        for key, val in metrics.items():
+            self.buffers[key][self.idx] = val
+        self.idx = (self.idx + 1) % self.capacity
+
+        return
+
+    def reduce(self) -> Dict[str, onp.ndarray]:
+        """
+        Evaluates recorded metrics at once, and clears the buffer
+
+        Returns per-step values in step order, incl. `"step"`
+        """
+
+        order = onp.argsort(self.steps, kind="stable")
+        stacked = {key: mx.stack(val) for key, val in self.buffers.items()}
+        mx.eval(stacked) # NOTE: the only host sync
+
+        ret = {"step": onp.array(self.steps)[order]}
+        for key, val in stacked.items():
+            ret[key] = onp.array(val)[order]
+
+        self.steps = []
+        self.buffers = {}
+        self.idx = 0
+
+        return ret
@@ -0,0 +1,100 @@
+"""### mixed_precision.py
+###### in `mlx_nerf/engine`
+
+Autocast-style mixed precision: the MLP runs in `bfloat16`/`float16` on fp32 master weights (see `NeRF.compute_dtype`),
+while compositing in `raw2outputs` stays in fp32, as half precision transmittance (`exp(-cumsum(...))`) underflows.
+
+Training scales the loss to keep half precision activation gradients from flushing to zero;
+the scale shrinks on overflow (skipping that update) and grows after `growth_interval` finite steps.
+"""
+
+from typing import Callable
+
+import mlx.core as mx
+import mlx.nn as nn
+from mlx.utils import tree_flatten, tree_map
+
+DTYPES = {
+    "fp32": mx.float32, 
+    "bf16": mx.bfloat16, 
+    "fp16": mx.float16, 
+}
+
+
+class DynamicLossScaler:
+    def __init__(
+        self, 
+        init_scale: float = 2.0 ** 15, 
+        growth_factor: float = 2.0, 
+        growth_interval: int = 2000, 
+    ) -> None:
+
+        self.growth_factor = growth_factor
+        self.growth_interval = growth_interval
+
+        # NOTE: arrays in a dict, to be passed as `inputs`/`outputs` of `mx.compile`d steps
+        self.state = {
+            "scale": mx.array(init_scale, dtype=mx.float32), 
+            "n_finite_steps": mx.array(0, dtype=mx.int32), 
+        }
+
+        return
+
+    def value_and_grad(self, model: nn.Module, loss_fn: Callable):
+        """
+        Similar to `nn.value_and_grad`, but differentiates the scaled loss
+
+        Returns a function which returns unscaled loss, unscaled gradients & whether all gradients are finite
+        NOTE: as `nn.value_and_grad`, `loss_fn` may return a tuple of which the first element is the loss
+        """
+
+        def __scaled_loss_fn(*args, **kwargs):
+            loss = loss_fn(*args, **kwargs)
+            if isinstance(loss, (tuple, list)):
+                return (loss[0] * self.state["scale"], *loss[1:])
+            return loss * self.state["scale"]
+
+        loss_and_grad_fn = nn.value_and_grad(model, __scaled_loss_fn)
+
+        def __value_and_grad(*args, **kwargs):
+            scale = self.state["scale"]
+            loss, grads = loss_and_grad_fn(*args, **kwargs)
+            grads = tree_map(lambda g: g / scale, grads)
+            is_finite = mx.all(mx.stack([
+                mx.all(mx.isfinite(g)) for _, g in tree_flatten(grads)
+            ]))
+
+            if isinstance(loss, (tuple, list)):
+                return (loss[0] / scale, *loss[1:]), grads, is_finite
+            return loss / scale, grads, is_finite
+
+        return __value_and_grad
+
+    def update(self, optimizer, model: nn.Module, grads, is_finite):
+        """
+        Applies `grads` if all finite, otherwise keeps parameters; then adjusts the scale
+
+        NOTE: no control flow on array values, as this runs inside `mx.compile`;
+        NOTE: optimizer moments still decay on skipped steps, as non-finite gradients are zeroed instead
+        """
+
+        params_prev = model.trainable_parameters()
+        grads = tree_map(lambda g: mx.where(is_finite, g, mx.zeros_like(g)), grads)
+        optimizer.update(model, grads)
+        model.update(tree_map(
+            lambda p, p_prev: mx.where(is_finite, p, p_prev), 
+            model.trainable_parameters(), 
+            params_prev
+        ))
+
+        scale = self.state["scale"]
+        n_finite_steps = mx.where(is_finite, self.state["n_finite_steps"] + 1, 0)
+        is_grow = n_finite_steps >= self.growth_interval
+        self.state["scale"] = mx.where(
+            is_finite, 
+            mx.where(is_grow, scale * self.growth_factor, scale), 
+            scale / self.growth_factor
+        )
+        self.state["n_finite_steps"] = mx.where(is_grow, 0, n_finite_steps)
+
+        return
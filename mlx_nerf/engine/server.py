@@ -0,0 +1,528 @@
+"""### server.py
+###### in `mlx_nerf/engine`
+
+Local render service: holds the model once, and serves renders of poses to any number of clients over localhost HTTP.
+
+Rays of concurrent requests are coalesced into shared full chunks of a `CompiledRenderer` (dynamic batching):
+a chunk is rendered as soon as it is full, or once the oldest pending request has waited `max_delay_ms`, whichever comes first.
+Requests larger than a chunk span several; each request's pixels are streamed back (chunked transfer encoding) as its rays complete.
+
+API:
+    - POST /render      JSON `{"c2w": [3 or 4][4], "H": int, "W": int, "focal": float}` (or `"K": [3][3]` instead of `"focal"`)
+                        returns uint8 rgb [H, W, 3], row-major, streamed
+    - GET /stats        JSON of per-request latency (histogram & percentiles) and chunk fill
+
+Execution flow:
+    1. RenderRequestHandler.do_POST(...)        (HTTP thread per connection)
+    2. RenderServer.worker(...)                 (single render thread, on its own MLX stream)
+        - RenderServer.prepare(...)             (rays, incl. `ray_bounds`)
+        - CompiledRenderer.render_chunk_padded(...)
+    3. RenderRequestHandler.do_POST(...)        (streams pixels as they complete)
+
+Serve:
+    python -m mlx_nerf.engine.server --config {config} --ft_path {checkpoint} --port 8000
+Load generator against a running server:
+    python -m mlx_nerf.engine.server --load_test --port 8000 --n_clients 8 --n_requests 16
+Benchmark (in-process server, unbatched, then per `max_delay_ms`):
+    python -m mlx_nerf.engine.server --config {config} --ft_path {checkpoint} --list_max_delay_ms 0 5 20
+"""
+
+import http.client
+import json
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import numpy as onp
+import mlx.core as mx
+
+from mlx_nerf.engine.video import to8b
+from mlx_nerf.rendering import ray
+from mlx_nerf.rendering.compiled import CompiledRenderer
+from mlx_nerf.rendering.render import apply_ray_bounds, build_rays
+
+
+class LatencyHistogram:
+    """
+    Thread-safe latency record, with log-spaced buckets for printing
+    """
+    def __init__(
+        self, 
+        edges_ms=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000), 
+    ) -> None:
+
+        self.edges_ms = list(edges_ms)
+        self.counts = [0] * (len(self.edges_ms) + 1)
+        self.samples = []
+        self.lock = threading.Lock()
+
+        return
+
+    def record(self, seconds: float) -> None:
+
+        ms = seconds * 1e3
+        with self.lock:
+            self.counts[int(onp.searchsorted(self.edges_ms, ms))] += 1
+            self.samples.append(ms)
+
+        return
+
+    def summary(self) -> dict:
+
+        with self.lock:
+            samples = onp.array(self.samples)
+            counts = list(self.counts)
+        if samples.size == 0:
+            return {"count": 0}
+
+        labels = [f"<={edge}ms" for edge in self.edges_ms] + [f">{self.edges_ms[-1]}ms"]
+        return {
+            "count": int(samples.size), 
+            "mean_ms": float(samples.mean()), 
+            "p50_ms": float(onp.percentile(samples, 50)), 
+            "p90_ms": float(onp.percentile(samples, 90)), 
+            "p99_ms": float(onp.percentile(samples, 99)), 
+            "max_ms": float(samples.max()), 
+            "buckets": {label: count for label, count in zip(labels, counts) if count > 0}, 
+        }
+
+    def format(self, width: int = 40) -> str:
+
+        summary = self.summary()
+        if summary["count"] == 0:
+            return "(no samples)"
+
+        n_max = max(summary["buckets"].values())
+        lines = [
+            f"{label:>10} {count:>6} {'#' * max(1, round(width * count / n_max))}"
+            for label, count in summary["buckets"].items()
+        ]
+        lines.append(f"p50 {summary['p50_ms']:.1f}ms, p90 {summary['p90_ms']:.1f}ms, p99 {summary['p99_ms']:.1f}ms, max {summary['max_ms']:.1f}ms")
+
+        return "\n".join(lines)
+
+class RenderJob:
+    def __init__(self, H: int, W: int, K, c2w) -> None:
+
+        self.H = H
+        self.W = W
+        self.K = onp.asarray(K, dtype=onp.float32)
+        self.c2w = onp.asarray(c2w, dtype=onp.float32)[:3, :4]
+        self.time_arrival = time.perf_counter()
+
+        # NOTE: set by the render thread
+        self.rays = None # NOTE: linearized rays to render, i.e., hit rays with `ray_bounds`
+        self.idx_pixels = None # NOTE: pixel of each ray (onp)
+        self.n_taken = 0 # NOTE: rays taken into chunks
+        self.n_done = 0 # NOTE: rays rendered
+        self.rgb = None # NOTE: [H*W, 3] uint8
+
+        self.progress = queue.Queue() # NOTE: number of final pixels (a prefix) after each rendered chunk; `None` on error
+        self.error: Optional[Exception] = None
+
+        return
+
+    @property
+    def n_remaining(self) -> int:
+        return self.rays.shape[0] - self.n_taken
+
+class RenderServer:
+    def __init__(
+        self, 
+        render_kwargs: dict, # NOTE: e.g., `render_kwargs_test` with `near` & `far`
+        chunk: int = 1024*8, # NOTE: rays per shared chunk
+        max_delay_ms: float = 10.0, # NOTE: longest wait of a request for a chunk to fill up
+        is_batching: bool = True, # NOTE: `False` renders each request in chunks of its own, right away; a baseline
+    ) -> None:
+
+        self.render_kwargs = render_kwargs
+        self.chunk = chunk
+        self.max_delay = max_delay_ms * 1e-3
+        self.is_batching = is_batching
+        self.queue = queue.Queue()
+
+        self.latency = LatencyHistogram() # NOTE: arrival to last rendered ray
+        self.n_chunks = 0
+        self.n_rays_rendered = 0 # NOTE: valid rays, i.e., excl. padding
+        self.n_requests_per_chunk = 0
+
+        # NOTE: MLX streams are thread-local; arrays still lazy on this thread's stream cannot be evaluated by the worker
+        mx.eval([render_kwargs[k].parameters() for k in ["network_coarse", "network_fine"] if render_kwargs.get(k)])
+        self.thread = threading.Thread(target=self.worker, daemon=True)
+        self.thread.start()
+
+        return
+
+    def submit(self, job: RenderJob) -> RenderJob:
+
+        self.queue.put(job)
+
+        return job
+
+    def stats(self) -> dict:
+
+        return {
+            "latency": self.latency.summary(), 
+            "n_chunks": self.n_chunks, 
+            "chunk_fill": self.n_rays_rendered / max(self.n_chunks * self.chunk, 1), 
+            "requests_per_chunk": self.n_requests_per_chunk / max(self.n_chunks, 1), 
+        }
+
+    def prepare(self, job: RenderJob) -> None:
+        """
+        Builds rays of `job`; with `ray_bounds`, missed pixels are final right away
+        """
+
+        rays_o, rays_d = ray.get_rays(job.H, job.W, job.K, job.c2w)
+        rays, _ = build_rays(
+            job.H, job.W, job.K, 
+            rays=(mx.array(rays_o, dtype=mx.float32).reshape(-1, 3), mx.array(rays_d, dtype=mx.float32).reshape(-1, 3)), 
+            **self.render_kwargs
+        )
+
+        is_white = self.render_kwargs.get("white_bkgd", False)
+        job.rgb = onp.full([job.H * job.W, 3], 255 if is_white else 0, dtype=onp.uint8)
+        ray_bounds = self.render_kwargs.get("ray_bounds")
+        if ray_bounds is not None:
+            rays, job.idx_pixels = apply_ray_bounds(rays, ray_bounds)
+        else:
+            job.idx_pixels = onp.arange(rays.shape[0])
+        job.rays = rays
+        mx.eval(job.rays)
+
+        return
+
+    def worker(self):
+        stream = mx.new_stream(mx.default_device())
+        with mx.stream(stream):
+            renderer = CompiledRenderer(chunk=self.chunk, **self.render_kwargs)
+            pending = deque() # NOTE: jobs with rays not taken into a chunk yet, in arrival order
+            while True:
+                # NOTE: take requests until a chunk is full, or the oldest pending request's deadline
+                n_pending = sum(job.n_remaining for job in pending)
+                if n_pending < self.chunk and (self.is_batching or not pending):
+                    try:
+                        if pending:
+                            timeout = max(pending[0].time_arrival + self.max_delay - time.perf_counter(), 0.0)
+                            job = self.queue.get(timeout=timeout)
+                        else:
+                            job = self.queue.get()
+                    except queue.Empty:
+                        job = False # NOTE: deadline
+                    if job is None:
+                        break
+                    if job is not False:
+                        try:
+                            self.prepare(job)
+                        except Exception as e:
+                            job.error = e
+                            job.progress.put(None)
+                            continue
+                        if job.rays.shape[0] == 0:
+                            self.finish(job)
+                        else:
+                            pending.append(job)
+                        continue
+
+                self.render(renderer, pending)
+
+        return
+
+    def render(self, renderer: CompiledRenderer, pending: deque) -> None:
+        """
+        Renders one chunk of rays of `pending` jobs in order, and reports progress to each
+        """
+
+        list_pieces, n_rays = [], 0 # NOTE: (job, start, end) of each job's rays in the chunk
+        for job in pending:
+            if n_rays >= self.chunk or (list_pieces and not self.is_batching):
+                break
+            n = min(job.n_remaining, self.chunk - n_rays)
+            list_pieces.append((job, job.n_taken, job.n_taken + n))
+            job.n_taken += n
+            n_rays += n
+        while pending and pending[0].n_remaining == 0:
+            pending.popleft()
+
+        rays_chunk = mx.concatenate([job.rays[start:end] for job, start, end in list_pieces], axis=0)
+        try:
+            rgb = onp.array(renderer.render_chunk_padded(rays_chunk)["rgb_map"])
+        except Exception as e:
+            for job, _, _ in list_pieces:
+                job.error = e
+                job.progress.put(None)
+            return
+
+        self.n_chunks += 1
+        self.n_rays_rendered += n_rays
+        self.n_requests_per_chunk += len(list_pieces)
+
+        offset = 0
+        for job, start, end in list_pieces:
+            job.rgb[job.idx_pixels[start:end]] = to8b(rgb[offset:offset + end - start])
+            offset += end - start
+            job.n_done = end
+            if job.n_done == job.rays.shape[0]:
+                self.finish(job)
+            else:
+                job.progress.put(int(job.idx_pixels[job.n_done])) # NOTE: pixels before the next ray to render are final
+
+        return
+
+    def finish(self, job: RenderJob) -> None:
+
+        self.latency.record(time.perf_counter() - job.time_arrival)
+        job.progress.put(job.H * job.W)
+
+        return
+
+    def close(self) -> None:
+
+        self.queue.put(None)
+        self.thread.join()
+
+        return
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # NOTE: keep-alive & chunked transfer encoding
+
+    def log_message(self, format, *args):
+        return
+
+    def send_json(self, status: int, data: dict) -> None:
+
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        return
+
+    def write_chunk(self, data: bytes) -> None:
+
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        return
+
+    def do_GET(self):
+
+        if self.path != "/stats":
+            return self.send_json(404, {"error": f"unknown path {self.path}"})
+
+        return self.send_json(200, self.server.render_server.stats())
+
+    def do_POST(self):
+
+        if self.path != "/render":
+            return self.send_json(404, {"error": f"unknown path {self.path}"})
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            H, W = int(request["H"]), int(request["W"])
+            if "K" in request:
+                K = onp.array(request["K"], dtype=onp.float32)
+            else:
+                K = onp.array([
+                    [request["focal"], 0, 0.5 * W], 
+                    [0, request["focal"], 0.5 * H], 
+                    [0, 0, 1]
+                ], dtype=onp.float32)
+            job = RenderJob(H, W, K, request["c2w"])
+        except (KeyError, TypeError, ValueError) as e:
+            return self.send_json(400, {"error": repr(e)})
+
+        self.server.render_server.submit(job)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Shape", f"{H},{W},3")
+        self.end_headers()
+
+        n_sent = 0 # NOTE: pixels streamed
+        while n_sent < H * W:
+            n_final = job.progress.get()
+            if n_final is None: # NOTE: headers are out; the client sees a truncated body
+                print(f"[WARNING] render server: request failed, {job.error!r}")
+                self.close_connection = True
+                return
+            if n_final > n_sent:
+                self.write_chunk(job.rgb[n_sent:n_final].tobytes())
+                n_sent = n_final
+        self.write_chunk(b"")
+
+        return
+
+def serve(
+    render_kwargs: dict, 
+    host: str = "127.0.0.1", 
+    port: int = 8000, # NOTE: 0 for any free port
+    chunk: int = 1024*8, 
+    max_delay_ms: float = 10.0, 
+    is_batching: bool = True, 
+):
+    """
+    Returns the HTTP server, serving on a background thread, and the `RenderServer` behind it; `httpd.shutdown()` & `render_server.close()` to stop
+    """
+
+    render_server = RenderServer(render_kwargs, chunk=chunk, max_delay_ms=max_delay_ms, is_batching=is_batching)
+    httpd = ThreadingHTTPServer((host, port), RenderRequestHandler)
+    httpd.daemon_threads = True
+    httpd.render_server = render_server
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    print(f"[INFO] render server on http://{host}:{httpd.server_address[1]} (chunk {chunk}, {f'max delay {max_delay_ms}ms' if is_batching else 'no batching'})")
+
+    return httpd, render_server
+
+def load_test(
+    host: str, 
+    port: int, 
+    poses, # NOTE: [N, 4, 4], requested round-robin
+    H: int, 
+    W: int, 
+    focal: float, 
+    n_clients: int = 8, 
+    n_requests: int = 16, # NOTE: per client
+) -> dict:
+    """
+    Issues requests from `n_clients` concurrent clients, each waiting for its previous response;
+    prints client-side latency & time-to-first-pixels histograms and throughput
+    """
+
+    latency, latency_first = LatencyHistogram(), LatencyHistogram()
+    errors = []
+
+    def __client(idx_client):
+        connection = http.client.HTTPConnection(host, port, timeout=600)
+        for idx in range(n_requests):
+            c2w = onp.asarray(poses[(idx_client * n_requests + idx) % len(poses)])[:3, :4]
+            body = json.dumps({"c2w": c2w.tolist(), "H": H, "W": W, "focal": float(focal)})
+            tic = time.perf_counter()
+            try:
+                connection.request("POST", "/render", body=body, headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                data = response.read1(H * W * 3)
+                latency_first.record(time.perf_counter() - tic)
+                data += response.read()
+                latency.record(time.perf_counter() - tic)
+                if len(data) != H * W * 3:
+                    errors.append(f"client {idx_client}: {len(data)} of {H*W*3} bytes")
+            except Exception as e:
+                errors.append(f"client {idx_client}: {e!r}")
+                connection.close()
+                connection = http.client.HTTPConnection(host, port, timeout=600)
+        connection.close()
+
+    tic = time.perf_counter()
+    list_threads = [threading.Thread(target=__client, args=(idx,)) for idx in range(n_clients)]
+    for thread in list_threads:
+        thread.start()
+    for thread in list_threads:
+        thread.join()
+    elapsed = time.perf_counter() - tic
+
+    n_done = latency.summary()["count"]
+    print(f"[INFO] load test: {n_done} requests of {H}x{W} from {n_clients} clients in {elapsed:.1f}s ({n_done/elapsed:.2f} requests/s, {n_done*H*W/elapsed:.0f} rays/s)")
+    print(f"[INFO] latency:\n{latency.format()}")
+    print(f"[INFO] time to first pixels:\n{latency_first.format()}")
+    for error in errors[:8]:
+        print(f"[WARNING] {error}")
+
+    return {
+        "requests_per_sec": n_done / elapsed, 
+        "latency": latency.summary(), 
+        "latency_first": latency_first.summary(), 
+        "n_errors": len(errors), 
+    }
+
+def benchmark(
+    render_kwargs: dict, 
+    poses, 
+    H: int, 
+    W: int, 
+    focal: float, 
+    list_max_delay_ms: List[float], 
+    chunk: int = 1024*8, 
+    n_clients: int = 8, 
+    n_requests: int = 16, 
+) -> dict:
+    """
+    Runs `load_test(...)` against an in-process server without batching, then per `max_delay_ms`, and prints throughput, latency & chunk fill
+    """
+
+    results = {}
+    for max_delay_ms in [None] + list(list_max_delay_ms):
+        name = "unbatched" if max_delay_ms is None else f"{max_delay_ms:g}ms"
+        httpd, render_server = serve(render_kwargs, port=0, chunk=chunk, max_delay_ms=max_delay_ms or 0.0, is_batching=max_delay_ms is not None)
+        results[name] = load_test("127.0.0.1", httpd.server_address[1], poses, H, W, focal, n_clients=n_clients, n_requests=n_requests)
+        results[name].update(render_server.stats())
+        httpd.shutdown()
+        httpd.server_close()
+        render_server.close()
+
+    print(f"[INFO] {'max delay':>10} {'requests/s':>11} {'p50':>10} {'p99':>10} {'chunk fill':>11} {'requests/chunk':>15}")
+    for name, result in results.items():
+        print(
+            f"[INFO] {name:>10} {result['requests_per_sec']:>11.2f} "
+            f"{result['latency'].get('p50_ms', 0.0):>8.0f}ms {result['latency'].get('p99_ms', 0.0):>8.0f}ms "
+            f"{result['chunk_fill']*100:>10.1f}% {result['requests_per_chunk']:>15.2f}"
+        )
+
+    return results
+
+if __name__ == "__main__":
+    from mlx_nerf import config_parser
+    from mlx_nerf.ops.pose import pose_spherical
+
+    parser = config_parser.config_parser()
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="address of the render server")
+    parser.add_argument("--port", type=int, default=8000, help="port of the render server")
+    parser.add_argument("--max_delay_ms", type=float, default=10.0, help="longest wait of a request for a chunk to fill up")
+    parser.add_argument("--load_test", action="store_true", help="run the load generator against a running server")
+    parser.add_argument("--list_max_delay_ms", type=float, nargs="+", default=None, help="benchmark an in-process server per max delay")
+    parser.add_argument("--n_clients", type=int, default=8, help="concurrent clients of the load generator")
+    parser.add_argument("--n_requests", type=int, default=16, help="requests per client of the load generator")
+    parser.add_argument("--resolution", type=int, default=64, help="height & width of load generator requests")
+    parser.add_argument("--focal", type=float, default=88.9, help="focal length of load generator requests")
+    args = parser.parse_args()
+
+    poses = onp.stack([
+        onp.array(pose_spherical(theta=angle, phi=-30.0, radius=4.0))
+        for angle in onp.linspace(-180, 180, 40+1)[:-1]
+    ], axis=0)
+
+    if args.load_test:
+        load_test(args.host, args.port, poses, args.resolution, args.resolution, args.focal, n_clients=args.n_clients, n_requests=args.n_requests)
+    else:
+        from mlx_nerf.models.NeRF import create_NeRF
+
+        args.render_only = True
+        _, render_kwargs_test, _, _ = create_NeRF(args)
+        render_kwargs_test.update({
+            "near": 2.0, 
+            "far": 6.0, 
+        })
+        if args.list_max_delay_ms:
+            benchmark(
+                render_kwargs_test, 
+                poses, 
+                args.resolution, 
+                args.resolution, 
+                args.focal, 
+                args.list_max_delay_ms, 
+                chunk=args.chunk, 
+                n_clients=args.n_clients, 
+                n_requests=args.n_requests, 
+            )
+        else:
+            httpd, render_server = serve(render_kwargs_test, host=args.host, port=args.port, chunk=args.chunk, max_delay_ms=args.max_delay_ms)
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                httpd.shutdown()
+                render_server.close()
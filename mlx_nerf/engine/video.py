@@ -0,0 +1,108 @@
+"""### video.py
+###### in `mlx_nerf/engine`
+
+Background video encoding.
+
+`FrameSink.append(...)` queues a frame and returns; a worker thread converts it to uint8 (`to8b`) and encodes it with an `imageio` writer,
+hence encoding leaves the training/render loop. The queue is bounded: when encoding falls behind, `append(...)` blocks (backpressure)
+instead of buffering frames without limit.
+
+NOTE: `mx.array` frames are evaluated by the caller, as MLX streams are thread-local; the worker only reads them back
+"""
+
+import queue
+import threading
+import time
+from typing import Optional
+
+import imageio.v2
+import numpy as onp
+import mlx.core as mx
+
+
+def to8b(x) -> onp.ndarray:
+    """
+    [0, 1] floats to uint8; uint8 frames pass through
+    """
+
+    x = onp.asarray(x)
+    if x.dtype == onp.uint8:
+        return x
+
+    return (onp.clip(x, 0.0, 1.0) * 255.0).astype(onp.uint8)
+
+class FrameSink:
+    def __init__(
+        self, 
+        path: str, 
+        fps: int = 30, 
+        maxsize: int = 8, # NOTE: frames queued before `append(...)` blocks
+    ) -> None:
+
+        self.path = path
+        self.writer = imageio.v2.get_writer(path, fps=fps)
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error: Optional[Exception] = None
+
+        self.time_encode = 0.0 # NOTE: worker time spent converting & encoding
+        self.time_block = 0.0 # NOTE: caller time spent blocked on a full queue
+        self.n_frames = 0
+
+        self.thread = threading.Thread(target=self.worker, daemon=True)
+        self.thread.start()
+
+        return
+
+    def append(self, frame) -> None:
+        """
+        Queues a frame [H, W, 3] of [0, 1] floats or uint8; blocks while the queue is full
+        """
+
+        if self.error:
+            raise self.error
+
+        if isinstance(frame, mx.array):
+            mx.eval(frame)
+
+        tic = time.perf_counter()
+        self.queue.put(frame)
+        self.time_block += time.perf_counter() - tic
+        self.n_frames += 1
+
+        return
+
+    def worker(self):
+
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            if self.error: # NOTE: drain, so that `append(...)` never blocks on a dead writer
+                continue
+
+            tic = time.perf_counter()
+            try:
+                self.writer.append_data(to8b(frame))
+            except Exception as e:
+                self.error = e
+            self.time_encode += time.perf_counter() - tic
+
+        return
+
+    def close(self):
+        """
+        Waits for queued frames to be encoded, then closes the video
+        """
+
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.close()
+        print(
+            f"[INFO] {self.path}: {self.n_frames} frames, "
+            f"encoded in {self.time_encode:.2f}s off the caller, which blocked {self.time_block:.2f}s"
+        )
+
+        if self.error:
+            raise self.error
+
+        return
@@ -4,5 +4,6 @@
 
 from .__viser_image_learning import main as viser_image_learning
 from .__test_nerf import main as test_nerf
+from .__render_only import main as render_only
 
 # TODO: set common theme here
@@ -0,0 +1,111 @@
+"""### __render_only.py
+###### in `mlx_nerf/entrypoints`
+
+Render-only process: renders `render_poses` (or test views with `render_test`) from a checkpoint, without training state.
+
+Cold start is kept short by
+    - reading camera metadata without images (`load_blender_meta(...)`),
+    - building networks without evaluating random init, and without an optimizer (`create_NeRF(...)` with `render_only`),
+    - loading network weights only (`checkpoint.load_render_weights(...)`); network tensors are read once at startup,
+      and the checkpoint's optimizer & RNG state are skipped.
+
+With `render_factor` > 0, each frame is rendered progressively (`render_progressive(...)`), from 1/`render_factor` resolution to full,
+and the latency of each level of the first frame is printed.
+
+NOTE: weights are read through the OS page cache, hence processes rendering the same checkpoint share its cached pages,
+and only the first cold process reads from disk; each process still holds its own copy of the (few MB of) weights in MLX buffers
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as onp
+
+from mlx_nerf import config_parser
+from mlx_nerf.dataset.dataloader import load_blender_meta
+from mlx_nerf.engine.video import FrameSink
+from mlx_nerf.models.NeRF import create_NeRF
+from mlx_nerf.rendering.compiled import CompiledRenderer
+from mlx_nerf.rendering.progressive import render_progressive
+
+
+def __render_progressive(renderer, H, W, K, c2w, render_factor, tic, is_verbose=False):
+    """
+    Returns the full-resolution level of `render_progressive(...)`; prints the latency of each level if `is_verbose`
+    """
+
+    for factor, rgb in render_progressive(renderer, H, W, K, c2w, render_factor=render_factor):
+        if is_verbose:
+            print(f"[INFO] progressive 1/{factor} ({rgb.shape[1]}x{rgb.shape[0]}): {(time.perf_counter()-tic)*1e3:.0f}ms")
+
+    return rgb
+
+def main(
+    path_dataset: Path = Path.home() / "Downloads" / "NeRF", 
+    path_ckpt: Optional[Path] = None, # NOTE: latest checkpoint of the experiment if not given
+    n_frames: int = 0, # NOTE: 0 for all poses
+):
+
+    tic = time.perf_counter()
+
+    parser = config_parser.config_parser()
+    args = parser.parse_args(args=[])
+    args.config = "configs/lego.txt"
+    configs = config_parser.load_config(None, path_dataset / args.config)
+    args = config_parser.update_NeRF_args(args, configs)
+    args.render_only = True
+    if path_ckpt:
+        args.ft_path = str(path_ckpt)
+
+    poses, render_poses, hwf, i_split = load_blender_meta(
+        path_dataset / configs["datadir"], 
+        half_res=args.half_res, 
+        testskip=args.testskip
+    )
+    _, render_kwargs_test, idx_iter, _ = create_NeRF(args)
+
+    # NOTE: arbitrarily set bounds for synthetic data
+    render_kwargs_test.update({
+        "near": 2.0, 
+        "far": 6.0, 
+    })
+
+    H, W, focal = hwf
+    H, W = int(H), int(W)
+    K = onp.array([
+        [focal, 0, 0.5 * W], 
+        [0, focal, 0.5 * H], 
+        [0, 0, 1]
+    ])
+
+    renderer = CompiledRenderer(chunk=args.chunk, **render_kwargs_test)
+
+    if args.render_test:
+        render_poses = poses[i_split[-1]]
+    render_poses = onp.array(render_poses)
+    if n_frames > 0:
+        render_poses = render_poses[:n_frames]
+    time_setup = time.perf_counter() - tic
+
+    dir_output = os.path.join(args.basedir, args.expname)
+    os.makedirs(dir_output, exist_ok=True)
+    name = "test" if args.render_test else "path"
+    writer = FrameSink(os.path.join(dir_output, f"renderonly_{name}_{idx_iter:06d}.mp4"), fps=30)
+    if args.render_factor > 0:
+        iter_rgb = (__render_progressive(renderer, H, W, K, c2w, args.render_factor, tic, is_verbose=0 == idx) for idx, c2w in enumerate(render_poses))
+    else:
+        iter_rgb = (rgb for rgb, _, _, _ in renderer.render_batch(H, W, K, render_poses))
+    for idx, rgb in enumerate(iter_rgb):
+
+        if 0 == idx:
+            time_first = time.perf_counter() - tic
+            print(f"[INFO] cold start to first frame: {time_first*1e3:.0f}ms (setup {time_setup*1e3:.0f}ms, first frame {(time_first-time_setup)*1e3:.0f}ms)")
+
+        writer.append(rgb)
+    writer.close()
+
+    print(f"[INFO] rendered {len(render_poses)} frames in {time.perf_counter()-tic:.1f}s")
+
+    return
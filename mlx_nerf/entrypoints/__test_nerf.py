@@ -1,8 +1,9 @@
 import os
+import time
+from copy import copy
 from functools import partial
 from pathlib import Path
 
-import imageio.v2
 import numpy as onp
 import matplotlib.pyplot as plt
 import mlx.core as mx
@@ -11,15 +12,26 @@ import mlx.optimizers as optim
 import torch
 import viser
 import viser.extras
-from tqdm import trange
+from tqdm import tqdm, trange
 
 from this_project import get_project_root, PJ_PINK
 from mlx_nerf import config_parser
 from mlx_nerf.dataset.dataloader import load_blender_data
+from mlx_nerf.dataset.prefetch import BatchPrefetcher
+from mlx_nerf.dataset.visual_hull import VisualHull
+from mlx_nerf.engine import distributed, mixed_precision
+from mlx_nerf.engine.checkpoint import AsyncCheckpointer
+from mlx_nerf.engine.evaluator import Evaluator
+from mlx_nerf.engine.metrics import MetricsRing
+from mlx_nerf.engine.video import FrameSink
+from mlx_nerf.entrypoints.__render_only import main as render_only
 from mlx_nerf.models.NeRF import create_NeRF
-from mlx_nerf.rendering import ray, render
+from mlx_nerf.models import quantize
+from mlx_nerf.rendering import autochunk, parallel, ray, render
 from mlx_nerf.rendering.render import render_rays, raw2outputs
+from mlx_nerf.rendering.compiled import CompiledRenderer
 from mlx_nerf import sampling
+from mlx_nerf.sampling.error_map import ErrorMapSampler
 
 
 def main(
@@ -34,7 +46,12 @@ def main(
     path_config = path_dataset / args.config
     
     configs = config_parser.load_config(None, path_config)
-    args = config_parser.update_NeRF_args(configs)
+
+    # NOTE: no dataset, optimizer or training state for rendering only
+    if args.render_only or configs.get("render_only", "False") == "True":
+        return render_only(path_dataset=path_dataset)
+
+    args = config_parser.update_NeRF_args(args, configs)
     
     dir_dataset = configs["datadir"]
     images, poses, render_poses, hwf, i_split = load_blender_data(path_dataset / dir_dataset)
@@ -42,9 +59,17 @@ def main(
 
     render_kwargs_train, render_kwargs_test, idx_iter, optimizer = create_NeRF(args)
 
+    # NOTE: data-parallel over processes of `mlx.launch`; replicas start from weights of rank 0, and each samples its own rays
+    group = distributed.init(args.dist_backend)
+    is_main = distributed.is_main(group)
+    for k in ["network_coarse", "network_fine"]:
+        if render_kwargs_train[k]:
+            distributed.broadcast_parameters(render_kwargs_train[k], group)
+    distributed.seed_rank(group)
+
     z_vals = None
     weights = None
-    def mlx_mse_coarse(model, batch_rays, y_gt):
+    def mlx_mse_coarse(model, batch_rays, bounds_ray, y_gt, weights_ray):
         """
         FIXME: 
             - ray generation
@@ -54,9 +79,6 @@ def main(
         """
 
 
-        near = render_kwargs_train["near"]
-        far = render_kwargs_train["far"]
-
         rays_o, rays_d = batch_rays
         rays_shape = rays_d.shape
         viewdirs = rays_d
@@ -70,8 +92,9 @@ def main(
                 rays_o, rays_d
             )
 
-        near = near * mx.ones_like(rays_d[..., :1])
-        far = far * mx.ones_like(rays_d[..., :1])
+        # NOTE: per-ray bounds [B, 2]; constant unless tightened by a visual hull
+        near = bounds_ray[:, :1]
+        far = bounds_ray[:, 1:]
 
         # NOTE: concat all ray-related features
         rays = mx.concatenate(
@@ -85,12 +108,14 @@ def main(
         rgb = results["rgb_coarse"]
 
         # NOTE: fine first
-        mse_coarse = mx.mean((rgb - y_gt) ** 2)
+        # NOTE: per-ray errors for error-map sampling; `weights_ray` are importance weights of sampled pixels
+        mse_per_ray = mx.mean((rgb - y_gt) ** 2, axis=-1)
+        mse_coarse = mx.mean(weights_ray * mse_per_ray)
         
-        return mse_coarse
+        return mse_coarse, mx.stop_gradient(mse_per_ray)
     
     
-    def mlx_mse_fine(model, batch_rays, z_vals_fine, y_gt): # FIXME: in this way computational graph won't be established
+    def mlx_mse_fine(model, batch_rays, z_vals_fine, y_gt, weights_ray): # FIXME: in this way computational graph won't be established
 
         rays_o, rays_d = batch_rays
         rays_shape = rays_d.shape
@@ -121,28 +146,43 @@ def main(
         ret["acc_map"] = acc
 
         # NOTE: fine first
-        mse_fine = mx.mean((rgb - y_gt) ** 2)
+        mse_per_ray = mx.mean((rgb - y_gt) ** 2, axis=-1)
+        mse_fine = mx.mean(weights_ray * mse_per_ray)
         
-        return mse_fine
+        return mse_fine, mx.stop_gradient(mse_per_ray)
+
+    # NOTE: loss scaling for mixed precision
+    scaler = mixed_precision.DynamicLossScaler(args.loss_scale) if args.precision != "fp32" else None
+    state_scaler = [scaler.state] if scaler else []
 
-    state_coarse = [render_kwargs_train["network_coarse"].state, optimizer.state]
+    state_coarse = [render_kwargs_train["network_coarse"].state, optimizer.state] + state_scaler
     @partial(mx.compile, inputs=state_coarse, outputs=state_coarse)
-    def step_coarse(X, y):
+    def step_coarse(X, bounds_ray, y, weights_ray):
         model = render_kwargs_train["network_coarse"]
+        if scaler:
+            (loss, mse_per_ray), grads, is_finite = scaler.value_and_grad(model, mlx_mse_coarse)(model, X, bounds_ray, y, weights_ray)
+            grads = distributed.average_gradients(grads, group)
+            scaler.update(optimizer, model, grads, distributed.all_finite(is_finite, group))
+            return loss, mse_per_ray
         loss_and_grad_fn = nn.value_and_grad(model, mlx_mse_coarse)
-        loss, grads = loss_and_grad_fn(model, X, y)
-        optimizer.update(model, grads)
-        return loss
+        (loss, mse_per_ray), grads = loss_and_grad_fn(model, X, bounds_ray, y, weights_ray)
+        optimizer.update(model, distributed.average_gradients(grads, group))
+        return loss, mse_per_ray
     
 
-    state_fine = [render_kwargs_train["network_fine"].state, optimizer.state]
+    state_fine = [render_kwargs_train["network_fine"].state, optimizer.state] + state_scaler
     @partial(mx.compile, inputs=state_fine, outputs=state_fine)
-    def step_fine(batch_rays, z_vals_fine, y):
+    def step_fine(batch_rays, z_vals_fine, y, weights_ray):
         model = render_kwargs_train["network_fine"]
+        if scaler:
+            (loss, mse_per_ray), grads, is_finite = scaler.value_and_grad(model, mlx_mse_fine)(model, batch_rays, z_vals_fine, y, weights_ray)
+            grads = distributed.average_gradients(grads, group)
+            scaler.update(optimizer, model, grads, distributed.all_finite(is_finite, group))
+            return loss, mse_per_ray
         loss_and_grad_fn = nn.value_and_grad(model, mlx_mse_fine)
-        loss, grads = loss_and_grad_fn(model, batch_rays, z_vals_fine, y)
-        optimizer.update(model, grads)
-        return loss
+        (loss, mse_per_ray), grads = loss_and_grad_fn(model, batch_rays, z_vals_fine, y, weights_ray)
+        optimizer.update(model, distributed.average_gradients(grads, group))
+        return loss, mse_per_ray
 
     # NOTE: ---------------- from `train(args)` --------------------    
     i_train, i_val, i_test = i_split
@@ -157,6 +197,9 @@ def main(
     render_kwargs_train.update(bds_dict)
     render_kwargs_test.update(bds_dict)
 
+    # NOTE: keep alpha for carving visual hull
+    alphas = images[..., -1]
+
     # NOTE: blender image contains alpha, thus fill white
     if args.white_bkgd:
         images = images[..., :3] * images[..., -1:] + (1.0 - images[..., -1:])
@@ -173,6 +216,50 @@ def main(
         [0, 0, 1]
     ])
 
+    # NOTE: scene bounding box, as [min_x, min_y, min_z], [max_x, max_y, max_z]
+    if args.scene_bbox and len(args.scene_bbox) == 1:
+        bbox_min, bbox_max = [-args.scene_bbox[0]] * 3, [args.scene_bbox[0]] * 3
+    elif args.scene_bbox:
+        bbox_min, bbox_max = args.scene_bbox[:3], args.scene_bbox[3:]
+    else:
+        bbox_min, bbox_max = [-1.5] * 3, [1.5] * 3
+
+    # NOTE: visual hull from training alpha masks; per-ray tight bounds, and background-only rays skip the MLP
+    hull = None
+    if args.visual_hull:
+        hull = VisualHull.carve(
+            alphas[i_train], 
+            poses[i_train], 
+            K, 
+            bbox_min=bbox_min, 
+            bbox_max=bbox_max, 
+            resolution=args.visual_hull_resolution, 
+        )
+        render_kwargs_train["ray_bounds"] = hull.ray_bounds
+        render_kwargs_test["ray_bounds"] = hull.ray_bounds
+    elif args.scene_bbox:
+        render_kwargs_train["ray_bounds"] = partial(render.intersect_aabb, bbox_min=bbox_min, bbox_max=bbox_max)
+        render_kwargs_test["ray_bounds"] = render_kwargs_train["ray_bounds"]
+    if render_kwargs_test.get("ray_bounds"):
+        render.report_ray_bounds(H, W, K, poses[i_test[::args.testskip]], render_kwargs_test["ray_bounds"], near, far)
+
+    # NOTE: auto-tune chunk sizes within memory budget, on rays of a training view
+    if args.memory_budget > 0.0:
+        rays_probe, _ = render.build_rays(
+            H, W, K, 
+            c2w=mx.array(poses[i_train[0], :3, :4]), 
+            **render_kwargs_test
+        )
+        args.chunk, args.netchunk = autochunk.autotune_chunks(
+            rays_probe, 
+            render_kwargs_test, 
+            memory_budget=int(args.memory_budget * 2**30), 
+            path_cache=args.chunk_cache if args.chunk_cache else autochunk.PATH_CACHE_DEFAULT, 
+        )
+    print(f"[INFO] {args.chunk=}, {args.netchunk=}")
+
+    # NOTE: shape-stable compiled renderer for evaluation & video; tail chunks are padded to `chunk`
+    renderer = CompiledRenderer(chunk=args.chunk, **render_kwargs_test)
     
     if args.render_test:
         render_poses = onp.array(poses[i_test]) # NOTE: e.g., for PSNR etc
@@ -183,21 +270,64 @@ def main(
     expname = args.expname
     os.makedirs(os.path.join(basedir, expname), exist_ok=True)
     f = os.path.join(basedir, expname, "args.txt")
-    with open(f, "w") as file:
-        for arg in sorted(vars(args)):
-            attr = getattr(args, arg)
-            file.write(f"{arg} = {attr}\n")
-    if args.config is not None:
+    if is_main:
+        with open(f, "w") as file:
+            for arg in sorted(vars(args)):
+                attr = getattr(args, arg)
+                file.write(f"{arg} = {attr}\n")
+    if is_main and args.config is not None:
         f = os.path.join(basedir, expname, "config.txt")
         with open(f, "w") as file:
             file.write(open(path_config, "r").read())
 
+    # NOTE: error-map guided pixel sampling
+    sampler = ErrorMapSampler(
+        len(images), H, W, 
+        resolution=args.error_map_resolution
+    ) if args.pixel_sampler == "error_map" else None
+
+    # NOTE: PSNR-vs-wallclock log on fixed held-out rays, to compare pixel samplers; rendered on the background evaluator, off the training path
+    if args.log_psnr_wallclock and is_main:
+        rng_val = onp.random.default_rng(0)
+        idx_val = onp.sort(i_val[rng_val.integers(len(i_val), size=4096)]) # NOTE: grouped by image
+        rows_val = rng_val.integers(H, size=4096)
+        cols_val = rng_val.integers(W, size=4096)
+        rays_val = []
+        for idx in onp.unique(idx_val):
+            rays_o, rays_d = ray.get_rays(H, W, K, poses[idx, :3, :4])
+            is_idx = idx_val == idx
+            rays_val.append(onp.stack([
+                onp.array(rays_o)[rows_val[is_idx], cols_val[is_idx]], 
+                onp.array(rays_d)[rows_val[is_idx], cols_val[is_idx]], 
+            ], axis=0))
+        rays_val = onp.concatenate(rays_val, axis=1) # NOTE: [2, 4096, 3]
+        target_val = images[idx_val, rows_val, cols_val]
+        path_log_psnr = os.path.join(basedir, expname, f"psnr_wallclock_{args.pixel_sampler}.csv")
+        with open(path_log_psnr, "w") as file:
+            file.write("iter,wallclock,psnr\n")
+    wallclock = 0.0
+    wallclock_print = 0.0 # NOTE: at the last printout, for rays/sec
+
+    def sample_pixels(img_i, n_rays):
+        """
+        Returns pixel coordinates [n_rays, 2] as (row, col) & importance weights [n_rays] of training rays
+        """
+        if sampler:
+            return sampler.sample(img_i, n_rays)
+        choice = onp.random.choice(H*W, size=[n_rays], replace=False) # NOTE: [H*W]
+        return onp.stack(onp.divmod(choice, W), axis=-1), onp.ones([n_rays], dtype=onp.float32)
+
+    checkpointer = AsyncCheckpointer(os.path.join(basedir, expname)) if is_main else None
+    evaluator = Evaluator(render_kwargs_test, H, W, K, os.path.join(basedir, expname), chunk=args.chunk, downscale=args.eval_downscale, pause=args.eval_pause) if is_main else None
+    metrics = MetricsRing(args.i_print)
     list_losses = []
     list_iters = []
-    to8b = lambda x: onp.array((mx.clip(x, 0.0, 1.0) * 255.0), copy=False).astype(onp.uint8)
 
 
-    for i in trange(1, max_iter+1):
+    def make_batch():
+        """
+        Returns a training batch of `N_rand` rays; runs on the prefetching worker thread
+        """
         # NOTE: randomize rays
         img_i = onp.random.choice(i_train)
         target = images[img_i]
@@ -210,35 +340,57 @@ def main(
             rays_o = mx.array(rays_o) # [H, W, 3]
             rays_d = mx.array(rays_d) # [H, W, 3]
 
-            coords = onp.meshgrid(
-                onp.arange(0, H), 
-                onp.arange(0, W), 
-                indexing="ij"
-            ) # NOTE: `list`
-            
-            # TODO: convert all `np.ndarray`s into `mx.array`
-            coords[0] = mx.array(coords[0])
-            coords[1] = mx.array(coords[1])
-
-            # TODO: stack meshgrids
-            coords = mx.stack(coords, axis=-1)
-            
-            # TODO: reshape, now [H, W] has been flatten
-            coords = mx.reshape(coords, [-1, 2])
-
-            choice = mx.array(onp.random.choice(coords.shape[0], size=[N_rand], replace=False)) # NOTE: [H*W]
-            selected_coords = coords[choice]
+            near = render_kwargs_train["near"]
+            far = render_kwargs_train["far"]
+            if render_kwargs_train.get("ray_bounds"):
+                coords_np, weights_np, near_ray, far_ray = render.sample_hit_rays(
+                    partial(sample_pixels, img_i), 
+                    render_kwargs_train["ray_bounds"], 
+                    rays_o, 
+                    rays_d, 
+                    near, 
+                    far, 
+                    N_rand
+                )
+            else:
+                coords_np, weights_np = sample_pixels(img_i, N_rand)
+                near_ray = mx.full([N_rand], near)
+                far_ray = mx.full([N_rand], far)
+            selected_coords = mx.array(coords_np)
 
             rays_o = rays_o[selected_coords[:, 0], selected_coords[:, 1]]
             rays_d = rays_d[selected_coords[:, 0], selected_coords[:, 1]]
-
-            batch_rays = mx.stack([rays_o, rays_d], axis=0)
-            target_selected = target[selected_coords[:, 0], selected_coords[:, 1]]
         else: # FIXME: this seems to be implemented in the case of video training
             raise NotImplementedError
 
-        loss = step_coarse(batch_rays, target_selected)
-        mx.eval(state_coarse)
+        return {
+            "img_i": img_i, 
+            "coords_np": coords_np, 
+            "batch_rays": mx.stack([rays_o, rays_d], axis=0), 
+            "bounds_ray": mx.stack([near_ray, far_ray], axis=-1), # NOTE: [N_rand, 2]
+            "target_selected": target[selected_coords[:, 0], selected_coords[:, 1]], 
+            "weights_ray": mx.array(weights_np), 
+            "state_numpy": onp.random.get_state(), # NOTE: as of this batch; the worker is the only consumer of the global numpy RNG while training
+        }
+
+    # NOTE: host-side batch preparation overlaps device steps; error maps lag by up to `n_prefetch` steps
+    state_numpy = onp.random.get_state() # NOTE: numpy RNG state as of the last trained batch, for checkpoints
+    prefetcher = BatchPrefetcher(make_batch, n_prefetch=args.n_prefetch)
+
+    i = idx_iter # NOTE: last iteration, also when resuming a run that already reached `max_iter`
+    for i in trange(idx_iter+1, max_iter+1, disable=not is_main):
+        tic = time.perf_counter()
+        batch = next(prefetcher)
+        img_i = batch["img_i"]
+        coords_np = batch["coords_np"]
+        batch_rays = batch["batch_rays"]
+        bounds_ray = batch["bounds_ray"]
+        target_selected = batch["target_selected"]
+        weights_ray = batch["weights_ray"]
+        state_numpy = batch["state_numpy"]
+
+        loss, mse_per_ray = step_coarse(batch_rays, bounds_ray, target_selected, weights_ray)
+        mx.async_eval(state_coarse)
 
         if render_kwargs_train["network_fine"]:
             
@@ -247,8 +399,6 @@ def main(
             # TODO: `batch_rays` -> sampled rays
             
             N_importance = args.N_importance            
-            near = render_kwargs_train["near"]
-            far = render_kwargs_train["far"]
 
             rays_o, rays_d = batch_rays
             rays_shape = rays_d.shape
@@ -257,12 +407,9 @@ def main(
             viewdirs = mx.reshape(viewdirs, [-1, 3]).astype(mx.float32)
 
 
-            near = near * mx.ones_like(rays_d[..., :1])
-            far = far * mx.ones_like(rays_d[..., :1])
-
             # NOTE: concat all ray-related features
             rays = mx.concatenate(
-                [rays_o, rays_d, near, far], # FIXME: should `near` and `far` included for every ray tensor?
+                [rays_o, rays_d, bounds_ray], 
                 axis=-1
             )
             
@@ -271,32 +418,44 @@ def main(
             z_vals = results["z_vals"]
             weights = results["weights"]
 
-            # NOTE: `torch.searchsorted` not supports `mps` backend
-            z_vals_torch = torch.from_numpy(onp.array(z_vals))# .to("mps")
-            weights_torch = torch.from_numpy(onp.array(weights))# .to("mps")
-            
-            z_importance_samples = sampling.sample_from_inverse_cdf_torch(
-                z_vals_torch, 
-                weights_torch, 
+            # NOTE: on device; the `torch.searchsorted` hop would read `z_vals` & `weights` back to host every step
+            z_importance_samples = sampling.sample_from_inverse_cdf(
+                mx.stop_gradient(z_vals), 
+                mx.stop_gradient(weights), 
                 N_importance, 
             )
 
-            z_importance_samples = z_importance_samples.detach().cpu().numpy()
-            z_importance_samples = mx.array(z_importance_samples)
-
 
             z_vals_fine = mx.sort(mx.concatenate([z_vals, z_importance_samples], axis=-1), axis=-1) # [B, n_samples + n_importance_samples]
             
 
             
-            loss = step_fine(batch_rays, z_vals_fine, target_selected)
-            mx.eval(state_fine)
+            loss, mse_per_ray = step_fine(batch_rays, z_vals_fine, target_selected, weights_ray)
+            mx.async_eval(state_fine)
             # mx.enable_compile()
 
         # print(f"[DEBUG] iter={i:06d} \t | loss={loss.item()=:0.6f}")
 
-        list_iters.append(i)
-        list_losses.append(loss.item())
+        # NOTE: no host sync per step; per-ray errors & metrics stay on device, and are read every `i_print` steps
+        if sampler:
+            sampler.record(img_i, coords_np, mse_per_ray)
+        metrics.record(i, loss=loss, psnr=-10.0 * mx.log10(mx.mean(mse_per_ray)), **({"loss_scale": scaler.state["scale"]} if scaler else {}))
+        if i%args.i_print == 0:
+            if sampler:
+                sampler.flush()
+            metrics_reduced = metrics.reduce()
+            list_iters.extend(metrics_reduced["step"].tolist())
+            list_losses.extend(metrics_reduced["loss"].tolist())
+        wallclock += time.perf_counter() - tic
+
+        if is_main and i%args.i_print == 0:
+            # NOTE: loss & PSNR of rank 0's own rays; rays/sec over all ranks
+            rays_per_sec = distributed.get_size(group) * args.N_rand * len(metrics_reduced["step"]) / max(wallclock - wallclock_print, 1e-10)
+            wallclock_print = wallclock
+            print(f"[INFO] iter={i:06d} \t | loss={metrics_reduced['loss'].mean():0.6f}, PSNR={metrics_reduced['psnr'].mean():0.2f}, {rays_per_sec:.0f} rays/s" + (f", loss_scale={metrics_reduced['loss_scale'][-1]:g}" if scaler else ""))
+            prefetcher.report()
+            if args.log_psnr_wallclock:
+                evaluator.submit("rays", i, rays_val, target_val, wallclock=wallclock, path_log=path_log_psnr)
 
         # FIXME: learning failed w/ #iter=2k
         decay_rate = 0.1
@@ -305,38 +464,79 @@ def main(
         optimizer.learning_rate = new_lrate
 
 
-        if i%50000 != 0: continue
-        rgb, _, _, _ = render.render(
+        if not is_main:
+            continue
+
+        # NOTE: written on a worker thread, from state snapshotted here
+        if i%args.i_weights == 0:
+            checkpointer.save(i, render_kwargs_train["network_coarse"], render_kwargs_train["network_fine"], optimizer, state_numpy=state_numpy)
+
+        # NOTE: evaluation runs on a worker thread, from weights snapshotted here
+        if i%args.i_img == 0:
+            evaluator.submit("img", i, poses[i_val[:1]], images[i_val[:1]])
+        if i%args.i_testset == 0:
+            evaluator.submit("testset", i, poses[i_test[::args.testskip]], images[i_test[::args.testskip]])
+        if i%args.i_video == 0:
+            evaluator.submit("video", i, render_poses)
+
+    prefetcher.close()
+    if not is_main:
+        return
+    prefetcher.report()
+    evaluator.close()
+
+    # NOTE: final weights on disk, for render processes to load
+    if args.n_render_workers > 0 and i%args.i_weights != 0:
+        checkpointer.save(i, render_kwargs_train["network_coarse"], render_kwargs_train["network_fine"], optimizer, state_numpy=state_numpy)
+    checkpointer.close()
+
+    fig = plt.figure(figsize=(5, 4))
+    ax1 = fig.add_subplot(1, 1, 1)
+    ax1.set_title("Loss")
+    ax1.set_ylim(0, 1.0)
+    ax1.plot(list_iters, list_losses)
+    fig.savefig(os.path.join(basedir, expname, "loss.png"))
+
+    # NOTE: quantize MLPs for render-only workload, compared against full precision on test poses
+    if args.quantize_bits > 0:
+        bits_per_layer = quantize.parse_bits_per_layer(args.quantize_bits_per_layer)
+        render_kwargs_quantized = dict(render_kwargs_test)
+        for k in ["network_coarse", "network_fine"]:
+            if render_kwargs_test[k]:
+                render_kwargs_quantized[k] = quantize.quantize_NeRF(
+                    render_kwargs_test[k], 
+                    bits=args.quantize_bits, 
+                    bits_per_layer=bits_per_layer
+                )
+        renderer_quantized = CompiledRenderer(chunk=args.chunk, **render_kwargs_quantized)
+        quantize.compare_quantized(
+            renderer, 
+            renderer_quantized, 
             H, W, K, 
-            c2w=(testpose := mx.array(poses[len(poses)//2]))[:3, :4], 
-            **render_kwargs_test
+            poses[i_test[::args.testskip]], 
+            images[i_test[::args.testskip]]
         )
-        fig = plt.figure(figsize=(10, 4))
-        ax1 = fig.add_subplot(1, 2, 1)
-        ax1.set_title("Loss validation")
-        ax1.set_ylim(0, 1.0)
-        ax1.plot(list_iters, list_losses)
-        ax2 = fig.add_subplot(1, 2, 2)
-        
-        ax2.imshow(to8b(rgb))
-        fig.savefig(f"results/iter={i}.png")
-
-
+        renderer = renderer_quantized
 
     print(f"[DEBUG] saving video...")
-    writer = imageio.v2.get_writer(os.path.join("results", f"iter={i}.mp4"), fps=30)
-    for i in trange(render_poses.shape[0]):
-        render_pose = render_poses[i]
-        rgb, _, _, _ = render.render(
+    writer = FrameSink(os.path.join("results", f"iter={i}.mp4"), fps=30) # NOTE: encodes on a background thread
+    if args.n_render_workers > 0:
+        # NOTE: opt-in; workers load the final checkpoint (and quantize it likewise), frames are written in order as they arrive
+        args_render = copy(args)
+        args_render.ft_path = os.path.join(basedir, expname, f"{i:06d}.safetensors")
+        parallel.render_poses_parallel(
+            args_render, 
+            {k: render_kwargs_test[k] for k in ["near", "far", "ray_bounds"] if render_kwargs_test.get(k)}, 
             H, W, K, 
-            c2w=render_pose[:3, :4], 
-            **render_kwargs_test
-        )
-        writer.append_data(
-            onp.hstack([
-                to8b(rgb), 
-            ])
+            onp.array(render_poses), 
+            writer.append, 
+            n_workers=args.n_render_workers, 
+            device=args.render_workers_device, 
         )
+    else:
+        # NOTE: rays of all views packed into full chunks
+        for rgb, _, _, _ in tqdm(renderer.render_batch(H, W, K, render_poses), total=render_poses.shape[0]):
+            writer.append(rgb)
 
     writer.close()
     
@@ -5,7 +5,6 @@ from typing import List, Optional, Tuple, Union
 from PIL import Image
 
 
-import imageio.v2
 import imageio.v3
 import numpy as onp
 import mlx.core as mx
@@ -14,11 +13,11 @@ import mlx.optimizers as optim
 import viser
 import viser.extras
 import viser.transforms as tf
-from imageio.core.format import Format
 from tqdm.auto import tqdm
 
 from this_project import get_project_root, PJ_PINK
 from mlx_nerf.encoding.sinusoidal import SinusoidalEncoding
+from mlx_nerf.engine.video import FrameSink
 from mlx_nerf.models.NeRF import NeRF
 from mlx_nerf.ops.metric import MSE
 
@@ -28,7 +27,7 @@ class GUIItem:
     slider_iter: Optional[viser.GuiInputHandle] = None
     idx_iter = 0
 
-    writer: Optional[Format.Writer] = None
+    writer: Optional[FrameSink] = None # NOTE: encodes on a background thread
 
     img_gt = None
     img_pred = None
@@ -43,7 +42,7 @@ def toggle_learning() -> None:
 
     if gui_items.is_learning:
         # NOTE: toggled on
-        gui_items.writer = imageio.v2.get_writer(os.path.join("results", f"learning.mp4"), fps=60)
+        gui_items.writer = FrameSink(os.path.join("results", f"learning.mp4"), fps=60)
         gui_items.img_pred = get_mx_img_pred(gui_items.img_gt.shape)
     else:
         # NOTE: toggled off - reset
@@ -307,7 +306,7 @@ def main(
             gui_items.slider_iter.value += 1
 
             assert not None is gui_items.writer
-            gui_items.writer.append_data(
+            gui_items.writer.append(
                 onp.hstack([
                     img_gt_vis, 
                     img_pred_vis,
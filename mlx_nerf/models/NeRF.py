@@ -1,21 +1,28 @@
+import math
+import os
 from copy import deepcopy
+from functools import partial
 
 import mlx.core as mx
 import mlx.nn as nn
 import mlx.optimizers as optim
 
+from mlx_nerf.engine import checkpoint, mixed_precision
 from mlx_nerf.models import embedding
 from mlx_nerf.rendering.render import render_rays, render_rays_eval
 
-def inference_wrapper_batch(model, chunk):
+def inference_wrapper_batch(model, chunk, **kwargs):
 
     if chunk is None:
-        return model
+        return partial(model.forward, **kwargs)
     
     def __batched_model_inference(inputs_embedded):
+        # NOTE: single chunk; no need to build a list & concatenate
+        if inputs_embedded.shape[0] <= chunk:
+            return model.forward(inputs_embedded, **kwargs)
         return mx.concatenate(
             [
-                model.forward(inputs_embedded[i:i+chunk])
+                model.forward(inputs_embedded[i:i+chunk], **kwargs)
                 for i in range(0, inputs_embedded.shape[0], chunk)
             ], axis=0
         )
@@ -26,17 +33,21 @@ def run_model(
     pos, embed_pos, 
     dir, embed_dir, 
     model, 
-    netchunk = 64*1024
+    netchunk = 64*1024, 
+    is_checkpoint = None, # NOTE: overrides `model.is_checkpoint` if given
+    is_density_only = False, # NOTE: raw density [B, n, 1] only, e.g., for mesh extraction; `dir` is ignored
 ):
     assert len(pos.shape) == 3, f"[ERROR] {pos.shape=} should have dimensions as: [n_rays, n_depth_samples, 3d position]!"
     B = pos.shape[0]; n=pos.shape[1]
     # NOTE: embed `pos` & `dir`, and concatenate
     # TODO: dimension mismatch: pos=[B, n, c] != dir=[B, c]
     # TODO: or check if it's OK as `dirs_flat` becomes shape with `pos_flat` by `embedding.embed`
-    inputs_embedded = embedding.embed(pos, embed_pos, dir, embed_dir)
+    inputs_embedded = embedding.embed(pos, embed_pos, None if is_density_only else dir, embed_dir)
+    # NOTE: sinusoids are evaluated in fp32 as high frequencies lose precision in half, then cast to MLP's precision
+    inputs_embedded = inputs_embedded.astype(getattr(model, "compute_dtype", mx.float32))
 
     # NOTE: batched inference & concatenate per batch
-    outputs_flat = inference_wrapper_batch(model, netchunk)(inputs_embedded)
+    outputs_flat = inference_wrapper_batch(model, netchunk, is_checkpoint=is_checkpoint, is_density_only=is_density_only)(inputs_embedded)
     
     # NOTE: reshape `outputs_flat` to have shape of `inputs_embedded`
     # TODO: double-check shape
@@ -51,6 +62,8 @@ def run_model(
 def create_NeRF(args):
     """
     Returns coarse (& fine) NeRF models
+
+    NOTE: with `args.render_only`, weights are loaded lazily from the checkpoint without evaluating random init, and no optimizer is created
     """
 
     # TODO: refactor `args`
@@ -72,11 +85,13 @@ def create_NeRF(args):
     embedder_dir, channel_emb_dir = embedding.get_embedder(octave_dir) if is_use_dir else (None, None)
 
     # NOTE: define query function that internally batches
-    network_query_fn = lambda inputs, viewdirs, model: run_model(
+    # NOTE: `netchunk` is read from `args` on every call, unless overridden (e.g., when probing chunk sizes)
+    network_query_fn = lambda inputs, viewdirs, model, netchunk=None, is_density_only=False: run_model(
         inputs, embedder_pos, 
         viewdirs, embedder_dir, 
         model, 
-        netchunk=args.netchunk
+        netchunk=netchunk if netchunk else args.netchunk, 
+        is_density_only=is_density_only, 
     )
 
     # NOTE: coarse NeRF
@@ -90,9 +105,10 @@ def create_NeRF(args):
         channel_output=output_ch, 
         list_skip_connection_layers=skips, 
         channel_input_views=channel_emb_dir, 
-        is_use_view_directions=is_use_dir
+        is_use_view_directions=is_use_dir, 
+        precision=args.precision, 
+        is_checkpoint=args.checkpoint_mlp, 
     )
-    mx.eval(model_coarse.parameters())
     # print(f"[DEBUG] {model_coarse=}")
     # fmt: on
 
@@ -108,21 +124,42 @@ def create_NeRF(args):
         channel_output=output_ch, 
         list_skip_connection_layers=skips, 
         channel_input_views=channel_emb_dir, 
-        is_use_view_directions=is_use_dir
+        is_use_view_directions=is_use_dir, 
+        precision=args.precision, 
+        is_checkpoint=args.checkpoint_mlp, 
     ) if n_importance_samples > 0 else None
     # fmt: on
-    if model_fine:
-        mx.eval(model_fine.parameters())
-        # print(f"[DEBUG] {model_fine=}")
-        pass
-
-    # FIXME: `mx.optimizers` does not accept `params`!
-    optimizer = optim.Adam(learning_rate=learning_rate, betas=(0.9, 0.999))
 
-    # TODO: load state here
+    # NOTE: resume from `ft_path`, or from the latest checkpoint of the experiment unless `no_reload`
     idx_iter = 0
-
-    # TODO: load state here
+    optimizer = None
+    path_ckpt = checkpoint.find_checkpoint(
+        os.path.join(args.basedir, args.expname) if args.expname else args.basedir, 
+        args.ft_path, 
+        args.no_reload
+    )
+    if args.render_only and path_ckpt:
+        # NOTE: random init is lazy and replaced before ever being evaluated
+        idx_iter = checkpoint.load_render_weights(path_ckpt, model_coarse, model_fine)
+        # NOTE: reads network tensors only; lazy loads must not end up inside compiled renderers' graphs
+        mx.eval(model_coarse.parameters(), model_fine.parameters() if model_fine else [])
+    else:
+        if args.render_only:
+            print(f"[WARNING] no checkpoint to render from, rendering randomly initialized networks")
+        mx.eval(model_coarse.parameters())
+        if model_fine:
+            mx.eval(model_fine.parameters())
+            # print(f"[DEBUG] {model_fine=}")
+
+    if not args.render_only:
+        # FIXME: `mx.optimizers` does not accept `params`!
+        optimizer = optim.Adam(learning_rate=learning_rate, betas=(0.9, 0.999))
+
+        # NOTE: optimizer state in its final tree from the start, so that fresh & resumed runs trace compiled steps alike
+        optimizer.init(model_coarse.trainable_parameters())
+
+        if path_ckpt:
+            idx_iter = checkpoint.load_checkpoint(path_ckpt, model_coarse, model_fine, optimizer)
 
     # NOTE: train arguments
     render_kwargs_train = {
@@ -157,6 +194,38 @@ def create_NeRF(args):
 
     return render_kwargs_train, render_kwargs_test, idx_iter, optimizer
 
+class SplitLinear(nn.Module):
+    """
+    Linear layer applied to a concatenation `[x_a, x_b]`, but with its weight kept pre-split as `[W_a, W_b]`, 
+    so that `W_a @ x_a + W_b @ x_b + b` is computed without materializing the concatenated input.
+
+    NOTE: initialized with the same distribution as `nn.Linear(channel_input_a+channel_input_b, channel_output)`
+    """
+    def __init__(
+        self, 
+        channel_input_a: int, 
+        channel_input_b: int, 
+        channel_output: int, 
+    ):
+        super().__init__()
+
+        scale = math.sqrt(1.0 / (channel_input_a + channel_input_b))
+        self.weight_a = mx.random.uniform(low=-scale, high=scale, shape=(channel_output, channel_input_a))
+        self.weight_b = mx.random.uniform(low=-scale, high=scale, shape=(channel_output, channel_input_b))
+        self.bias = mx.random.uniform(low=-scale, high=scale, shape=(channel_output,))
+
+        return
+
+    def __call__(self, x_a, x_b):
+        return x_a @ self.weight_a.T + x_b @ self.weight_b.T + self.bias
+
+    @staticmethod
+    def split_weight(weight, channel_input_a: int):
+        """
+        Splits a concatenated `nn.Linear` weight [out, a+b] into [out, a] & [out, b]
+        """
+        return weight[:, :channel_input_a], weight[:, channel_input_a:]
+
 class NeRF(nn.Module):
     def __init__(
         self, 
@@ -167,6 +236,8 @@ class NeRF(nn.Module):
         channel_output=4,
         list_skip_connection_layers=[4], 
         is_use_view_directions=False, # NOTE: used when no views are given (say, image evaluation)
+        precision="fp32", # NOTE: "bf16"/"fp16" for mixed precision, see `mixed_precision.DTYPES`; weights are kept in fp32
+        is_checkpoint=False, # NOTE: gradient checkpointing of position layers, per block split at skip connections
     ):
         super().__init__()
 
@@ -176,6 +247,8 @@ class NeRF(nn.Module):
         self.channel_input_dir = channel_input_views
         self.list_skip_connection_layers = list_skip_connection_layers
         self.is_use_view_directions = is_use_view_directions
+        self.precision = precision # NOTE: by name, as `mx.Dtype` is not picklable and models are deepcopied (e.g., `quantize_NeRF(...)`)
+        self.is_checkpoint = is_checkpoint
 
         # NOTE: layers
         # fmt: off
@@ -183,13 +256,13 @@ class NeRF(nn.Module):
             nn.Linear(channel_input, width_layers)
         ] + [
             nn.Linear(width_layers, width_layers) if i not in self.list_skip_connection_layers else
-            nn.Linear(width_layers+channel_input, width_layers)
+            SplitLinear(channel_input, width_layers, width_layers) # NOTE: skip connection; [input_pos, h]
             for i in range(n_layers-1)
         ]
         # fmt: on
 
         if self.is_use_view_directions:
-            self.list_linears_dir = [nn.Linear(width_layers+channel_input_views, width_layers//2)]
+            self.list_linears_dir = [SplitLinear(width_layers, channel_input_views, width_layers//2)] # NOTE: [feature, input_dir]
             self.feature_linear = nn.Linear(width_layers, width_layers) # NOTE: last layer
             self.alpha_linear = nn.Linear(width_layers, 1)
             self.rgb_linear = nn.Linear(width_layers//2, 3)
@@ -197,12 +270,24 @@ class NeRF(nn.Module):
             self.output_linear = nn.Linear(width_layers, channel_output)
 
         return
+
+    @property
+    def compute_dtype(self) -> mx.Dtype:
+        return mixed_precision.DTYPES[self.precision]
     
     def forward(
         self, 
-        x # NOTE: encoded
+        x, # NOTE: encoded
+        is_checkpoint=None, # NOTE: overrides `self.is_checkpoint` if given
+        is_density_only=False, # NOTE: `x` of positions only; returns raw density [..., 1] without evaluating color layers
     ):
 
+        if is_density_only:
+            h = self.forward_positions(x[..., :self.channel_input_pos], is_checkpoint)
+            if self.is_use_view_directions:
+                return self.linear(self.alpha_linear, h)
+            return self.linear(self.output_linear, h)[..., 3:4]
+
         if self.is_use_view_directions:
             list_pos_dir = mx.split(
                 x, 
@@ -215,29 +300,122 @@ class NeRF(nn.Module):
             input_pos = x
 
         # NOTE: forwarding positions
-        h = input_pos
-        for idx, layer_pos in enumerate(self.list_linears_pos):
-
-            h = layer_pos(h)
-            h = nn.relu(h)
-
-            if idx in self.list_skip_connection_layers:
-                h = mx.concatenate([input_pos, h], axis=-1) # NOTE: skip connection
+        h = self.forward_positions(input_pos, is_checkpoint)
 
         # NOTE: forwarding directions
         # NOTE: refactor to be more readable
         if self.is_use_view_directions:
-            alpha = self.alpha_linear(h)
-            feature = self.feature_linear(h)
-            h = mx.concatenate([feature, input_dir], axis=-1)
+            alpha = self.linear(self.alpha_linear, h)
+            feature = self.linear(self.feature_linear, h)
 
             for idx, layer_dir in enumerate(self.list_linears_dir):
-                h = layer_dir(h)
+                h = self.linear(layer_dir, feature, input_dir) if 0 == idx else self.linear(layer_dir, h) # NOTE: without concatenating `[feature, input_dir]`
                 h = nn.relu(h)
 
-            rgb = self.rgb_linear(h)
+            rgb = self.linear(self.rgb_linear, h)
             outputs = mx.concatenate([rgb, alpha], axis=-1)
         else:
-            outputs = self.output_linear(h)
+            outputs = self.linear(self.output_linear, h)
+
+        return outputs
+
+    def forward_positions(self, input_pos, is_checkpoint=None):
+        """
+        Forwards `input_pos` through all position layers, with gradient checkpointing if enabled
+        """
+
+        h = input_pos
+        is_checkpoint = self.is_checkpoint if None is is_checkpoint else is_checkpoint
+        if is_checkpoint:
+            # NOTE: only block inputs are kept; activations inside each block are recomputed in backward
+            for idx_from, idx_to in self.get_trunk_blocks():
+                h = self.checkpoint(
+                    self.list_linears_pos[idx_from:idx_to], 
+                    partial(self.forward_trunk, idx_from=idx_from, idx_to=idx_to)
+                )(input_pos, h)
+        else:
+            h = self.forward_trunk(input_pos, h)
+
+        return h
+
+    def forward_trunk(self, input_pos, h, idx_from=0, idx_to=None):
+        """
+        Forwards `h` through position layers [`idx_from`, `idx_to`)
+        """
+
+        for layer_pos in self.list_linears_pos[idx_from:idx_to]:
+
+            if isinstance(layer_pos, SplitLinear):
+                h = self.linear(layer_pos, input_pos, h) # NOTE: skip connection, without concatenating `[input_pos, h]`
+            else:
+                h = self.linear(layer_pos, h)
+            h = nn.relu(h)
+
+        return h
+
+    def get_trunk_blocks(self):
+        """
+        Returns [`idx_from`, `idx_to`) of position layers, split before each skip connection
+        """
+
+        list_boundaries = [0] + [
+            idx for idx, layer_pos in enumerate(self.list_linears_pos)
+            if isinstance(layer_pos, SplitLinear)
+        ] + [len(self.list_linears_pos)]
+
+        return list(zip(list_boundaries[:-1], list_boundaries[1:]))
+
+    def checkpoint(self, layers, fn):
+        """
+        Same as `nn.utils.checkpoint`, but w.r.t. parameters of given `layers` only
+        """
+
+        def __inner_fn(params, *args):
+            for layer, p in zip(layers, params):
+                layer.update(p)
+            return fn(*args)
+
+        checkpointed_fn = mx.checkpoint(__inner_fn)
+
+        return lambda *args: checkpointed_fn([layer.trainable_parameters() for layer in layers], *args)
+
+    def linear(self, layer, *inputs):
+        """
+        Applies `layer` in `self.compute_dtype`; weights are cast on the fly, so gradients flow into fp32 master weights (autocast)
+        """
+
+        dtype = self.compute_dtype
+        if dtype == mx.float32 or not isinstance(layer, (nn.Linear, SplitLinear)): # NOTE: e.g., `nn.QuantizedLinear`
+            return layer(*inputs)
+
+        if isinstance(layer, SplitLinear):
+            x_a, x_b = inputs
+            return x_a @ layer.weight_a.astype(dtype).T + x_b @ layer.weight_b.astype(dtype).T + layer.bias.astype(dtype)
+
+        return inputs[0] @ layer.weight.astype(dtype).T + layer.bias.astype(dtype)
+
+    def load_weights(self, file_or_weights, strict: bool = True):
+        """
+        Loads weights, including checkpoints saved before the skip & direction layers were pre-split
+        """
+
+        weights = mx.load(file_or_weights) if isinstance(file_or_weights, str) else dict(file_or_weights)
+        weights = self.split_legacy_weights(weights)
+
+        return super().load_weights(list(weights.items()), strict=strict)
+
+    def split_legacy_weights(self, weights: dict):
+        """
+        Converts concatenated `{name}.weight` of each `SplitLinear` into `{name}.weight_a` & `{name}.weight_b`
+        """
+
+        weights = dict(weights)
+        for name, module in self.named_modules():
+            if not isinstance(module, SplitLinear) or f"{name}.weight" not in weights:
+                continue
+            weights[f"{name}.weight_a"], weights[f"{name}.weight_b"] = SplitLinear.split_weight(
+                weights.pop(f"{name}.weight"), 
+                module.weight_a.shape[-1]
+            )
 
-        return outputs
\ No newline at end of file
+        return weights
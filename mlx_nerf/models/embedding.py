@@ -49,7 +49,8 @@ class Embedder:
             ) ** 2.0
         else:
             raise NotImplementedError
-        for freq in freq_bands:
+        # NOTE: as python scalars; lazy `mx.array` slices are bound to the stream of the creating thread, i.e., unusable by background renderers
+        for freq in freq_bands.tolist():
             for periodic_func in self.kwargs["periodic_funcs"]:
                 list_embedding_funcs.append(
                     lambda x, periodic_func=periodic_func, freq=freq: periodic_func(x * freq)
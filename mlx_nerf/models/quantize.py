@@ -0,0 +1,136 @@
+"""### quantize.py
+###### in `mlx_nerf/models`
+
+Post-training weight quantization of `NeRF` linears into `nn.QuantizedLinear`, for render-only workloads.
+
+NOTE: `mx.quantize` groups weights along input channels,
+NOTE: hence layers whose input channels are not divisible by `group_size` (e.g., the first layer & skip connection with 63 embedded channels) are kept in full precision.
+"""
+
+import time
+from copy import deepcopy
+from typing import Callable, Dict, Optional
+
+import numpy as onp
+import mlx.core as mx
+import mlx.nn as nn
+
+from mlx_nerf.ops.metric import PSNR
+
+
+def parse_bits_per_layer(text: Optional[str]) -> Dict[str, int]:
+    """
+    Parses per-layer bit-widths, e.g., `"alpha_linear=8,rgb_linear=8,list_linears_pos=4"`
+
+    Keys are module path prefixes; set 0 to keep a layer in full precision
+    """
+
+    if not text:
+        return {}
+
+    bits_per_layer = {}
+    for item in text.split(","):
+        path, bits = item.split("=")
+        bits_per_layer[path.strip()] = int(bits)
+
+    return bits_per_layer
+
+def get_bits(path: str, bits: int, bits_per_layer: Dict[str, int]) -> int:
+    """
+    Returns bit-width of the longest prefix in `bits_per_layer` matching `path`, otherwise `bits`
+    """
+
+    list_prefixes = [
+        prefix for prefix in bits_per_layer
+        if path == prefix or path.startswith(prefix + ".")
+    ]
+    if not list_prefixes:
+        return bits
+
+    return bits_per_layer[max(list_prefixes, key=len)]
+
+def quantize_NeRF(
+    model: nn.Module, 
+    bits: int = 8, 
+    group_size: int = 64, 
+    bits_per_layer: Optional[Dict[str, int]] = None, 
+) -> nn.Module:
+    """
+    Returns a copy of `model` whose linears are replaced by `nn.QuantizedLinear`s
+    """
+
+    model = deepcopy(model)
+    bits_per_layer = bits_per_layer if bits_per_layer else {}
+
+    dict_bits = {
+        path: get_bits(path, bits, bits_per_layer)
+        for path, module in model.named_modules()
+        if isinstance(module, nn.Linear) and module.weight.shape[-1] % group_size == 0
+    }
+
+    # NOTE: quantize layers sharing bit-width at once
+    for b in sorted(set(dict_bits.values())):
+        if b <= 0:
+            continue
+        nn.quantize(
+            model, 
+            group_size=group_size, 
+            bits=b, 
+            class_predicate=lambda path, module, b=b: isinstance(module, nn.Linear) and dict_bits.get(path) == b
+        )
+    mx.eval(model.parameters())
+
+    return model
+
+def benchmark_renderer(
+    renderer: Callable, # NOTE: e.g., `CompiledRenderer` or `partial(render.render, **render_kwargs)`
+    H, 
+    W, 
+    K, 
+    poses, # NOTE: [N, 4, 4]
+    images=None, # NOTE: [N, H, W, 3]
+):
+    """
+    Returns rendered rays/sec, and mean PSNR against `images` if given
+
+    NOTE: the first pose is rendered twice, to exclude compilation from timing
+    """
+
+    mx.eval(renderer(H, W, K, c2w=mx.array(poses[0])[:3, :4])[0])
+
+    list_psnrs = []
+    elapsed = 0.0
+    for idx in range(len(poses)):
+        tic = time.perf_counter()
+        rgb, _, _, _ = renderer(H, W, K, c2w=mx.array(poses[idx])[:3, :4])
+        mx.eval(rgb)
+        elapsed += time.perf_counter() - tic
+
+        if images is not None:
+            list_psnrs.append(PSNR()(rgb, mx.array(images[idx])).item())
+
+    rays_per_sec = len(poses) * H * W / elapsed
+    psnr = float(onp.mean(list_psnrs)) if list_psnrs else None
+
+    return rays_per_sec, psnr
+
+def compare_quantized(
+    renderer: Callable, 
+    renderer_quantized: Callable, 
+    H, 
+    W, 
+    K, 
+    poses, 
+    images=None, 
+):
+    """
+    Prints render throughput & PSNR of quantized renderer against full precision one
+    """
+
+    rays_per_sec, psnr = benchmark_renderer(renderer, H, W, K, poses, images)
+    rays_per_sec_q, psnr_q = benchmark_renderer(renderer_quantized, H, W, K, poses, images)
+
+    print(f"[INFO] fp32: {rays_per_sec:.1f} rays/sec, PSNR={psnr}")
+    print(f"[INFO] quantized: {rays_per_sec_q:.1f} rays/sec ({rays_per_sec_q/rays_per_sec:.2f}x), PSNR={psnr_q}")
+
+    return (rays_per_sec, psnr), (rays_per_sec_q, psnr_q)
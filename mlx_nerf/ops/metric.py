@@ -19,6 +19,12 @@ class PSNR:
     
 class SSIM:
     def __call__(self, pred, gt, w_size=11, size_average=True, full=False):
+        """
+        `pred` & `gt` are [H, W, C] or [N, H, W, C]
+        """
+
+        if pred.ndim == 3:
+            pred, gt = pred[None], gt[None]
         
         # NOTE: set boundary values
         _max = 255 if mx.max(pred) > 128 else 1
@@ -27,37 +33,47 @@ class SSIM:
         c1 = ((k1 := 0.01) * L) ** 2
         c2 = ((k2 := 0.03) * L) ** 2
 
-        _, channel, height, width = pred.size()
-        window = self.create_window(w_size, channel)# TODO: find out equivalent of .to(pred.device)
+        _, height, width, channel = pred.shape
+        window = self.create_window(min(w_size, height, width), channel)
 
         NO_PAD = 0
-        mean_pred = nn.Conv2d(pred, window, padding=NO_PAD, 
-                            #   groups=channel
-                              )
-        mean_gt = nn.Conv2d(gt, window, padding=NO_PAD)
-        mean_pred_sq = mean_pred.pow(2)
-        mean_gt_sq = mean_gt.pow(2)
+        conv = lambda x: mx.conv2d(x, window, padding=NO_PAD, groups=channel) # NOTE: per-channel gaussian blur
+        mean_pred = conv(pred)
+        mean_gt = conv(gt)
+        mean_pred_sq = mean_pred ** 2
+        mean_gt_sq = mean_gt ** 2
         mean_pred_gt = mean_pred * mean_gt
 
-        sigma_pred_sq = nn.Conv2d(pred*pred, window, padding=NO_PAD) - mean_pred_sq
-        sigma_gt_sq = nn.Conv2d(gt*gt, window, padding=NO_PAD) - mean_gt_sq
-        cross_correlation = nn.Conv2d(pred*gt, window, padding=NO_PAD) - mean_pred_gt
+        sigma_pred_sq = conv(pred*pred) - mean_pred_sq
+        sigma_gt_sq = conv(gt*gt) - mean_gt_sq
+        cross_correlation = conv(pred*gt) - mean_pred_gt
+
+        v1 = 2.0 * cross_correlation + c2
+        v2 = sigma_pred_sq + sigma_gt_sq + c2
+        cs = mx.mean(v1 / v2) # NOTE: contrast sensitivity
+        ssim_map = ((2 * mean_pred_gt + c1) * v1) / ((mean_pred_sq + mean_gt_sq + c1) * v2)
 
-        # TODO
+        ret = mx.mean(ssim_map) if size_average else mx.mean(ssim_map, axis=(1, 2, 3))
 
+        if full:
+            return ret, cs
+        return ret
 
     def create_window(self, w_size, channel):
+        """
+        Returns gaussian window [channel, w_size, w_size, 1], for `mx.conv2d(..., groups=channel)`
+        """
 
-        _1D_window = self.gaussian(w_size, 1.5).unsqueeze(1)
-        _2D_window = _1D_window.mm(_1D_window.t()).float().unsqueeze(0).unsqueeze(0)
+        _1D_window = self.gaussian(w_size, 1.5)
+        _2D_window = _1D_window[:, None] * _1D_window[None, :]
         
-        window = _2D_window.expand(channel, 1, w_size, w_size).contiguous()
+        window = mx.broadcast_to(_2D_window[None, :, :, None], (channel, w_size, w_size, 1))
         return window
     
     def gaussian(self, w_size, sigma):
 
         gaussian = mx.array([
-            math.exp(-(x - w_size//2) ** 2) / float(2*sigma ** 2)
+            math.exp(-(x - w_size//2) ** 2 / float(2*sigma ** 2))
             for x in range(w_size)
         ])
 
@@ -0,0 +1,256 @@
+"""### adaptive.py
+###### in `mlx_nerf/rendering`
+
+Tile-based adaptive fine sampling within a fixed per-frame sample budget.
+
+The coarse pass runs on every pixel, as usual; it is the cheap first pass. Each `tile`×`tile` block of pixels then gets a complexity score
+from the coarse pass, and the frame's budget of fine samples (`budget_ratio` × `H*W*N_importance`) goes to tiles in proportion to their scores,
+e.g., flat background tiles keep their coarse result, and detailed edges get up to twice `N_importance`.
+
+Per-tile sample counts are quantized to a few `levels`, hence fine passes see a handful of shapes (compile- and cache-friendly),
+and rays of all tiles of a level are rendered together in full chunks.
+
+Execution flow:
+    1. render_adaptive(...)
+        - batchify_rays(...)            (coarse, every pixel)
+    2. score_tiles(...)                 (coarse rgb variance & opacity per tile)
+    3. allocate_samples(...)            (budget to per-tile levels)
+    4. sample_importance_z(...) & render_rays_fine(...)     (per level)
+
+Equal-quality benchmark (uniform `N_importance` against adaptive budgets, on test views):
+    python -m mlx_nerf.rendering.adaptive --config {config} --ft_path {checkpoint} --list_budget_ratios 0.125 0.25 0.5
+"""
+
+import time
+from typing import List, Sequence
+
+import numpy as onp
+import mlx.core as mx
+
+from mlx_nerf.rendering.render import (
+    batchify_rays, 
+    build_rays, 
+    render_rays, 
+    render_rays_fine, 
+    sample_importance_z, 
+)
+
+
+def get_tile_ids(H: int, W: int, tile: int):
+    """
+    Returns tile id per pixel [H*W] in row-major order (onp), and the number of tiles
+    """
+
+    n_tiles_x = -(-W // tile)
+    rows, cols = onp.meshgrid(onp.arange(H) // tile, onp.arange(W) // tile, indexing="ij")
+
+    return (rows * n_tiles_x + cols).reshape(-1), -(-H // tile) * n_tiles_x
+
+def score_tiles(
+    rgb, # NOTE: coarse rgb [H*W, 3] (onp)
+    acc, # NOTE: coarse opacity [H*W] (onp)
+    tile_ids, # NOTE: [H*W], from `get_tile_ids(...)`
+    n_tiles: int, 
+    w_opacity: float = 0.05, 
+):
+    """
+    Per-tile complexity [n_tiles] (onp): std of coarse rgb, plus semi-transparency `acc*(1-acc)`, plus `w_opacity` × opacity
+
+    NOTE: the opacity term gives flat but opaque tiles a few fine samples; empty tiles score 0 and keep their coarse result
+    """
+
+    n_pixels = onp.bincount(tile_ids, minlength=n_tiles).astype(onp.float64)
+    def __mean(x):
+        return onp.bincount(tile_ids, weights=x, minlength=n_tiles) / n_pixels
+
+    var_rgb = sum(
+        onp.maximum(__mean(rgb[:, c] ** 2) - __mean(rgb[:, c]) ** 2, 0.0)
+        for c in range(3)
+    ) / 3.0
+
+    return onp.sqrt(var_rgb) + __mean(acc * (1.0 - acc)) + w_opacity * __mean(acc)
+
+def allocate_samples(
+    scores, # NOTE: [n_tiles] (onp)
+    n_pixels, # NOTE: pixels per tile [n_tiles] (onp)
+    budget: int, # NOTE: fine samples per frame
+    levels: Sequence[int], # NOTE: allowed samples per ray, ascending, incl. 0
+):
+    """
+    Returns fine samples per ray of each tile [n_tiles] (onp), with `sum(n_samples * n_pixels) <= budget`
+
+    Tiles get the largest level not above their share of `budget`, proportional to score;
+    the remainder of the budget then upgrades tiles by one level in order of score, while it fits.
+    """
+
+    levels = onp.asarray(sorted(levels))
+    scores = onp.asarray(scores, dtype=onp.float64)
+    total = onp.sum(scores * n_pixels)
+    if total <= 0.0:
+        return onp.zeros_like(scores, dtype=onp.int64)
+
+    target = budget * scores / total
+    idx_level = onp.searchsorted(levels, target, side="right") - 1
+    idx_level = onp.clip(idx_level, 0, len(levels)-1)
+
+    remaining = budget - onp.sum(levels[idx_level] * n_pixels)
+    for idx_tile in onp.argsort(-scores, kind="stable"):
+        if scores[idx_tile] <= 0.0:
+            break
+        if idx_level[idx_tile] + 1 >= len(levels):
+            continue
+        cost = (levels[idx_level[idx_tile] + 1] - levels[idx_level[idx_tile]]) * n_pixels[idx_tile]
+        if cost <= remaining:
+            idx_level[idx_tile] += 1
+            remaining -= cost
+
+    return levels[idx_level]
+
+def render_adaptive(
+    H: int, 
+    W: int, 
+    K, 
+    c2w, # NOTE: [3 or 4, 4]
+    render_kwargs: dict, # NOTE: e.g., `render_kwargs_test` with `near` & `far`
+    budget_ratio: float = 0.5, # NOTE: fine samples per frame, relative to `N_importance` on every pixel
+    tile: int = 16, 
+    levels: Sequence[float] = (0.0, 0.25, 0.5, 1.0, 2.0), # NOTE: allowed samples per ray, relative to `N_importance`
+    chunk: int = 1024*32, 
+    is_uniform: bool = False, # NOTE: `N_importance` on every pixel, i.e., `render.render(...)`; a baseline
+):
+    """
+    Same as `render.render(...)` of a single view, but with fine samples allocated per tile
+
+    Returns `[rgb_map, disp_map, acc_map, extras]`, with `extras["n_importance"]` the fine samples per pixel [H, W] (onp)
+
+    NOTE: `ray_bounds` is not supported
+    """
+
+    kwargs = dict(render_kwargs)
+    N_importance = kwargs.get("N_importance", 0)
+    rays, rays_shape = build_rays(H, W, K, c2w=mx.array(c2w)[:3, :4], **kwargs)
+    n_rays = rays.shape[0]
+
+    # NOTE: coarse, on every pixel
+    ret = batchify_rays(rays, chunk, **{**kwargs, "render_rays_func": render_rays})
+    rgb, disp, acc = ret["rgb_map"], ret["disp_map"], ret["acc_map"]
+    mx.eval(rgb, disp, acc, ret["z_vals"], ret["weights"])
+
+    tile_ids, n_tiles = get_tile_ids(H, W, tile)
+    if is_uniform:
+        n_samples_tile = onp.full([n_tiles], N_importance)
+    else:
+        scores = score_tiles(onp.array(rgb), onp.array(acc)[:, 0], tile_ids, n_tiles)
+        n_samples_tile = allocate_samples(
+            scores, 
+            onp.bincount(tile_ids, minlength=n_tiles), 
+            int(budget_ratio * n_rays * N_importance), 
+            sorted({int(round(level * N_importance)) for level in levels} | {0}), 
+        )
+    n_samples = n_samples_tile[tile_ids] # NOTE: [H*W]
+
+    # NOTE: fine, per level; rays of the level are rendered together
+    for n_level in onp.unique(n_samples):
+        if n_level <= 0:
+            continue
+        idx_rays = onp.nonzero(n_samples == n_level)[0]
+        for i in range(0, idx_rays.size, chunk):
+            idx_chunk = mx.array(idx_rays[i:i+chunk])
+            z_vals = sample_importance_z(ret["z_vals"][idx_chunk], ret["weights"][idx_chunk], int(n_level))
+            ret_fine = render_rays_fine(rays[idx_chunk], z_vals, **kwargs)
+            rgb[idx_chunk] = ret_fine["rgb_map"]
+            disp[idx_chunk] = ret_fine["disp_map"]
+            acc[idx_chunk] = ret_fine["acc_map"]
+            mx.eval(rgb, disp, acc)
+
+    shape = list(rays_shape[:-1])
+    return [
+        mx.reshape(rgb, shape + [3]), 
+        mx.reshape(disp, shape + [1]), 
+        mx.reshape(acc, shape + [1]), 
+        {"n_importance": n_samples.reshape(shape)}, 
+    ]
+
+def benchmark(
+    render_kwargs: dict, 
+    H: int, 
+    W: int, 
+    K, 
+    poses, # NOTE: [N, 4, 4]
+    images, # NOTE: [N, H, W, 3]
+    list_budget_ratios: List[float], 
+    tile: int = 16, 
+    chunk: int = 1024*32, 
+    tolerance: float = 0.05, # NOTE: PSNR (dB) below uniform still counted as equal quality
+) -> dict:
+    """
+    Renders `poses` with uniform `N_importance`, and adaptively with each of `list_budget_ratios`;
+    prints PSNR, time & fine samples per frame, and the speedup of the cheapest adaptive budget of equal quality
+    """
+
+    from mlx_nerf.ops.metric import PSNR
+
+    results = {}
+    for name, budget_ratio in [("uniform", 1.0)] + [(f"adaptive {r:g}", r) for r in list_budget_ratios]:
+        list_psnr, n_samples, elapsed = [], 0, 0.0
+        for c2w, image in zip(poses, images):
+            tic = time.perf_counter()
+            rgb, _, _, extras = render_adaptive(
+                H, W, K, c2w, render_kwargs, 
+                budget_ratio=budget_ratio, 
+                tile=tile, 
+                chunk=chunk, 
+                is_uniform="uniform" == name, 
+            )
+            mx.eval(rgb)
+            elapsed += time.perf_counter() - tic
+            list_psnr.append(PSNR()(rgb, mx.array(image)).item())
+            n_samples += int(extras["n_importance"].sum())
+        results[name] = (float(onp.mean(list_psnr)), elapsed / len(poses), n_samples / len(poses))
+
+    print(f"[INFO] {'mode':>16} {'PSNR':>7} {'sec/frame':>10} {'fine samples/frame':>19}")
+    for name, (psnr, sec, n_samples) in results.items():
+        print(f"[INFO] {name:>16} {psnr:>7.2f} {sec:>10.2f} {n_samples:>19.0f}")
+
+    psnr_uniform, sec_uniform, _ = results["uniform"]
+    list_equal = [
+        (sec, name) for name, (psnr, sec, _) in results.items()
+        if "uniform" != name and psnr >= psnr_uniform - tolerance
+    ]
+    if list_equal:
+        sec, name = min(list_equal)
+        print(f"[INFO] equal quality (within {tolerance} dB): {name}, {sec_uniform/sec:.2f}x faster than uniform")
+    else:
+        print(f"[WARNING] no adaptive budget within {tolerance} dB of uniform; raise `--list_budget_ratios`")
+
+    return results
+
+if __name__ == "__main__":
+    from mlx_nerf import config_parser
+    from mlx_nerf.dataset.dataloader import load_blender_data, post_load_blender_data
+    from mlx_nerf.models.NeRF import create_NeRF
+
+    parser = config_parser.config_parser()
+    parser.add_argument("--list_budget_ratios", type=float, nargs="+", default=[0.125, 0.25, 0.5], help="fine samples per frame, relative to `N_importance` on every pixel")
+    parser.add_argument("--tile", type=int, default=16, help="tile size of adaptive sample allocation")
+    parser.add_argument("--n_views", type=int, default=0, help="test views to benchmark; 0 for all (after `testskip`)")
+    args = parser.parse_args()
+    args.render_only = True
+
+    images, poses, _, hwf, i_split = load_blender_data(args.datadir, args.half_res, args.testskip)
+    _, _, i_test, near, far, images = post_load_blender_data(i_split, images, args.white_bkgd)
+    _, render_kwargs_test, _, _ = create_NeRF(args)
+    render_kwargs_test.update({
+        "near": near, 
+        "far": far, 
+    })
+
+    H, W, focal = hwf
+    H, W = int(H), int(W)
+    K = onp.array([
+        [focal, 0, 0.5 * W], 
+        [0, focal, 0.5 * H], 
+        [0, 0, 1]
+    ])
+    i_test = i_test[:args.n_views] if args.n_views > 0 else i_test
+    benchmark(render_kwargs_test, H, W, K, poses[i_test], images[i_test], args.list_budget_ratios, tile=args.tile, chunk=args.chunk)
@@ -0,0 +1,169 @@
+"""### autochunk.py
+###### in `mlx_nerf/rendering`
+
+Memory-budgeted auto-tuning of `chunk` (rays per `render_rays_func` call) and `netchunk` (points per MLP call).
+
+Candidate pairs are probed on a batch of real rays, measuring throughput and `mx.get_peak_memory`.
+The fastest pair within the budget is cached on disk per configuration, so probing runs once per (model, device, budget).
+"""
+
+import json
+import time
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import mlx.core as mx
+
+from mlx_nerf.rendering.render import batchify_rays
+
+PATH_CACHE_DEFAULT = Path.home() / ".cache" / "mlx_nerf" / "autochunk.json"
+
+LIST_CHUNKS = [1024*4, 1024*8, 1024*16, 1024*32, 1024*64]
+LIST_NETCHUNKS = [1024*16, 1024*32, 1024*64, 1024*128, 1024*256]
+
+
+def get_config_key(render_kwargs: dict, memory_budget: int) -> str:
+    """
+    Returns a key identifying everything that changes the memory/throughput of rendering a chunk
+    """
+
+    network = render_kwargs["network_coarse"]
+    network_fine = render_kwargs.get("network_fine")
+    config = {
+        "device": str(mx.default_device()), 
+        "mlx": mx.__version__, 
+        "memory_budget": int(memory_budget), 
+        "netdepth": network.D, 
+        "netwidth": network.W, 
+        "channel_input_pos": network.channel_input_pos, 
+        "channel_input_dir": network.channel_input_dir, 
+        "netdepth_fine": network_fine.D if network_fine else None, 
+        "netwidth_fine": network_fine.W if network_fine else None, 
+        "precision": network.precision, # NOTE: activations of half precision MLPs take half the memory
+        "is_checkpoint": bool(network.is_checkpoint), 
+        "use_viewdirs": bool(render_kwargs.get("use_viewdirs", False)), 
+        "n_depth_samples": render_kwargs["n_depth_samples"], 
+        "N_importance": render_kwargs.get("N_importance", 0), 
+        "render_rays_func": render_kwargs["render_rays_func"].__name__, 
+    }
+
+    return json.dumps(config, sort_keys=True)
+
+def load_cache(path_cache: Union[str, Path]) -> Dict[str, dict]:
+
+    path_cache = Path(path_cache)
+    if not path_cache.exists():
+        return {}
+
+    with open(path_cache, "r") as fp:
+        return json.load(fp)
+
+def save_cache(path_cache: Union[str, Path], cache: Dict[str, dict]) -> None:
+
+    path_cache = Path(path_cache)
+    path_cache.parent.mkdir(parents=True, exist_ok=True)
+    with open(path_cache, "w") as fp:
+        json.dump(cache, fp, indent=2)
+
+    return
+
+def probe(
+    rays_linear, 
+    render_kwargs: dict, 
+    chunk: int, 
+    netchunk: int, 
+    n_repeats: int = 2, 
+) -> Tuple[float, int]:
+    """
+    Renders a single full chunk with given sizes
+
+    Returns:
+        - throughput in rays/sec
+        - peak memory in bytes
+    """
+
+    kwargs = dict(render_kwargs)
+    kwargs["network_query_fn"] = partial(render_kwargs["network_query_fn"], netchunk=netchunk)
+    rays_probe = rays_linear[:chunk]
+    mx.eval(rays_probe)
+
+    # NOTE: warm-up, excluded from both timing & peak memory
+    mx.eval(batchify_rays(rays_probe, chunk, **kwargs))
+    mx.reset_peak_memory()
+
+    tic = time.perf_counter()
+    for _ in range(n_repeats):
+        mx.eval(batchify_rays(rays_probe, chunk, **kwargs))
+    elapsed = (time.perf_counter() - tic) / n_repeats
+
+    return rays_probe.shape[0] / elapsed, mx.get_peak_memory()
+
+def autotune_chunks(
+    rays_linear, 
+    render_kwargs: dict, 
+    memory_budget: int, # NOTE: in bytes
+    path_cache: Optional[Union[str, Path]] = PATH_CACHE_DEFAULT, 
+    list_chunks: List[int] = LIST_CHUNKS, 
+    list_netchunks: List[int] = LIST_NETCHUNKS, 
+    verbose: bool = False, 
+) -> Tuple[int, int]:
+    """
+    Returns the fastest `(chunk, netchunk)` whose peak memory fits in `memory_budget`
+
+    `rays_linear` are rays built by `render.build_rays`, e.g., of a training view;
+    candidates larger than the number of given rays are not probed.
+    """
+
+    key = get_config_key(render_kwargs, memory_budget)
+    cache = load_cache(path_cache) if path_cache else {}
+    if key in cache:
+        return cache[key]["chunk"], cache[key]["netchunk"]
+
+    n_points_per_ray = render_kwargs["n_depth_samples"] + render_kwargs.get("N_importance", 0)
+
+    best = None
+    for chunk in sorted(list_chunks):
+        if chunk > rays_linear.shape[0]:
+            break
+
+        is_fit = False
+        for netchunk in sorted(list_netchunks):
+            # NOTE: `netchunk` larger than the points of a single chunk behaves identically to the previous one
+            if netchunk > chunk * n_points_per_ray:
+                break
+
+            try:
+                rays_per_sec, peak_memory = probe(rays_linear, render_kwargs, chunk, netchunk)
+            except RuntimeError: # NOTE: allocation failure
+                break
+            if verbose:
+                print(f"[DEBUG] {chunk=}, {netchunk=}: {rays_per_sec=:.1f}, peak_memory={peak_memory/2**20:.1f}MB")
+
+            # NOTE: larger `netchunk` only grows memory
+            if peak_memory > memory_budget:
+                break
+            is_fit = True
+
+            if best is None or rays_per_sec > best["rays_per_sec"]:
+                best = {
+                    "chunk": chunk, 
+                    "netchunk": netchunk, 
+                    "rays_per_sec": rays_per_sec, 
+                    "peak_memory": peak_memory, 
+                }
+
+        # NOTE: larger `chunk` only grows memory
+        if not is_fit:
+            break
+
+    if best is None:
+        print(f"[WARNING] no chunk size fits in memory_budget={memory_budget/2**20:.1f}MB; using the smallest candidates")
+        return min(list_chunks), min(list_netchunks)
+
+    if path_cache:
+        cache = load_cache(path_cache) # NOTE: re-read, as other processes may have written meanwhile
+        cache[key] = best
+        save_cache(path_cache, cache)
+
+    return best["chunk"], best["netchunk"]
@@ -0,0 +1,395 @@
+"""### baked.py
+###### in `mlx_nerf/rendering`
+
+Baking a trained NeRF into a sparse voxel grid of density & spherical harmonics, and ray-marching it without any MLP.
+
+Baking evaluates the network on the vertices of a `resolution`³ grid over a bounding box, in chunks:
+    1. density on every vertex, i.e., occupancy; occupied vertices are dilated by one, so that trilinear lookups near surfaces see baked neighbors
+    2. rgb of occupied vertices only, for `n_dirs` view directions, projected onto SH of `n_degrees` (`SphericalHarmonicsEncoding`) by least squares
+
+`BakedGrid` stores features of occupied vertices only, with a two-level int32 index of vertex to feature row (empty vertices point to a row of zeros):
+a coarse index of `block`³ vertex blocks, and a table of `block`³ rows per occupied block only, hence the index scales with occupied blocks
+rather than `resolution`³, e.g., at 512³ a 1MB coarse index and ~27MB of blocks for a sphere-like surface, instead of a 512MB dense index
+(occupancy scattered over all blocks would cost more than a dense index); `save(...)` writes occupied vertex ids & features (fp16) only.
+
+NOTE: `bake(...)` itself still queries & holds density of all `resolution`³ vertices on host (4 bytes each) while baking
+
+Rendering a sample is a trilinear lookup of 8 vertices and a dot product with SH of the view direction, composited by `raw2outputs(...)` as MLP samples are,
+hence the baked render differs from the MLP render by baking errors only.
+
+Execution flow:
+    1. bake(...)
+        - __query(...)          (density, every vertex)
+        - __query(...)          (rgb, occupied vertices × `n_dirs`) & SH projection
+    2. render_baked(...)
+        - intersect_aabb(...)   (samples within the grid only)
+        - BakedGrid.lookup(...)
+        - raw2outputs(...)
+
+Benchmark (bake, then PSNR & time per frame of baked against MLP renders, on test views):
+    python -m mlx_nerf.rendering.baked --config {config} --ft_path {checkpoint} --bake_resolution 256
+"""
+
+import math
+import time
+from typing import Sequence
+
+import numpy as onp
+import mlx.core as mx
+
+from mlx_nerf.encoding.spherical_harmonics import SphericalHarmonicsEncoding
+from mlx_nerf.rendering.render import build_rays, intersect_aabb, raw2outputs
+
+
+class BakedGrid:
+    def __init__(
+        self, 
+        bbox_min: Sequence[float], 
+        bbox_max: Sequence[float], 
+        resolution: int, # NOTE: vertices per axis
+        n_degrees: int, # NOTE: SH degree, see `SphericalHarmonicsEncoding`
+        idx_occupied, # NOTE: linear vertex ids of occupied vertices [M] (onp)
+        features, # NOTE: [M, 1 + 3*(n_degrees+1)**2]; raw density, then SH coefficients per rgb channel
+        block: int = 8, # NOTE: vertices per axis of a block of the index
+    ) -> None:
+
+        self.bbox_min = onp.asarray(bbox_min, dtype=onp.float32)
+        self.bbox_max = onp.asarray(bbox_max, dtype=onp.float32)
+        self.resolution = resolution
+        self.n_degrees = n_degrees
+        self.block = block
+        self.idx_occupied = onp.asarray(idx_occupied, dtype=onp.int64)
+        self.encoding = SphericalHarmonicsEncoding(3, n_degrees)
+
+        # NOTE: two-level index of vertex to feature row; empty vertices point to a trailing row of zeros, and empty blocks to a trailing empty block
+        M = len(self.idx_occupied)
+        n_blocks_axis = -(-resolution // block)
+        i, j, k = onp.unravel_index(self.idx_occupied, [resolution] * 3)
+        idx_blocks = ((i // block) * n_blocks_axis + j // block) * n_blocks_axis + k // block
+        idx_local = ((i % block) * block + j % block) * block + k % block
+        blocks_occupied, slots = onp.unique(idx_blocks, return_inverse=True)
+        index_blocks = onp.full([n_blocks_axis ** 3], len(blocks_occupied), dtype=onp.int32)
+        index_blocks[blocks_occupied] = onp.arange(len(blocks_occupied), dtype=onp.int32)
+        index_vertices = onp.full([len(blocks_occupied) + 1, block ** 3], M, dtype=onp.int32)
+        index_vertices[slots.reshape(-1), idx_local] = onp.arange(M, dtype=onp.int32)
+        self.n_blocks_axis = n_blocks_axis
+        self.index_blocks = mx.array(index_blocks)
+        self.index_vertices = mx.array(index_vertices.reshape(-1))
+        features = mx.array(features).astype(mx.float32)
+        self.features = mx.concatenate([features, mx.zeros([1, features.shape[-1]])], axis=0)
+        mx.eval(self.index_blocks, self.index_vertices, self.features)
+
+        return
+
+    @property
+    def n_occupied(self) -> int:
+        return len(self.idx_occupied)
+
+    @property
+    def nbytes(self) -> int:
+        return self.index_blocks.nbytes + self.index_vertices.nbytes + self.features.nbytes
+
+    def lookup(
+        self, 
+        pts, # NOTE: [B, n, 3]
+        viewdirs, # NOTE: unit [B, 3]
+    ):
+        """
+        Returns raw [B, n, 4] as a NeRF does, i.e., rgb & density, trilinearly interpolated; points outside the grid are empty
+        """
+
+        R, B, n_blocks_axis = self.resolution, self.block, self.n_blocks_axis
+        bbox_min, bbox_max = mx.array(self.bbox_min), mx.array(self.bbox_max)
+        coords = (pts - bbox_min) / (bbox_max - bbox_min) * (R - 1)
+        is_inside = mx.all((coords >= 0.0) & (coords <= R - 1), axis=-1)
+
+        coords_0 = mx.clip(mx.floor(coords), 0, R - 2)
+        frac = mx.clip(coords - coords_0, 0.0, 1.0)
+        coords_0 = coords_0.astype(mx.int32)
+
+        features = 0.0
+        for offset in [(i, j, k) for i in (0, 1) for j in (0, 1) for k in (0, 1)]:
+            corner = coords_0 + mx.array(offset, dtype=mx.int32)
+            corner_block, corner_local = corner // B, corner % B
+            idx_block = (corner_block[..., 0] * n_blocks_axis + corner_block[..., 1]) * n_blocks_axis + corner_block[..., 2]
+            idx_local = (corner_local[..., 0] * B + corner_local[..., 1]) * B + corner_local[..., 2]
+            idx_row = self.index_vertices[self.index_blocks[idx_block] * B ** 3 + idx_local]
+            w = mx.prod(mx.where(mx.array(offset, dtype=mx.bool_), frac, 1.0 - frac), axis=-1)
+            features = features + w[..., None] * self.features[idx_row]
+        features = mx.where(is_inside[..., None], features, 0.0)
+
+        density = features[..., :1]
+        sh = mx.reshape(features[..., 1:], [*features.shape[:-1], 3, -1]) # NOTE: [B, n, 3, n_sh]
+        basis = self.encoding(viewdirs)[:, None, None, :] # NOTE: [B, 1, 1, n_sh]
+        rgb = mx.sum(sh * basis, axis=-1)
+
+        return mx.concatenate([rgb, density], axis=-1)
+
+    def save(self, path: str) -> None:
+
+        onp.savez_compressed(
+            path, 
+            bbox_min=self.bbox_min, 
+            bbox_max=self.bbox_max, 
+            resolution=self.resolution, 
+            n_degrees=self.n_degrees, 
+            idx_occupied=self.idx_occupied.astype(onp.int32), 
+            features=onp.array(self.features[:-1]).astype(onp.float16), 
+        )
+
+        return
+
+    @classmethod
+    def load(cls, path: str) -> "BakedGrid":
+
+        data = onp.load(path)
+
+        return cls(
+            data["bbox_min"], 
+            data["bbox_max"], 
+            int(data["resolution"]), 
+            int(data["n_degrees"]), 
+            data["idx_occupied"], 
+            data["features"], 
+        )
+
+def get_bake_dirs(n_dirs: int):
+    """
+    Returns `n_dirs` unit directions [n_dirs, 3] (onp) evenly spread on the sphere (Fibonacci lattice)
+    """
+
+    idx = onp.arange(n_dirs) + 0.5
+    z = 1.0 - 2.0 * idx / n_dirs
+    r = onp.sqrt(1.0 - z ** 2)
+    phi = math.pi * (1.0 + math.sqrt(5.0)) * idx
+
+    return onp.stack([r * onp.cos(phi), r * onp.sin(phi), z], axis=-1).astype(onp.float32)
+
+def __query(network_query_fn, network, pts, viewdirs):
+    """
+    Returns raw [n_dirs, M, 4] of points [M, 3] seen from each of `viewdirs` [n_dirs, 3], or [1, M, 4] without view directions
+    """
+
+    if viewdirs is None:
+        return network_query_fn(pts[None], None, network)
+
+    return network_query_fn(
+        mx.broadcast_to(pts[None], [viewdirs.shape[0], *pts.shape]), 
+        viewdirs, 
+        network
+    )
+
+def __dilate(mask):
+    """
+    Dilates a 3D mask by one voxel, incl. diagonal neighbors
+    """
+
+    for axis in range(3):
+        dilated = mask.copy()
+        index_from = [slice(None)] * 3
+        index_to = [slice(None)] * 3
+        index_from[axis], index_to[axis] = slice(1, None), slice(None, -1)
+        dilated[tuple(index_to)] |= mask[tuple(index_from)]
+        dilated[tuple(index_from)] |= mask[tuple(index_to)]
+        mask = dilated
+
+    return mask
+
+def bake(
+    render_kwargs: dict, # NOTE: e.g., `render_kwargs_test`; the fine network is baked if any
+    resolution: int = 256, 
+    bbox_min: Sequence[float] = (-1.5, -1.5, -1.5), 
+    bbox_max: Sequence[float] = (1.5, 1.5, 1.5), 
+    n_degrees: int = 2, 
+    n_dirs: int = 32, # NOTE: view directions per vertex for the SH fit
+    alpha_threshold: float = 0.005, # NOTE: vertices are occupied if opacity over a voxel exceeds this
+    chunk: int = 64*1024, # NOTE: MLP queries per step
+) -> BakedGrid:
+    """
+    Returns the network baked into a `BakedGrid`
+
+    NOTE: without `use_viewdirs`, rgb is view-independent and baked into SH of degree 0
+    """
+
+    tic = time.perf_counter()
+    network = render_kwargs.get("network_fine") or render_kwargs["network_coarse"]
+    network_query_fn = render_kwargs["network_query_fn"]
+    if not render_kwargs.get("use_viewdirs"):
+        n_degrees, n_dirs = 0, 1
+
+    R = resolution
+    bbox_min = onp.asarray(bbox_min, dtype=onp.float32)
+    bbox_max = onp.asarray(bbox_max, dtype=onp.float32)
+    voxel_size = float(onp.max(bbox_max - bbox_min)) / (R - 1)
+    axes = [onp.linspace(bbox_min[i], bbox_max[i], R, dtype=onp.float32) for i in range(3)]
+
+    def __vertices(idx_vertices):
+        i, j, k = onp.unravel_index(idx_vertices, [R, R, R])
+        return mx.array(onp.stack([axes[0][i], axes[1][j], axes[2][k]], axis=-1))
+
+    # NOTE: density on every vertex; view directions do not change density
+    viewdirs_density = mx.array([[0.0, 0.0, 1.0]]) if render_kwargs.get("use_viewdirs") else None
+    density = onp.empty([R ** 3], dtype=onp.float32)
+    for i in range(0, R ** 3, chunk):
+        idx_vertices = onp.arange(i, min(i + chunk, R ** 3))
+        raw = __query(network_query_fn, network, __vertices(idx_vertices), viewdirs_density)
+        density[idx_vertices] = onp.array(raw[0, :, 3].astype(mx.float32))
+
+    alpha = 1.0 - onp.exp(-onp.maximum(density, 0.0) * voxel_size)
+    is_occupied = __dilate((alpha > alpha_threshold).reshape([R, R, R])).reshape(-1)
+    idx_occupied = onp.nonzero(is_occupied)[0]
+    print(f"[INFO] bake: {len(idx_occupied)} of {R**3} vertices occupied ({len(idx_occupied)/R**3*100:.2f}%)")
+
+    # NOTE: SH by least squares over `n_dirs` directions; the pseudo-inverse is shared by all vertices
+    encoding = SphericalHarmonicsEncoding(3, n_degrees)
+    dirs = get_bake_dirs(n_dirs) if n_dirs > 1 else onp.array([[0.0, 0.0, 1.0]], dtype=onp.float32)
+    basis_pinv = mx.array(onp.linalg.pinv(onp.array(encoding(mx.array(dirs))))) # NOTE: [n_sh, n_dirs]
+    viewdirs = mx.array(dirs) if render_kwargs.get("use_viewdirs") else None
+
+    n_sh = (n_degrees + 1) ** 2
+    features = onp.empty([len(idx_occupied), 1 + 3 * n_sh], dtype=onp.float32)
+    chunk_vertices = max(chunk // n_dirs, 1)
+    for i in range(0, len(idx_occupied), chunk_vertices):
+        raw = __query(network_query_fn, network, __vertices(idx_occupied[i:i+chunk_vertices]), viewdirs)
+        raw = raw.astype(mx.float32)
+        rgb = mx.transpose(raw[..., :3], [1, 2, 0]) # NOTE: [M, 3, n_dirs]
+        sh = rgb @ basis_pinv.T # NOTE: [M, 3, n_sh]
+        features[i:i+chunk_vertices, 0] = onp.array(raw[0, :, 3])
+        features[i:i+chunk_vertices, 1:] = onp.array(mx.reshape(sh, [sh.shape[0], -1]))
+
+    grid = BakedGrid(bbox_min, bbox_max, R, n_degrees, idx_occupied, features)
+    print(f"[INFO] bake: {time.perf_counter()-tic:.1f}s, {grid.nbytes/2**20:.1f}MB (SH degree {n_degrees})")
+
+    return grid
+
+def render_baked(
+    grid: BakedGrid, 
+    H: int, 
+    W: int, 
+    K, 
+    c2w, # NOTE: [3 or 4, 4]
+    near: float = 2.0, 
+    far: float = 6.0, 
+    n_samples: int = 0, # NOTE: samples per ray within the grid; 0 for about one per voxel along the diagonal
+    white_bkgd: bool = False, 
+    chunk: int = 1024, # NOTE: rays per step; lookups gather `8 * n_samples` feature rows per ray
+):
+    """
+    Same as `render.render(...)` of a single view, but ray-marching `grid`
+
+    Returns `[rgb_map, disp_map, acc_map, {}]`
+    """
+
+    rays, rays_shape = build_rays(H, W, K, c2w=mx.array(c2w)[:3, :4], ndc=False, near=near, far=far, use_viewdirs=True)
+    n_samples = n_samples if n_samples > 0 else int(math.sqrt(3.0) * grid.resolution)
+    t_vals = mx.linspace(0.0, 1.0, num=n_samples)
+
+    list_results = []
+    for i in range(0, rays.shape[0], chunk):
+        rays_chunk = rays[i:i+chunk]
+        rays_o, rays_d, viewdirs = rays_chunk[:, 0:3], rays_chunk[:, 3:6], rays_chunk[:, -3:]
+        near_ray, far_ray, _ = intersect_aabb(rays_o, rays_d, rays_chunk[:, 6], rays_chunk[:, 7], grid.bbox_min, grid.bbox_max)
+
+        # NOTE: missed rays get `far == near`, i.e., zero-length intervals and zero opacity
+        z_vals = near_ray[:, None] * (1.0 - t_vals) + far_ray[:, None] * t_vals # NOTE: [B, n]
+        pts = rays_o[:, None, :] + rays_d[:, None, :] * z_vals[..., None]
+        raw = grid.lookup(pts, viewdirs)
+        rgb, disp, acc, _, _ = raw2outputs(raw, z_vals, rays_d, white_bkgd=white_bkgd)
+        mx.eval(rgb, disp, acc)
+        list_results.append((rgb, disp, acc))
+
+    shape = list(rays_shape[:-1])
+    return [
+        mx.reshape(mx.concatenate([r[idx] for r in list_results], axis=0), shape + [-1])
+        for idx in range(3)
+    ] + [{}]
+
+def benchmark(
+    grid: BakedGrid, 
+    renderer, # NOTE: MLP renderer, e.g., `CompiledRenderer`
+    H: int, 
+    W: int, 
+    K, 
+    poses, # NOTE: [N, 4, 4]
+    images, # NOTE: [N, H, W, 3]
+    near: float, 
+    far: float, 
+    white_bkgd: bool = False, 
+    n_samples: int = 0, 
+) -> dict:
+    """
+    Prints PSNR & time per frame of baked and MLP renders of `poses`, and the speedup of baking
+    """
+
+    from mlx_nerf.ops.metric import PSNR
+
+    results = {}
+    for name in ["MLP", "baked"]:
+        list_psnr, elapsed = [], 0.0
+        for c2w, image in zip(poses, images):
+            tic = time.perf_counter()
+            if "MLP" == name:
+                rgb = renderer(H, W, K, c2w=mx.array(c2w)[:3, :4])[0]
+            else:
+                rgb = render_baked(grid, H, W, K, c2w, near=near, far=far, n_samples=n_samples, white_bkgd=white_bkgd)[0]
+            mx.eval(rgb)
+            elapsed += time.perf_counter() - tic
+            list_psnr.append(PSNR()(rgb, mx.array(image)).item())
+        results[name] = (float(onp.mean(list_psnr)), elapsed / len(poses))
+
+    print(f"[INFO] {'mode':>6} {'PSNR':>7} {'ms/frame':>10}")
+    for name, (psnr, sec) in results.items():
+        print(f"[INFO] {name:>6} {psnr:>7.2f} {sec*1e3:>10.1f}")
+    print(f"[INFO] baked: {results['MLP'][1]/results['baked'][1]:.1f}x faster, {results['baked'][0]-results['MLP'][0]:+.2f} dB")
+
+    return results
+
+if __name__ == "__main__":
+    import os
+
+    from mlx_nerf import config_parser
+    from mlx_nerf.dataset.dataloader import load_blender_data, post_load_blender_data
+    from mlx_nerf.models.NeRF import create_NeRF
+    from mlx_nerf.rendering.compiled import CompiledRenderer
+
+    parser = config_parser.config_parser()
+    parser.add_argument("--bake_resolution", type=int, default=256, help="grid vertices per axis")
+    parser.add_argument("--bake_sh_degree", type=int, default=2, help="SH degree of baked colors, in [0, 4]")
+    parser.add_argument("--bake_n_samples", type=int, default=0, help="samples per ray of baked renders; 0 for about one per voxel")
+    parser.add_argument("--n_views", type=int, default=0, help="test views to benchmark; 0 for all (after `testskip`)")
+    args = parser.parse_args()
+    args.render_only = True
+
+    images, poses, _, hwf, i_split = load_blender_data(args.datadir, args.half_res, args.testskip)
+    _, _, i_test, near, far, images = post_load_blender_data(i_split, images, args.white_bkgd)
+    _, render_kwargs_test, idx_iter, _ = create_NeRF(args)
+    render_kwargs_test.update({
+        "near": near, 
+        "far": far, 
+    })
+
+    H, W, focal = hwf
+    H, W = int(H), int(W)
+    K = onp.array([
+        [focal, 0, 0.5 * W], 
+        [0, focal, 0.5 * H], 
+        [0, 0, 1]
+    ])
+
+    grid = bake(render_kwargs_test, resolution=args.bake_resolution, n_degrees=args.bake_sh_degree, chunk=args.netchunk)
+    path_grid = os.path.join(args.basedir, args.expname, f"baked_{idx_iter:06d}_{args.bake_resolution}.npz")
+    grid.save(path_grid)
+    print(f"[INFO] saved {path_grid} ({os.path.getsize(path_grid)/2**20:.1f}MB)")
+
+    i_test = i_test[:args.n_views] if args.n_views > 0 else i_test
+    benchmark(
+        grid, 
+        CompiledRenderer(chunk=args.chunk, **render_kwargs_test), 
+        H, W, K, 
+        poses[i_test], 
+        images[i_test], 
+        near, 
+        far, 
+        white_bkgd=args.white_bkgd, 
+        n_samples=args.bake_n_samples, 
+    )
@@ -0,0 +1,206 @@
+"""### compiled.py
+###### in `mlx_nerf/rendering`
+
+Shape-stable compiled rendering.
+
+`batchify_rays` slices the last chunk of a frame to whatever rays remain, so a compiled render function sees a new input shape on every frame's tail and retraces.
+Here, the tail chunk is padded to the fixed chunk size and the padded results are dropped afterwards, 
+hence every chunk of every frame hits the same compiled graph.
+
+Execution flow:
+    1. CompiledRenderer.__call__(...)
+    2. CompiledRenderer.batchify_rays(...)
+    3. CompiledRenderer.render_chunk(...)
+        - compiled `render_rays(...)`       (coarse)
+        - `sample_importance_z(...)`        (eager; `torch.searchsorted`)
+        - compiled `render_rays_fine(...)`  (fine)
+
+Many views: `CompiledRenderer.render_batch(...)` packs rays across view boundaries (`render.render_views(...)`, as `render.render_batch(...)` does),
+hence only the very last chunk is padded, rather than the last chunk of every view.
+"""
+
+from collections import OrderedDict
+from functools import partial
+
+import mlx.core as mx
+
+from mlx_nerf.rendering.render import (
+    apply_ray_bounds, 
+    build_rays, 
+    fill_missed, 
+    render_rays, 
+    render_rays_fine, 
+    render_views, 
+    sample_importance_z, 
+    unpack_results, 
+)
+
+
+def pad_rays(rays_linear, chunk: int):
+    """
+    Pads rays to `chunk` rows by repeating the last ray; padding with zeros would produce NaNs from zero-length directions
+
+    Returns:
+        - padded rays [chunk, C]
+        - number of valid rays
+    """
+
+    n_valid = rays_linear.shape[0]
+    if n_valid == chunk:
+        return rays_linear, n_valid
+
+    padding = mx.repeat(rays_linear[-1:], repeats=chunk-n_valid, axis=0)
+    return mx.concatenate([rays_linear, padding], axis=0), n_valid
+
+class CompiledRenderer:
+    """
+    Drop-in for `render.render(...)` with compiled coarse/fine passes & fixed-size chunks
+    """
+    def __init__(
+        self, 
+        chunk=1024*32, 
+        max_cache_size=4, # NOTE: number of compiled graphs kept, keyed by stage & input shapes
+        **render_kwargs
+    ):
+
+        self.chunk = chunk
+        self.max_cache_size = max_cache_size
+        self.render_kwargs = render_kwargs
+        self.cache = OrderedDict()
+
+        # NOTE: weights are passed as implicit inputs, otherwise they are baked into the graph as constants
+        self.state = [render_kwargs["network_coarse"].state]
+        if render_kwargs.get("network_fine"):
+            self.state.append(render_kwargs["network_fine"].state)
+
+        return
+
+    def get_compiled(self, key, func):
+        """
+        Returns compiled `func` for `key` from the LRU cache, compiling it on miss
+        """
+
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.cache[key] = mx.compile(func, inputs=self.state)
+        if len(self.cache) > self.max_cache_size:
+            self.cache.popitem(last=False)
+
+        return self.cache[key]
+
+    def render_chunk(self, rays_chunk):
+
+        kwargs = self.render_kwargs
+
+        # NOTE: coarse; perturbation is not supported, as random state would have to be a compile input as well
+        render_coarse = self.get_compiled(
+            ("coarse", rays_chunk.shape), 
+            partial(
+                render_rays, 
+                network_coarse=kwargs["network_coarse"], 
+                network_query_fn=kwargs["network_query_fn"], 
+                n_depth_samples=kwargs["n_depth_samples"], 
+                lindisp=kwargs.get("lindisp", False), 
+                white_bkgd=kwargs.get("white_bkgd", False), 
+            )
+        )
+        ret = render_coarse(rays_chunk)
+
+        N_importance = kwargs.get("N_importance", 0)
+        if N_importance <= 0:
+            return ret
+
+        # NOTE: importance sampling & fine
+        z_vals = sample_importance_z(ret["z_vals"], ret["weights"], N_importance)
+        render_fine = self.get_compiled(
+            ("fine", rays_chunk.shape, z_vals.shape), 
+            partial(
+                render_rays_fine, 
+                network_coarse=kwargs["network_coarse"], 
+                network_query_fn=kwargs["network_query_fn"], 
+                network_fine=kwargs.get("network_fine"), 
+                white_bkgd=kwargs.get("white_bkgd", False), 
+            )
+        )
+        ret.update(render_fine(rays_chunk, z_vals))
+
+        return ret
+
+    def render_chunk_padded(self, rays_linear):
+        """
+        Renders up to `chunk` rays, padded to `chunk`
+        """
+
+        rays_chunk, n_valid = pad_rays(rays_linear, self.chunk)
+        results = self.render_chunk(rays_chunk)
+
+        return {key: val[:n_valid] for key, val in results.items()}
+
+    def batchify_rays(self, rays_linear):
+
+        results_batched = {}
+        for i in range(0, rays_linear.shape[0], self.chunk):
+            rays_chunk, n_valid = pad_rays(rays_linear[i:i+self.chunk], self.chunk)
+            results = self.render_chunk(rays_chunk)
+
+            # NOTE: accumulate per-batch results to `results_batched`, masking out padded rays
+            for key, val in results.items():
+                if key not in results_batched:
+                    results_batched[key] = []
+                results_batched[key].append(val[:n_valid])
+
+        results_batched = {
+            key: mx.concatenate(val, axis=0) if len(val) > 1 else val[0]
+            for key, val in results_batched.items()
+        }
+
+        return results_batched
+
+    def __call__(
+        self, 
+        H, 
+        W, 
+        K, 
+        rays=None, 
+        c2w=None, 
+        c2w_staticcam=None, 
+    ):
+
+        rays, rays_shape = build_rays(
+            H, W, K, 
+            rays=rays, 
+            c2w=c2w, 
+            c2w_staticcam=c2w_staticcam, 
+            **self.render_kwargs
+        )
+
+        # NOTE: per-ray bounds, e.g., from a visual hull; missed rays skip the MLP
+        ray_bounds = self.render_kwargs.get("ray_bounds")
+        if ray_bounds is not None:
+            n_rays = rays.shape[0]
+            rays, idx_hit = apply_ray_bounds(rays, ray_bounds)
+            results_batched = self.batchify_rays(rays) if idx_hit.size > 0 else {}
+            results_batched = fill_missed(results_batched, idx_hit, n_rays, self.render_kwargs.get("white_bkgd", False))
+        else:
+            results_batched = self.batchify_rays(rays)
+
+        return unpack_results(results_batched, rays_shape)
+
+    def render_batch(
+        self, 
+        H, 
+        W, 
+        K, 
+        poses, # NOTE: [N, 3 or 4, 4]
+    ):
+        """
+        Same as `__call__(...)` for each of `poses`, with rays of all views packed into full chunks
+
+        Yields `[rgb_map, disp_map, acc_map, extras]` per view in order, evaluated
+        """
+
+        yield from render_views(H, W, K, poses, self.chunk, self.render_chunk_padded, **self.render_kwargs)
+
+        return
@@ -0,0 +1,179 @@
+"""### mesh.py
+###### in `mlx_nerf/rendering`
+
+Mesh extraction from the density field of a NeRF, by marching cubes block by block.
+
+The grid of `resolution`³ cells over a bounding box is split into blocks of `block`³ cells. Each block queries density on its `(block+1)`³ vertices
+through `network_query_fn(...)` in chunks of `chunk` points, with the density-only path (no view directions, no color layers), then runs marching cubes.
+Neighboring blocks share their boundary vertices, hence they cut identical triangle vertices on shared faces, which are welded afterwards.
+
+Memory is bounded by a block of densities and a chunk of MLP activations, never the whole grid; e.g., 512³ in blocks of 64³ holds 65³ densities at a time.
+
+Execution flow:
+    1. extract_mesh(...)
+        - query_density(...)        (per block, in chunks)
+        - skimage.measure.marching_cubes(...)
+        - __weld(...)               (shared vertices of neighboring blocks)
+    2. save_mesh(...)               (PLY or OBJ)
+
+Export:
+    python -m mlx_nerf.rendering.mesh --config {config} --ft_path {checkpoint} --mesh_resolution 512
+"""
+
+import os
+import time
+from typing import Sequence
+
+import numpy as onp
+import mlx.core as mx
+from skimage import measure
+
+
+def query_density(
+    render_kwargs: dict, # NOTE: e.g., `render_kwargs_test`
+    pts, # NOTE: [M, 3] (onp)
+    network: str = "fine", # NOTE: "coarse" or "fine"; falls back to coarse without a fine network
+    chunk: int = 64*1024, # NOTE: points per MLP query
+):
+    """
+    Returns raw density [M] (onp) of `pts`
+    """
+
+    model = render_kwargs.get(f"network_{network}") or render_kwargs["network_coarse"]
+    network_query_fn = render_kwargs["network_query_fn"]
+
+    density = onp.empty([pts.shape[0]], dtype=onp.float32)
+    for i in range(0, pts.shape[0], chunk):
+        raw = network_query_fn(mx.array(pts[None, i:i+chunk]), None, model, is_density_only=True)
+        density[i:i+chunk] = onp.array(raw[0, :, 0].astype(mx.float32))
+
+    return density
+
+def __weld(vertices, faces, scale: float):
+    """
+    Merges vertices equal up to `1/scale` (e.g., cut by two blocks on their shared face), and drops faces that degenerate
+    """
+
+    keys = onp.round(vertices * scale).astype(onp.int64)
+    _, idx_unique, inverse = onp.unique(keys, axis=0, return_index=True, return_inverse=True)
+    faces = inverse.reshape(-1)[faces]
+    is_valid = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+
+    return vertices[idx_unique], faces[is_valid]
+
+def extract_mesh(
+    render_kwargs: dict, # NOTE: e.g., `render_kwargs_test`
+    resolution: int = 512, # NOTE: grid cells per axis
+    bbox_min: Sequence[float] = (-1.5, -1.5, -1.5), 
+    bbox_max: Sequence[float] = (1.5, 1.5, 1.5), 
+    threshold: float = 50.0, # NOTE: iso-level of raw density
+    network: str = "fine", 
+    block: int = 64, # NOTE: cells per axis of a block
+    chunk: int = 64*1024, 
+):
+    """
+    Returns vertices [V, 3] & triangles [F, 3] (onp) of the `threshold` iso-surface of density
+    """
+
+    tic = time.perf_counter()
+    bbox_min = onp.asarray(bbox_min, dtype=onp.float32)
+    bbox_max = onp.asarray(bbox_max, dtype=onp.float32)
+    voxel_size = (bbox_max - bbox_min) / resolution
+
+    list_vertices, list_faces, n_vertices = [], [], 0
+    n_blocks, n_blocks_empty = 0, 0
+    for i in range(0, resolution, block):
+        for j in range(0, resolution, block):
+            for k in range(0, resolution, block):
+                # NOTE: vertices [start, end] inclusive; the last layer is the first of the next block
+                offset = onp.array([i, j, k])
+                shape = onp.minimum(offset + block, resolution) - offset + 1
+                idx = onp.stack(onp.meshgrid(*[onp.arange(n) for n in shape], indexing="ij"), axis=-1).reshape(-1, 3)
+                pts = bbox_min + (offset + idx) * voxel_size
+
+                density = query_density(render_kwargs, pts, network=network, chunk=chunk).reshape(shape)
+                n_blocks += 1
+                if not (density.min() < threshold < density.max()):
+                    n_blocks_empty += 1
+                    continue
+
+                vertices, faces, _, _ = measure.marching_cubes(density, level=threshold)
+                list_vertices.append(vertices + offset) # NOTE: in grid cells
+                list_faces.append(faces + n_vertices)
+                n_vertices += vertices.shape[0]
+
+    if not list_vertices:
+        print(f"[WARNING] no iso-surface at density {threshold}")
+        return onp.zeros([0, 3], dtype=onp.float32), onp.zeros([0, 3], dtype=onp.int64)
+
+    vertices, faces = __weld(
+        onp.concatenate(list_vertices, axis=0), 
+        onp.concatenate(list_faces, axis=0), 
+        scale=1024.0 # NOTE: 1/1024 of a cell
+    )
+    vertices = (bbox_min + vertices * voxel_size).astype(onp.float32)
+    print(
+        f"[INFO] mesh: {vertices.shape[0]} vertices, {faces.shape[0]} faces from {resolution}³ in {time.perf_counter()-tic:.1f}s "
+        f"({n_blocks-n_blocks_empty} of {n_blocks} blocks cross the surface)"
+    )
+
+    return vertices, faces
+
+def save_mesh(path: str, vertices, faces) -> None:
+    """
+    Writes a binary PLY or an OBJ, by extension of `path`
+    """
+
+    extension = os.path.splitext(path)[-1].lower()
+    if ".ply" == extension:
+        header = (
+            "ply\n"
+            "format binary_little_endian 1.0\n"
+            f"element vertex {vertices.shape[0]}\n"
+            "property float x\nproperty float y\nproperty float z\n"
+            f"element face {faces.shape[0]}\n"
+            "property list uchar int vertex_indices\n"
+            "end_header\n"
+        )
+        records_faces = onp.empty(faces.shape[0], dtype=[("n", "u1"), ("idx", "<i4", (3,))])
+        records_faces["n"] = 3
+        records_faces["idx"] = faces
+        with open(path, "wb") as f:
+            f.write(header.encode("ascii"))
+            f.write(vertices.astype("<f4").tobytes())
+            f.write(records_faces.tobytes())
+    elif ".obj" == extension:
+        with open(path, "w") as f:
+            onp.savetxt(f, vertices, fmt="v %.6f %.6f %.6f")
+            onp.savetxt(f, faces + 1, fmt="f %d %d %d") # NOTE: 1-based
+    else:
+        raise ValueError(f"[ERROR] {extension=} must be `.ply` or `.obj`!")
+
+    return
+
+if __name__ == "__main__":
+    from mlx_nerf import config_parser
+    from mlx_nerf.models.NeRF import create_NeRF
+
+    parser = config_parser.config_parser()
+    parser.add_argument("--mesh_resolution", type=int, default=512, help="grid cells per axis of mesh extraction")
+    parser.add_argument("--mesh_threshold", type=float, default=50.0, help="iso-level of raw density")
+    parser.add_argument("--mesh_block", type=int, default=64, help="cells per axis of a block of marching cubes")
+    parser.add_argument("--mesh_network", type=str, default="fine", choices=["coarse", "fine"], help="network to query density from")
+    parser.add_argument("--mesh_format", type=str, default="ply", choices=["ply", "obj"], help="mesh file format")
+    args = parser.parse_args()
+    args.render_only = True
+
+    _, render_kwargs_test, idx_iter, _ = create_NeRF(args)
+    vertices, faces = extract_mesh(
+        render_kwargs_test, 
+        resolution=args.mesh_resolution, 
+        threshold=args.mesh_threshold, 
+        network=args.mesh_network, 
+        block=args.mesh_block, 
+        chunk=args.netchunk, 
+    )
+    path_mesh = os.path.join(args.basedir, args.expname, f"mesh_{idx_iter:06d}_{args.mesh_resolution}.{args.mesh_format}")
+    os.makedirs(os.path.dirname(path_mesh), exist_ok=True)
+    save_mesh(path_mesh, vertices, faces)
+    print(f"[INFO] saved {path_mesh}")
@@ -0,0 +1,61 @@
+"""### progressive.py
+###### in `mlx_nerf/rendering`
+
+Progressive multi-resolution rendering, e.g., for interactive previews.
+
+A view is rendered at 1/`render_factor` resolution first, then refined by halving the factor down to full resolution.
+Pixel `(r, c)` at factor `f` is the ray through full-resolution pixel `(r*f, c*f)`, hence each level only renders pixels no coarser level did;
+with factors 8, 4, 2, 1, each level after the first renders 3/4 of its pixels, and the whole sequence renders each pixel once, as a single full-resolution render does.
+
+Levels are yielded as they complete, hence a preview is available after 1/`render_factor`^2 of the work,
+and a consumer cancels the remaining levels by stopping iteration.
+"""
+
+from typing import Callable
+
+import numpy as onp
+import mlx.core as mx
+
+from mlx_nerf.rendering import ray
+
+
+def render_progressive(
+    renderer: Callable, # NOTE: `renderer(H, W, K, rays=(rays_o, rays_d))`, e.g., `CompiledRenderer`
+    H: int, 
+    W: int, 
+    K, 
+    c2w, # NOTE: [3 or 4, 4]
+    render_factor: int = 8, 
+):
+    """
+    Yields `(factor, rgb_map)` per level, from `render_factor` down to 1, with `rgb_map` of [ceil(H/factor), ceil(W/factor), 3] (onp)
+    """
+
+    rays_o, rays_d = ray.get_rays(H, W, K, onp.asarray(c2w, dtype=onp.float32)[:3, :4])
+    rays_o = onp.asarray(rays_o, dtype=onp.float32)
+    rays_d = onp.asarray(rays_d, dtype=onp.float32)
+
+    rgb_full = onp.zeros([H, W, 3], dtype=onp.float32)
+    is_rendered = onp.zeros([H, W], dtype=bool) # NOTE: pixels any previous level rendered
+
+    factor = max(render_factor, 1)
+    while True:
+        rows, cols = onp.meshgrid(onp.arange(0, H, factor), onp.arange(0, W, factor), indexing="ij")
+        is_new = ~is_rendered[rows, cols]
+        rows, cols = rows[is_new], cols[is_new]
+
+        if rows.size > 0:
+            rgb, _, _, _ = renderer(
+                H, W, K, 
+                rays=(mx.array(rays_o[rows, cols]), mx.array(rays_d[rows, cols])), 
+            )
+            rgb_full[rows, cols] = onp.array(rgb)
+            is_rendered[rows, cols] = True
+
+        yield factor, rgb_full[::factor, ::factor].copy()
+
+        if factor == 1:
+            break
+        factor = max(factor // 2, 1)
+
+    return
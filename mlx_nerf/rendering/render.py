@@ -6,14 +6,23 @@ Execution flow:
     2. batchify_rays(...)
     3. render_rays(...)
     4. raw2outputs(...)
+
+Many views (e.g., test split or camera path):
+    1. render_batch(...)
+    2. render_views(...)        (shared with `CompiledRenderer.render_batch(...)`)
+    3. pack_views(...)          (rays packed into full chunks across view boundaries)
+    4. batchify_rays(...)
 """
 
+from collections import deque
+
 import numpy as onp
 import mlx.core as mx
 import mlx.nn as nn
 import torch
 
 from mlx_nerf.rendering import ray
+from mlx_nerf.rendering.composite import composite
 from mlx_nerf import sampling
 from mlx_nerf.sampling import uniform, linear_disparity
 
@@ -32,6 +41,9 @@ def raw2outputs(
         * weights == transmittance
     """
 
+    # NOTE: composite in fp32 even if `raw` is from a mixed precision MLP; half precision transmittance underflows
+    raw = raw.astype(mx.float32)
+
     # NOTE: decompose `raw`
     raw_rgb = raw[..., :3] # NOTE: dim = [B, n, 3]
     raw_density = raw[..., 3] # NOTE: dim = [B, n]
@@ -45,48 +57,30 @@ def raw2outputs(
     # NOTE: relative distance
     delta_dists = z_vals[..., 1:] - z_vals[..., :-1] # NOTE: [B, n_depth_samples-1]
     # NOTE: add infinite value at the end of `dists`
-    DIST_LIMIT = mx.array(1e10)
-    DIST_LIMIT = mx.repeat(DIST_LIMIT[None, ...], repeats=z_vals.shape[0], axis=0) # [B, 1]
-    DIST_LIMIT = mx.expand_dims(DIST_LIMIT, axis=-1)
     delta_dists = mx.concatenate(
         [
             delta_dists, 
-            DIST_LIMIT
+            mx.full(z_vals[..., :1].shape, 1e10) # NOTE: DIST_LIMIT, [B, 1]
         ], axis=-1
     ) # [B, n]
     # NOTE: rotate `dists` w.r.t. direction
-    # delta_dists = mx.expand_dims(delta_dists, axis=-1)
     delta_dists = delta_dists * mx.linalg.norm(rays_d[..., None, :], axis=-1) # [B, n]
-    
-
-    # TODO: --------- double-check below ----------
 
     # NOTE: compute weight: composed alpha
     # NOTE: from last paragraph, below eq. (3)
-    # alpha = 1.0 - mx.exp(-nn.relu(raw_alpha) * delta_dists)
-    delta_densities = delta_dists * raw_density # [B, n]
-    delta_densities = mx.expand_dims(delta_densities, axis=-1)
-    alphas = 1.0 - mx.exp(-nn.relu(delta_densities)) # [B, n]
-    
-    transmittance = mx.cumsum(delta_densities[..., :-1, :], axis=-2) # FIXME: [B-1, n]???
-    transmittance = mx.concatenate(
-        [
-            mx.zeros((*transmittance.shape[:1], 1, 1)), 
-            transmittance
-        ], 
-        axis=-2
+    # NOTE: see `composite.py`; only inputs & outputs are kept for backward, and transmittance is recomputed
+    rgb_map, depth_map, acc_map, weights = composite(
+        raw_rgb, 
+        delta_dists * raw_density, # [B, n]
+        z_vals
     )
-    transmittance = mx.exp(-transmittance)
-    weights = alphas * transmittance # [B, n, 1]
-
-    # TODO: implement each as a renderer
-    rgb_map = mx.sum(weights * raw_rgb, axis=-2) # [B, 3]
-    depth_map = mx.sum(weights[..., 0] * z_vals, axis=-1)[..., None] # [B, 1]
+    weights = weights[..., None] # [B, n, 1]
+    depth_map = depth_map[..., None] # [B, 1]
+    acc_map = acc_map[..., None] # [B, 1]
     disp_map = 1.0 / mx.maximum(
         1e-10 * mx.ones_like(depth_map), 
-        depth_map/mx.sum(weights, axis=-2)
+        depth_map/acc_map
     ) # [B, 1]
-    acc_map = mx.sum(weights, axis=-2) # [B, 1]
 
     if white_bkgd:
         rgb_map = rgb_map + (1.0 - acc_map) # TODO: validate
@@ -161,55 +155,14 @@ def render_rays(
     
     return ret
 
-def render_rays_eval(
-    rays_batch_linear, # NOTE: [B, rays_o, rays_d, near, far, viewdirs]
-    network_coarse, 
-    network_query_fn, 
-    n_depth_samples, 
-    retraw=False, 
-    lindisp=False, 
-    perturb=0.0, 
-    N_importance=0, 
-    network_fine=None, 
-    white_bkgd=False, 
-    raw_noise_std=0.0, 
-    verbose=False, 
-    pytest=False,
-    **kwargs, 
+def sample_importance_z(
+    z_vals, # NOTE: [B, n_depth_samples]
+    weights, # NOTE: [B, n_depth_samples, 1]
+    N_importance, 
 ):
-    
-    n_rays = rays_batch_linear.shape[0]
-    rays_o, rays_d, near, far, viewdirs, _ = decompose_ray_batch(rays_batch_linear)
-
-    # TODO: separate generation of `z_vals` - to allow users to choose which depth sampling they want to use (e.g., uniform, inverse_cdf, ...)
-    # NOTE: sample z-values for coarse NeRF
-    if not lindisp:
-        z_vals = uniform.sample_z(near, far, n_depth_samples)
-    else:
-        z_vals = linear_disparity.sample_z(near, far, n_depth_samples)
-    # TODO: use `expand` when `mlx` implements it - `repeat` copies data but `expand` provides view
-    # z_vals = mx.repeat(z_vals[None, ...], repeats=n_rays, axis=0) # FIXME: validate: [n_rays, n_depth_samples] -> [n_rays, n_rays, n_depth_samples]
-    z_vals = sampling.add_noise_z(z_vals, perturb)
-
-    pos = rays_o[..., None, :] + (z_vals[..., :, None] * rays_d[..., None, :]) # TODO: validate
-
-    raw = network_query_fn(pos, viewdirs, network_coarse) # returns [rgb, alpha]
-    ret = {}
-    if retraw: ret["raw"] = raw
-
-    rgb_coarse, disp_coarse, acc_coarse, weights, depth_map = raw2outputs(
-        raw, z_vals, rays_d, raw_noise_std, white_bkgd, pytest
-    )
-    ret["rgb_map"] = rgb_coarse
-    ret["disp_map"] = disp_coarse
-    ret["acc_map"] = acc_coarse
-    ret["rgb_coarse"] = rgb_coarse
-    ret["disp_coarse"] = disp_coarse
-    ret["acc_coarse"] = acc_coarse
-
-    # NOTE: for importance sampling
-    ret["z_vals"] = z_vals
-    ret["weights"] = weights
+    """
+    Returns `z_vals` merged with `N_importance` samples drawn from the inverse CDF of `weights`, sorted per ray
+    """
 
     # NOTE: `torch.searchsorted` not supports `mps` backend
     z_vals_torch = torch.from_numpy(onp.array(z_vals))# .to("mps")
@@ -222,7 +175,20 @@ def render_rays_eval(
     z_importance_samples = z_importance_samples.detach().cpu().numpy()
     z_importance_samples = mx.array(z_importance_samples)
 
-    z_vals = mx.sort(mx.concatenate([z_vals, z_importance_samples], axis=-1), axis=-1) # TODO: double check
+    return mx.sort(mx.concatenate([z_vals, z_importance_samples], axis=-1), axis=-1) # TODO: double check
+
+def render_rays_fine(
+    rays_batch_linear, # NOTE: [B, rays_o, rays_d, near, far, viewdirs]
+    z_vals, # NOTE: [B, n_depth_samples + N_importance], from `sample_importance_z(...)`
+    network_coarse, 
+    network_query_fn, 
+    network_fine=None, 
+    white_bkgd=False, 
+    raw_noise_std=0.0, 
+    **kwargs, 
+):
+
+    rays_o, rays_d, _, _, viewdirs, _ = decompose_ray_batch(rays_batch_linear)
     pts = rays_o[..., None, :] + rays_d[..., None, :] * z_vals[..., :, None]
 
     run_fn = network_fine if network_fine else network_coarse
@@ -234,9 +200,55 @@ def render_rays_eval(
         raw_noise_std, 
         white_bkgd
     )
+    ret = {}
     ret["rgb_map"] = rgb
     ret["disp_map"] = disp
     ret["acc_map"] = acc
+
+    return ret
+
+def render_rays_eval(
+    rays_batch_linear, # NOTE: [B, rays_o, rays_d, near, far, viewdirs]
+    network_coarse, 
+    network_query_fn, 
+    n_depth_samples, 
+    retraw=False, 
+    lindisp=False, 
+    perturb=0.0, 
+    N_importance=0, 
+    network_fine=None, 
+    white_bkgd=False, 
+    raw_noise_std=0.0, 
+    verbose=False, 
+    pytest=False,
+    **kwargs, 
+):
+    
+    # NOTE: coarse
+    ret = render_rays(
+        rays_batch_linear, 
+        network_coarse, 
+        network_query_fn, 
+        n_depth_samples, 
+        retraw=retraw, 
+        lindisp=lindisp, 
+        perturb=perturb, 
+        white_bkgd=white_bkgd, 
+        raw_noise_std=raw_noise_std, 
+        pytest=pytest, 
+    )
+
+    # NOTE: importance sampling & fine
+    z_vals = sample_importance_z(ret["z_vals"], ret["weights"], N_importance)
+    ret.update(render_rays_fine(
+        rays_batch_linear, 
+        z_vals, 
+        network_coarse, 
+        network_query_fn, 
+        network_fine=network_fine, 
+        white_bkgd=white_bkgd, 
+        raw_noise_std=raw_noise_std, 
+    ))
     
     return ret
 
@@ -247,6 +259,10 @@ def batchify_rays(
 ):
     
     render_rays_func = kwargs["render_rays_func"]
+
+    # NOTE: single chunk; no need to accumulate & concatenate
+    if rays_linear.shape[0] <= chunk:
+        return render_rays_func(rays_linear, **kwargs)
     
     results_batched = {}
     for i in range(0, rays_linear.shape[0], chunk):
@@ -265,11 +281,10 @@ def batchify_rays(
 
     return results_batched
 
-def render(
+def build_rays(
     H, 
     W, 
     K, 
-    chunk=1024*32, 
     rays=None,
     c2w=None, 
     ndc=True, 
@@ -279,6 +294,9 @@ def render(
     c2w_staticcam=None, 
     **kwargs
 ):
+    """
+    Returns linearized rays [H*W, rays_o, rays_d, near, far (, viewdirs)], and the shape of `rays_d` before linearization
+    """
 
     if c2w is None and rays is not None:
         rays_o, rays_d = rays
@@ -327,7 +345,184 @@ def render(
     if use_viewdirs:
         rays = mx.concatenate([rays, viewdirs], axis=-1)
 
-    results_batched = batchify_rays(rays, chunk, **kwargs)
+    return rays, rays_shape
+
+def intersect_aabb(
+    rays_o, # NOTE: [B, 3]
+    rays_d, # NOTE: [B, 3]
+    near, # NOTE: [B] or scalar
+    far, # NOTE: [B] or scalar
+    bbox_min=(-1.5, -1.5, -1.5), 
+    bbox_max=(1.5, 1.5, 1.5), 
+):
+    """
+    Slab test of rays against an axis-aligned box; a `ray_bounds` for `apply_ray_bounds(...)`, e.g., `partial(intersect_aabb, bbox_min=..., bbox_max=...)`
+
+    Returns per-ray near [B] & far [B] clipped to the box, and whether rays hit the box within [near, far] [B]
+    """
+
+    # NOTE: avoid division by zero for axis-parallel rays; `inf` slabs are fine, `nan` ones are not
+    rays_d = mx.where(mx.abs(rays_d) < 1e-10, 1e-10, rays_d)
+    t_0 = (mx.array(bbox_min, dtype=mx.float32) - rays_o) / rays_d
+    t_1 = (mx.array(bbox_max, dtype=mx.float32) - rays_o) / rays_d
+    t_enter = mx.max(mx.minimum(t_0, t_1), axis=-1)
+    t_exit = mx.min(mx.maximum(t_0, t_1), axis=-1)
+
+    near = mx.broadcast_to(mx.array(near, dtype=mx.float32), t_enter.shape)
+    far = mx.broadcast_to(mx.array(far, dtype=mx.float32), t_enter.shape)
+    near_clipped = mx.maximum(t_enter, near)
+    far_clipped = mx.minimum(t_exit, far)
+    is_hit = far_clipped > near_clipped
+
+    return (
+        mx.where(is_hit, near_clipped, near), 
+        mx.where(is_hit, far_clipped, near), 
+        is_hit
+    )
+
+def report_ray_bounds(
+    H, 
+    W, 
+    K, 
+    poses, # NOTE: [N, 4, 4]
+    ray_bounds, 
+    near, 
+    far, 
+):
+    """
+    Prints sample savings of `ray_bounds` over `poses`, with a fixed number of samples per rendered ray
+
+    Returns fraction of rays skipped (i.e., of MLP samples saved), and mean interval of hit rays relative to `far - near` (i.e., inverse gain of sample density)
+    """
+
+    n_rays, n_hit, interval = 0, 0, 0.0
+    for c2w in poses:
+        rays_o, rays_d = ray.get_rays(H, W, K, onp.array(c2w)[:3, :4])
+        rays_o = mx.reshape(mx.array(rays_o), [-1, 3]).astype(mx.float32)
+        rays_d = mx.reshape(mx.array(rays_d), [-1, 3]).astype(mx.float32)
+        near_ray, far_ray, is_hit = ray_bounds(rays_o, rays_d, near, far)
+
+        n_rays += rays_o.shape[0]
+        n_hit += mx.sum(is_hit).item()
+        interval += mx.sum(mx.where(is_hit, far_ray - near_ray, 0.0)).item()
+
+    ratio_skipped = 1.0 - n_hit / n_rays
+    ratio_interval = interval / max(n_hit, 1) / (far - near)
+    print(f"[INFO] ray bounds: {ratio_skipped*100:.1f}% of rays (and MLP samples) skipped, hit rays sample {1.0/max(ratio_interval, 1e-10):.2f}x denser")
+
+    return ratio_skipped, ratio_interval
+
+def apply_ray_bounds(
+    rays_linear, # NOTE: [B, rays_o, rays_d, near, far (, viewdirs)]
+    ray_bounds, # NOTE: `ray_bounds(rays_o, rays_d, near, far)` returns per-ray near [B], far [B] & hit mask [B]
+):
+    """
+    Returns rays hitting the scene with their near/far replaced by `ray_bounds(...)`, and their indices in `rays_linear` (onp)
+    """
+
+    near, far, is_hit = ray_bounds(
+        rays_linear[:, 0:3], 
+        rays_linear[:, 3:6], 
+        rays_linear[:, 6], 
+        rays_linear[:, 7]
+    )
+    rays_linear = mx.concatenate(
+        [rays_linear[:, :6], near[:, None], far[:, None], rays_linear[:, 8:]], 
+        axis=-1
+    )
+    idx_hit = onp.nonzero(onp.array(is_hit))[0]
+
+    return rays_linear[mx.array(idx_hit)], idx_hit
+
+def sample_hit_rays(
+    sample_fn, # NOTE: `sample_fn(n_rays)` returns pixel coordinates [n, 2] & importance weights [n] (onp)
+    ray_bounds, # NOTE: see `apply_ray_bounds(...)`
+    rays_o, # NOTE: [H, W, 3]
+    rays_d, # NOTE: [H, W, 3]
+    near: float, 
+    far: float, 
+    n_rays: int, 
+    max_rounds: int = 8, 
+):
+    """
+    Draws `n_rays` training rays hitting the scene (e.g., visual hull or bounding box) by rejection, so the MLP never runs on background-only rays
+
+    Missed rays render the background exactly, i.e., carry no gradient,
+    hence weights are scaled by the acceptance rate to keep the loss an unbiased estimate of the per-image mean.
+    If too few rays hit within `max_rounds`, missed rays fill the batch with zero weights.
+
+    Returns pixel coordinates [n_rays, 2] (onp), importance weights [n_rays] (onp), near [n_rays], far [n_rays]
+    """
+
+    list_coords, list_weights, list_near, list_far = [], [], [], []
+    list_coords_missed = []
+    n_hit, n_drawn = 0, 0
+    for _ in range(max_rounds):
+        coords, weights = sample_fn(n_rays)
+        rows, cols = mx.array(coords[:, 0]), mx.array(coords[:, 1])
+        _near, _far, is_hit = ray_bounds(
+            rays_o[rows, cols], 
+            rays_d[rows, cols], 
+            near, 
+            far
+        )
+        is_hit = onp.array(is_hit)
+        idx_hit = mx.array(onp.nonzero(is_hit)[0])
+        list_coords.append(coords[is_hit])
+        list_weights.append(weights[is_hit])
+        list_near.append(_near[idx_hit])
+        list_far.append(_far[idx_hit])
+        list_coords_missed.append(coords[~is_hit])
+
+        n_hit += int(is_hit.sum())
+        n_drawn += n_rays
+        if n_hit >= n_rays:
+            break
+
+    coords = onp.concatenate(list_coords, axis=0)[:n_rays]
+    weights = onp.concatenate(list_weights, axis=0)[:n_rays] * (n_hit / n_drawn)
+    near_ray = mx.concatenate(list_near, axis=0)[:n_rays]
+    far_ray = mx.concatenate(list_far, axis=0)[:n_rays]
+
+    n_missing = n_rays - coords.shape[0]
+    if n_missing > 0:
+        coords = onp.concatenate([coords, onp.concatenate(list_coords_missed, axis=0)[:n_missing]], axis=0)
+        weights = onp.concatenate([weights, onp.zeros([n_missing], dtype=weights.dtype)], axis=0)
+        near_ray = mx.concatenate([near_ray, mx.full([n_missing], near)], axis=0)
+        far_ray = mx.concatenate([far_ray, mx.full([n_missing], far)], axis=0)
+
+    return coords, weights, near_ray, far_ray
+
+def fill_missed(
+    results, # NOTE: results of hit rays, from `batchify_rays(...)`
+    idx_hit, # NOTE: from `apply_ray_bounds(...)`
+    n_rays, 
+    white_bkgd=False, 
+):
+    """
+    Scatters results of hit rays back to all `n_rays`; missed rays get the background color with zero opacity
+    """
+
+    # NOTE: every ray may have missed
+    results = dict(results)
+    for key, n_channels in [("rgb_map", 3), ("disp_map", 1), ("acc_map", 1)]:
+        if key not in results:
+            results[key] = mx.zeros([0, n_channels])
+
+    idx_hit = mx.array(idx_hit)
+    for key, val in results.items():
+        filled = mx.full([n_rays] + list(val.shape[1:]), 1.0 if white_bkgd and key.startswith("rgb") else 0.0, dtype=val.dtype)
+        if idx_hit.size > 0:
+            filled[idx_hit] = val
+        results[key] = filled
+
+    return results
+
+def unpack_results(results_batched, rays_shape):
+    """
+    Shapes linearized results back to `rays_shape`, and returns `[rgb_map, disp_map, acc_map, extras]`
+    """
+
     # NOTE: shape back linearized rendered results to `rays.shape`
     for key, val in results_batched.items():
         results_batched[key] = mx.reshape(
@@ -344,3 +539,189 @@ def render(
 
     return ret_list + [ret_dict]
 
+def pack_views(
+    iter_rays, # NOTE: linearized rays [B_i, C] per view, e.g., a generator
+    chunk: int, 
+    render_chunk, # NOTE: `render_chunk(rays_chunk)` returns a `dict` of per-ray results
+):
+    """
+    Renders rays of consecutive views packed into full chunks across view boundaries, and yields per-view results in view order
+
+    NOTE: only the very last chunk is partial; rays & results are held for one chunk and the views it spans only
+    """
+
+    n_rays_views = deque() # NOTE: ray counts of views not yielded yet
+    rays_pending, n_rays_pending = [], 0
+    results_pending, n_results_pending = deque(), 0 # NOTE: per-chunk results not yielded yet
+
+    def __render(n_rays):
+        nonlocal rays_pending, n_rays_pending, n_results_pending
+
+        rays_all = mx.concatenate(rays_pending, axis=0) if len(rays_pending) > 1 else rays_pending[0]
+        rays_pending = [rays_all[n_rays:]] if rays_all.shape[0] > n_rays else []
+        n_rays_pending -= n_rays
+        results_pending.append(render_chunk(rays_all[:n_rays]))
+        n_results_pending += n_rays
+
+        return
+
+    def __take(n_rays):
+        """
+        Pops results of the first `n_rays` rendered rays
+        """
+        nonlocal n_results_pending
+
+        list_results = []
+        while n_rays > 0:
+            results = results_pending[0]
+            n_chunk = next(iter(results.values())).shape[0]
+            if n_chunk <= n_rays:
+                list_results.append(results_pending.popleft())
+            else:
+                list_results.append({k: v[:n_rays] for k, v in results.items()})
+                results_pending[0] = {k: v[n_rays:] for k, v in results.items()}
+            n_taken = min(n_chunk, n_rays)
+            n_rays -= n_taken
+            n_results_pending -= n_taken
+
+        if not list_results:
+            return {}
+        return {
+            k: mx.concatenate([results[k] for results in list_results], axis=0) if len(list_results) > 1 else list_results[0][k]
+            for k in list_results[0]
+        }
+
+    idx_view = 0
+    for rays_view in iter_rays:
+        n_rays_views.append(rays_view.shape[0])
+        if rays_view.shape[0] > 0:
+            rays_pending.append(rays_view)
+            n_rays_pending += rays_view.shape[0]
+
+        while n_rays_pending >= chunk:
+            __render(chunk)
+            while n_rays_views and n_rays_views[0] <= n_results_pending:
+                yield idx_view, __take(n_rays_views.popleft())
+                idx_view += 1
+
+    if n_rays_pending > 0:
+        __render(n_rays_pending)
+    while n_rays_views:
+        yield idx_view, __take(n_rays_views.popleft())
+        idx_view += 1
+
+    return
+
+def render_views(
+    H, 
+    W, 
+    K, 
+    poses, # NOTE: [N, 3 or 4, 4]
+    chunk: int, 
+    render_chunk, # NOTE: `render_chunk(rays_chunk)` returns a `dict` of per-ray results, e.g., `batchify_rays(...)`
+    ray_bounds=None, 
+    white_bkgd=False, 
+    **kwargs # NOTE: of `build_rays(...)`, e.g., `ndc`, `near`, `far` & `use_viewdirs`
+):
+    """
+    Builds rays of each of `poses`, renders them packed into full chunks by `pack_views(...)`, and unpacks results per view
+
+    Yields `[rgb_map, disp_map, acc_map, extras]` per view in order, evaluated
+    """
+
+    list_views = [] # NOTE: (rays_shape, n_rays, idx_hit) per view
+
+    def __iter_rays():
+        for c2w in poses:
+            rays, rays_shape = build_rays(
+                H, W, K, 
+                c2w=mx.array(c2w)[:3, :4], 
+                **kwargs
+            )
+            idx_hit = None
+            n_rays = rays.shape[0]
+            if ray_bounds is not None:
+                rays, idx_hit = apply_ray_bounds(rays, ray_bounds)
+            list_views.append((rays_shape, n_rays, idx_hit))
+            yield rays
+
+    for idx_view, results in pack_views(__iter_rays(), chunk, render_chunk):
+        rays_shape, n_rays, idx_hit = list_views[idx_view]
+        list_views[idx_view] = None
+        if idx_hit is not None:
+            results = fill_missed(results, idx_hit, n_rays, white_bkgd)
+        ret = unpack_results(results, rays_shape)
+        mx.eval(ret)
+        yield ret
+
+    return
+
+def render_batch(
+    H, 
+    W, 
+    K, 
+    poses, # NOTE: [N, 3 or 4, 4]
+    chunk=1024*32, 
+    ndc=True, 
+    near=0.0, 
+    far=1.0, 
+    use_viewdirs=False, 
+    **kwargs
+):
+    """
+    Same as `render(...)` for each of `poses`, but with rays of all views packed into full chunks
+
+    Yields `[rgb_map, disp_map, acc_map, extras]` per view in order, evaluated
+    """
+
+    yield from render_views(
+        H, W, K, 
+        poses, 
+        chunk, 
+        lambda rays_chunk: batchify_rays(rays_chunk, chunk, **kwargs), 
+        ndc=ndc, 
+        near=near, 
+        far=far, 
+        use_viewdirs=use_viewdirs, 
+        **kwargs
+    )
+
+    return
+
+def render(
+    H, 
+    W, 
+    K, 
+    chunk=1024*32, 
+    rays=None,
+    c2w=None, 
+    ndc=True, 
+    near=0.0, 
+    far=1.0,
+    use_viewdirs=False, 
+    c2w_staticcam=None, 
+    **kwargs
+):
+
+    rays, rays_shape = build_rays(
+        H, W, K, 
+        rays=rays, 
+        c2w=c2w, 
+        ndc=ndc, 
+        near=near, 
+        far=far, 
+        use_viewdirs=use_viewdirs, 
+        c2w_staticcam=c2w_staticcam, 
+    )
+
+    # NOTE: per-ray bounds, e.g., from a visual hull; missed rays skip the MLP
+    ray_bounds = kwargs.get("ray_bounds")
+    if ray_bounds is not None:
+        n_rays = rays.shape[0]
+        rays, idx_hit = apply_ray_bounds(rays, ray_bounds)
+        results_batched = batchify_rays(rays, chunk, **kwargs) if idx_hit.size > 0 else {}
+        results_batched = fill_missed(results_batched, idx_hit, n_rays, kwargs.get("white_bkgd", False))
+    else:
+        results_batched = batchify_rays(rays, chunk, **kwargs)
+
+    return unpack_results(results_batched, rays_shape)
\ No newline at end of file
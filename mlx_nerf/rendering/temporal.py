@@ -0,0 +1,271 @@
+"""### temporal.py
+###### in `mlx_nerf/rendering`
+
+Temporal sample reuse for camera-path videos, e.g., `render_poses`.
+
+Consecutive poses see mostly the same surfaces. The previous frame's depth is reprojected into the new view (forward splat with a z-buffer),
+and pixels that received a depth are rendered with `n_samples_surface` fine samples within `band` of it, skipping the coarse pass & importance sampling.
+Pixels without a reprojected depth (disocclusions, background, frame borders) fall back to full coarse & fine rendering,
+as do reused pixels whose narrow band turns out mostly empty (`acc < acc_min`), e.g., at occluding edges,
+or whose surface is found off-center in the band, i.e., whose weights may extend beyond it.
+
+Depth of the new frame, reused or not, seeds the next one; the first frame is fully rendered.
+
+NOTE: reprojection is in world space, hence NDC rays (forward-facing `llff`) are not supported
+
+Execution flow (per frame):
+    1. reproject_depth(...)                 (previous depth into the new view)
+    2. compiled `render_rays_band(...)`     (narrow band around reprojected depth)
+    3. CompiledRenderer.__call__(...)       (fallback: disoccluded & rejected pixels)
+
+Benchmark (frame time & PSNR against full rendering):
+    python -m mlx_nerf.rendering.temporal --config {config} --ft_path {checkpoint} --n_frames 8
+"""
+
+import time
+from functools import partial
+
+import numpy as onp
+import mlx.core as mx
+
+from mlx_nerf.rendering import ray
+from mlx_nerf.rendering.compiled import CompiledRenderer, pad_rays
+from mlx_nerf.rendering.render import build_rays, decompose_ray_batch, raw2outputs
+
+
+def reproject_depth(
+    rays_o, # NOTE: previous view [H, W, 3] (onp)
+    rays_d, # NOTE: previous view [H, W, 3] (onp)
+    depth, # NOTE: previous view [H, W] (onp); `inf` where there is no surface
+    K, 
+    c2w, # NOTE: new view [3 or 4, 4]
+):
+    """
+    Returns depth [H, W] (onp) of the new view along its rays (`rays_d` of `ray.get_rays(...)`), `inf` where nothing was reprojected
+
+    NOTE: nearest-pixel splatting leaves one-pixel cracks when the view moves; cracks surrounded by reprojected pixels are filled with the nearest neighboring depth
+    """
+
+    H, W = depth.shape
+    K = onp.asarray(K, dtype=onp.float32)
+    c2w = onp.asarray(c2w, dtype=onp.float32)
+
+    is_valid = onp.isfinite(depth)
+    pts = rays_o[is_valid] + rays_d[is_valid] * depth[is_valid][:, None]
+    pts_cam = (pts - c2w[:3, 3]) @ c2w[:3, :3] # NOTE: camera looks at -z, see `ray.get_rays(...)`
+    z = -pts_cam[:, 2]
+    is_front = z > 1e-6
+    pts_cam, z = pts_cam[is_front], z[is_front]
+
+    cols = onp.round(K[0][2] + K[0][0] * pts_cam[:, 0] / z).astype(onp.int64)
+    rows = onp.round(K[1][2] - K[1][1] * pts_cam[:, 1] / z).astype(onp.int64)
+    is_inside = (0 <= rows) & (rows < H) & (0 <= cols) & (cols < W)
+
+    depth_new = onp.full([H, W], onp.inf, dtype=onp.float32)
+    onp.minimum.at(depth_new, (rows[is_inside], cols[is_inside]), z[is_inside]) # NOTE: z-buffer
+
+    # NOTE: fill cracks, i.e., holes with reprojected pixels on both sides
+    padded = onp.pad(depth_new, 1, constant_values=onp.inf)
+    neighbors = onp.stack([
+        padded[1+di:1+di+H, 1+dj:1+dj+W]
+        for di in (-1, 0, 1) for dj in (-1, 0, 1) if (di, dj) != (0, 0)
+    ], axis=0)
+    is_crack = ~onp.isfinite(depth_new) & (onp.isfinite(neighbors[3]) & onp.isfinite(neighbors[4]) | onp.isfinite(neighbors[1]) & onp.isfinite(neighbors[6]))
+    depth_new[is_crack] = onp.min(neighbors, axis=0)[is_crack]
+
+    return depth_new
+
+def render_rays_band(
+    rays_batch_linear, # NOTE: [B, rays_o, rays_d, near, far, viewdirs]
+    z_vals, # NOTE: [B, n], within a band around the surface
+    network_coarse, 
+    network_query_fn, 
+    network_fine=None, 
+    white_bkgd=False, 
+    **kwargs, 
+):
+    """
+    Same as `render_rays_fine(...)`, but integrates over the band only
+
+    NOTE: `raw2outputs(...)` gives the last sample an infinite interval, i.e., full opacity for any density;
+    a trailing empty sample takes it instead, hence rays whose weights extend beyond the band come out transparent
+    """
+
+    rays_o, rays_d, _, _, viewdirs, _ = decompose_ray_batch(rays_batch_linear)
+    pts = rays_o[..., None, :] + rays_d[..., None, :] * z_vals[..., :, None]
+
+    run_fn = network_fine if network_fine else network_coarse
+    raw = network_query_fn(pts, viewdirs, run_fn)
+    raw = mx.concatenate([raw[..., :4], mx.zeros([raw.shape[0], 1, 4], dtype=raw.dtype)], axis=1)
+    z_vals = mx.concatenate([z_vals, 2.0 * z_vals[:, -1:] - z_vals[:, -2:-1]], axis=-1)
+    rgb, disp, acc, _, _ = raw2outputs(raw, z_vals, rays_d, white_bkgd=white_bkgd)
+
+    return {
+        "rgb_map": rgb, 
+        "disp_map": disp, 
+        "acc_map": acc, 
+    }
+
+def render_temporal(
+    renderer: CompiledRenderer, 
+    H: int, 
+    W: int, 
+    K, 
+    poses, # NOTE: [N, 3 or 4, 4], consecutive
+    n_samples_surface: int = 32, # NOTE: fine samples per reused ray
+    band: float = 0.2, # NOTE: half width of reused rays' sample interval around reprojected depth, in scene units
+    acc_min: float = 0.95, # NOTE: opacity below which a pixel has no well-defined surface to reproject, and a reused pixel falls back
+):
+    """
+    Same as `renderer.render_batch(...)`, but reusing depth of the previous frame
+
+    Yields `[rgb_map, disp_map, acc_map, extras]` per view in order, with `extras["ratio_reused"]` the fraction of reused pixels
+    """
+
+    kwargs = renderer.render_kwargs
+    chunk = renderer.chunk
+    t_vals = mx.linspace(-band, band, num=n_samples_surface)
+    render_fine = partial(
+        render_rays_band, 
+        network_coarse=kwargs["network_coarse"], 
+        network_query_fn=kwargs["network_query_fn"], 
+        network_fine=kwargs.get("network_fine"), 
+        white_bkgd=kwargs.get("white_bkgd", False), 
+    )
+
+    rays_o_prev, rays_d_prev, depth_prev = None, None, None
+    for c2w in poses:
+        c2w = onp.asarray(c2w, dtype=onp.float32)[:3, :4]
+        rays_o, rays_d = ray.get_rays(H, W, K, c2w)
+        rays_o = onp.asarray(rays_o, dtype=onp.float32)
+        rays_d = onp.asarray(rays_d, dtype=onp.float32)
+
+        rgb = onp.zeros([H * W, 3], dtype=onp.float32)
+        disp = onp.zeros([H * W, 1], dtype=onp.float32)
+        acc = onp.zeros([H * W, 1], dtype=onp.float32)
+
+        idx_fallback = onp.arange(H * W)
+        if depth_prev is not None:
+            depth = reproject_depth(rays_o_prev, rays_d_prev, depth_prev, K, c2w).reshape(-1)
+            idx_reuse = onp.nonzero(onp.isfinite(depth))[0]
+            rays_linear, _ = build_rays(H, W, K, c2w=mx.array(c2w), **kwargs)
+
+            # NOTE: narrow band around reprojected depth, in fixed-size chunks of a compiled fine pass
+            for i in range(0, idx_reuse.size, chunk):
+                idx_chunk = idx_reuse[i:i+chunk]
+                rays_chunk = rays_linear[mx.array(idx_chunk)]
+                z_vals = mx.clip(mx.array(depth[idx_chunk])[:, None] + t_vals, rays_chunk[:, 6:7], rays_chunk[:, 7:8])
+                rays_chunk, n_valid = pad_rays(rays_chunk, chunk)
+                z_vals, _ = pad_rays(z_vals, chunk)
+                ret = renderer.get_compiled(("temporal", rays_chunk.shape, z_vals.shape), render_fine)(rays_chunk, z_vals)
+                rgb[idx_chunk] = onp.array(ret["rgb_map"][:n_valid])
+                disp[idx_chunk] = onp.array(ret["disp_map"][:n_valid])
+                acc[idx_chunk] = onp.array(ret["acc_map"][:n_valid])
+
+            # NOTE: reused pixels that found no surface, e.g., background revealed at occluding edges,
+            # NOTE: or found it off-center, i.e., their weights may extend beyond the band, e.g., grazing rays
+            depth_rendered = 1.0 / onp.maximum(disp[idx_reuse, 0], 1e-10)
+            is_rejected = (acc[idx_reuse, 0] < acc_min) | (onp.abs(depth_rendered - depth[idx_reuse]) > 0.5 * band)
+            idx_fallback = onp.union1d(onp.nonzero(~onp.isfinite(depth))[0], idx_reuse[is_rejected])
+            ratio_reused = 1.0 - idx_fallback.size / (H * W)
+        else:
+            ratio_reused = 0.0
+
+        if idx_fallback.size > 0:
+            ret = renderer(
+                H, W, K, 
+                rays=(mx.array(rays_o.reshape(-1, 3)[idx_fallback]), mx.array(rays_d.reshape(-1, 3)[idx_fallback])), 
+            )
+            rgb[idx_fallback] = onp.array(ret[0])
+            disp[idx_fallback] = onp.array(ret[1])
+            acc[idx_fallback] = onp.array(ret[2])
+
+        # NOTE: `disp = acc / depth`, i.e., `1 / disp` is the expected depth of the surface
+        depth_prev = onp.where(acc[:, 0] > acc_min, 1.0 / onp.maximum(disp[:, 0], 1e-10), onp.inf).reshape(H, W)
+        rays_o_prev, rays_d_prev = rays_o, rays_d
+
+        yield [
+            mx.array(rgb.reshape(H, W, 3)), 
+            mx.array(disp.reshape(H, W, 1)), 
+            mx.array(acc.reshape(H, W, 1)), 
+            {"ratio_reused": ratio_reused}, 
+        ]
+
+    return
+
+def benchmark(
+    renderer: CompiledRenderer, 
+    H: int, 
+    W: int, 
+    K, 
+    poses, # NOTE: [N, 4, 4], consecutive
+    **kwargs, # NOTE: of `render_temporal(...)`
+) -> dict:
+    """
+    Renders `poses` fully and with temporal reuse; prints time per frame, reused pixels, and PSNR of reused against full frames
+    """
+
+    from mlx_nerf.ops.metric import PSNR
+
+    list_full, time_full = [], 0.0
+    for c2w in poses:
+        tic = time.perf_counter()
+        rgb = renderer(H, W, K, c2w=mx.array(c2w)[:3, :4])[0]
+        mx.eval(rgb)
+        time_full += time.perf_counter() - tic
+        list_full.append(rgb)
+
+    list_psnr, list_reused, time_temporal = [], [], 0.0
+    tic = time.perf_counter()
+    for idx, (rgb, _, _, extras) in enumerate(render_temporal(renderer, H, W, K, poses, **kwargs)):
+        time_temporal += time.perf_counter() - tic
+        if idx > 0: # NOTE: the first frame is rendered fully
+            list_psnr.append(PSNR()(rgb, list_full[idx]).item())
+            list_reused.append(extras["ratio_reused"])
+        tic = time.perf_counter()
+
+    n_frames = len(poses)
+    print(f"[INFO] full:     {time_full/n_frames*1e3:.0f}ms/frame")
+    print(f"[INFO] temporal: {time_temporal/n_frames*1e3:.0f}ms/frame ({(1.0-time_temporal/time_full)*100:.1f}% less), {onp.mean(list_reused)*100:.1f}% of pixels reused after the first frame")
+    print(f"[INFO] temporal against full: PSNR {onp.mean(list_psnr):.2f} dB (min {onp.min(list_psnr):.2f} dB)")
+
+    return {
+        "time_full": time_full / n_frames, 
+        "time_temporal": time_temporal / n_frames, 
+        "ratio_reused": float(onp.mean(list_reused)), 
+        "psnr": float(onp.mean(list_psnr)), 
+    }
+
+if __name__ == "__main__":
+    from mlx_nerf import config_parser
+    from mlx_nerf.dataset.dataloader import load_blender_meta
+    from mlx_nerf.models.NeRF import create_NeRF
+
+    parser = config_parser.config_parser()
+    parser.add_argument("--n_frames", type=int, default=8, help="consecutive `render_poses` to benchmark")
+    parser.add_argument("--n_samples_surface", type=int, default=32, help="fine samples per reused ray")
+    parser.add_argument("--band", type=float, default=0.2, help="half width of reused rays' sample interval, in scene units")
+    args = parser.parse_args()
+    args.render_only = True
+
+    _, render_poses, hwf, _ = load_blender_meta(args.datadir, args.half_res, args.testskip)
+    _, render_kwargs_test, _, _ = create_NeRF(args)
+    render_kwargs_test.update({
+        "near": 2.0, 
+        "far": 6.0, 
+    })
+
+    H, W, focal = hwf
+    H, W = int(H), int(W)
+    K = onp.array([
+        [focal, 0, 0.5 * W], 
+        [0, focal, 0.5 * H], 
+        [0, 0, 1]
+    ])
+    benchmark(
+        CompiledRenderer(chunk=args.chunk, **render_kwargs_test), 
+        H, W, K, 
+        onp.array(render_poses)[:args.n_frames], 
+        n_samples_surface=args.n_samples_surface, 
+        band=args.band, 
+    )
@@ -64,20 +64,29 @@ def sample_from_inverse_cdf(
         u_vals = mx.linspace(0.0, 1.0, num=n_importance_samples)
         u_vals = mx.repeat(u_vals[None, ...], repeats=cdf.shape[0], axis=0) # TODO: double-check
     else: # NOTE: uniform sampling
-        u_vals = mx.random.normal(
-            list(cdf.shape[:-1]) + [n_importance_samples]
+        u_vals = mx.random.uniform(
+            shape=list(cdf.shape[:-1]) + [n_importance_samples] # [B, n_importance_samples]
         )
 
-    # FIXME: https://github.com/ml-explore/mlx/issues/712#issuecomment-1954282098
-    inds = onp.searchsorted(onp.array(cdf, copy=False), u_vals, side="right") 
+    # NOTE: `searchsorted(cdf, u_vals, side="right")` on device, as the count of CDF entries <= u; no host round trip
+    inds = mx.sum(cdf[..., None, :] <= u_vals[..., None], axis=-1) # [B, n_importance_samples]
     # NOTE: clamp indices
-    below = mx.clip(inds-1, 0, cdf.shape[-1]-1)
-    above = mx.clip(inds-0, 0, cdf.shape[-1]-1)
-    cdf_grid_from = mx.take(cdf, indices=below, axis=-1)
-    cdf_grid_to = mx.take(cdf, indices=above, axis=-1)
+    below = mx.clip(inds-1, 0, cdf.shape[-1]-1) # [B, n_importance_samples]
+    above = mx.clip(inds-0, 0, cdf.shape[-1]-1) # [B, n_importance_samples]
+    cdf_grid_from = mx.take_along_axis(cdf, below, axis=-1) # [B, n_importance_samples]
+    cdf_grid_to = mx.take_along_axis(cdf, above, axis=-1) # [B, n_importance_samples]
     z_vals_mid = (z_vals[..., 1:] + z_vals[..., :-1]) / 2 # [B, n_samples-1]
-    z_mid_from = mx.take(z_vals_mid, indices=below, axis=-1)
-    z_mid_to = mx.take(z_vals_mid, indices=above, axis=-1)
+
+    # NOTE: as `below` and `above` can have values as indices in [0, n_samples], same as `sample_from_inverse_cdf_torch(...)`
+    z_vals_mid = mx.concatenate(
+        [
+            z_vals_mid[..., 0, None], 
+            z_vals_mid, 
+            z_vals_mid[..., -1, None]
+        ], axis=-1
+    )
+    z_mid_from = mx.take_along_axis(z_vals_mid, below, axis=-1)
+    z_mid_to = mx.take_along_axis(z_vals_mid, above, axis=-1)
 
     # NOTE: calculate importance
     t_numerator = u_vals - cdf_grid_from
@@ -88,11 +97,8 @@ def sample_from_inverse_cdf(
         t_denominator
     )
     t_vals = mx.clip(
-        (
-            t_numerator / 
-            t_denominator
-        ), 
-        a_min=0.0, a_max=1.0
+        mx.nan_to_num(t_numerator / t_denominator, 0.0), 
+        0.0, 1.0
     )
     z_vals = z_mid_from + t_vals * (z_mid_to - z_mid_from)
 
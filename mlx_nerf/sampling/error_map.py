@@ -0,0 +1,136 @@
+"""### error_map.py
+###### in `mlx_nerf/sampling`
+
+Error-map guided pixel sampling.
+
+Keeps a low-resolution error map per training image, updated from per-ray losses of each step,
+and draws rays proportionally to error, so rays are not wasted on converged (e.g., white background) regions.
+Each ray carries an importance weight `1 / (H*W * pdf)`, hence the weighted loss stays an unbiased estimate of the per-image mean loss.
+
+Per-ray losses are `record(...)`ed as device arrays and applied by `flush(...)` with a single host sync, e.g., every `i_print` steps;
+error maps lag by up to that many steps.
+"""
+
+import threading
+
+import numpy as onp
+import mlx.core as mx
+
+
+class ErrorMapSampler:
+    def __init__(
+        self, 
+        n_images: int, 
+        H: int, 
+        W: int, 
+        resolution: int = 64, # NOTE: error map cells per axis
+        momentum: float = 0.9, # NOTE: EMA of per-cell error
+        uniform_fraction: float = 0.1, # NOTE: mixed-in uniform probability; bounds importance weights by `1/uniform_fraction`
+    ) -> None:
+
+        self.H = H
+        self.W = W
+        self.h = min(resolution, H)
+        self.w = min(resolution, W)
+        self.momentum = momentum
+        self.uniform_fraction = uniform_fraction
+
+        # NOTE: optimistic initialization; unvisited cells are likely to be drawn, and are overwritten on first visit
+        self.error_maps = onp.ones((n_images, self.h, self.w), dtype=onp.float32)
+        self.is_visited = onp.zeros((n_images, self.h, self.w), dtype=bool)
+
+        # NOTE: pixel range [from, to) of each cell
+        self.rows_from = onp.arange(self.h) * H // self.h
+        self.rows_to = (onp.arange(self.h) + 1) * H // self.h
+        self.cols_from = onp.arange(self.w) * W // self.w
+        self.cols_to = (onp.arange(self.w) + 1) * W // self.w
+
+        # NOTE: `sample(...)` may run on a prefetching thread, concurrently with `update(...)`
+        self.lock = threading.Lock()
+        self.pending = [] # NOTE: `(idx_image, coords, errors)` recorded since the last `flush(...)`, with errors as `mx.array`
+
+        return
+
+    def get_pdf(self, idx_image: int) -> onp.ndarray:
+        """
+        Returns probability of each cell, [h*w]
+        """
+
+        error_map = self.error_maps[idx_image].ravel()
+        pdf = error_map / max(error_map.sum(), 1e-10)
+
+        return (1.0 - self.uniform_fraction) * pdf + self.uniform_fraction / pdf.size
+
+    def sample(self, idx_image: int, n_rays: int):
+        """
+        Returns:
+            - pixel coordinates [n_rays, 2] as (row, col)
+            - importance weights [n_rays]
+        """
+
+        with self.lock:
+            pdf = self.get_pdf(idx_image)
+        cells = onp.random.choice(pdf.size, size=n_rays, p=pdf)
+        rows_cell, cols_cell = onp.divmod(cells, self.w)
+
+        # NOTE: uniform pixel within each cell
+        rows_from, rows_to = self.rows_from[rows_cell], self.rows_to[rows_cell]
+        cols_from, cols_to = self.cols_from[cols_cell], self.cols_to[cols_cell]
+        rows = rows_from + (onp.random.rand(n_rays) * (rows_to - rows_from)).astype(onp.int64)
+        cols = cols_from + (onp.random.rand(n_rays) * (cols_to - cols_from)).astype(onp.int64)
+
+        pdf_pixel = pdf[cells] / ((rows_to - rows_from) * (cols_to - cols_from))
+        weights = 1.0 / (self.H * self.W * pdf_pixel)
+
+        return onp.stack([rows, cols], axis=-1), weights.astype(onp.float32)
+
+    def record(self, idx_image: int, coords: onp.ndarray, errors: mx.array) -> None:
+        """
+        Defers `update(...)` without evaluating `errors`
+        """
+
+        self.pending.append((idx_image, coords, errors))
+
+        return
+
+    def flush(self) -> None:
+        """
+        Evaluates recorded errors at once, and applies them in order
+        """
+
+        if not self.pending:
+            return
+
+        errors = mx.concatenate([errors for _, _, errors in self.pending], axis=0)
+        mx.eval(errors) # NOTE: the only host sync
+        errors = onp.split(onp.array(errors), onp.cumsum([coords.shape[0] for _, coords, _ in self.pending])[:-1])
+        for (idx_image, coords, _), errors_step in zip(self.pending, errors):
+            self.update(idx_image, coords, errors_step)
+        self.pending = []
+
+        return
+
+    def update(self, idx_image: int, coords: onp.ndarray, errors: onp.ndarray) -> None:
+        """
+        Updates EMA of cells hit by `coords` with mean of their per-ray `errors`
+        """
+
+        # NOTE: same partition as `sample(...)`, i.e., the cell whose [from, to) range contains the pixel
+        rows_cell = onp.searchsorted(self.rows_to, coords[:, 0], side="right")
+        cols_cell = onp.searchsorted(self.cols_to, coords[:, 1], side="right")
+        cells = rows_cell * self.w + cols_cell
+        count = onp.bincount(cells, minlength=self.h * self.w)
+        total = onp.bincount(cells, weights=errors, minlength=self.h * self.w)
+
+        with self.lock:
+            error_map = self.error_maps[idx_image].ravel() # NOTE: view
+            is_visited = self.is_visited[idx_image].ravel() # NOTE: view
+            is_hit = count > 0
+            momentum = onp.where(is_visited[is_hit], self.momentum, 0.0)
+            error_map[is_hit] = (
+                momentum * error_map[is_hit]
+                + (1.0 - momentum) * total[is_hit] / count[is_hit]
+            )
+            is_visited[is_hit] = True
+
+        return